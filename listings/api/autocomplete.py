@@ -0,0 +1,105 @@
+"""
+In-memory prefix index behind the houses autocomplete endpoint.
+
+Each kind of completion (city, zipcode, address) is a sorted array of
+case-folded values with their listing counts. The values starting with a
+prefix form a contiguous run found by bisection; the most common values of
+short prefixes, whose runs are long, are worked out when the index is built.
+
+The index is built per process from the database and rebuilt as the
+listings change (see api.indexes).
+"""
+import heapq
+from bisect import bisect_left
+
+from .importer import fold
+from .indexes import ProcessIndex
+from .models import House
+
+KINDS = ['city', 'zipcode', 'address']
+
+# Largest number of completions a lookup may ask for
+MAX_LIMIT = 50
+
+# Prefixes up to this long get their completions computed at build time
+PRECOMPUTED_PREFIX = 3
+
+
+class PrefixIndex:
+    """Sorted (key, label, count) entries of one kind of value."""
+    def __init__(self, counts):
+        """Build from a mapping of case-folded key to (label, count)."""
+        self.keys = sorted(counts)
+        self.labels = [counts[key][0] for key in self.keys]
+        self.counts = [counts[key][1] for key in self.keys]
+        self.top = {}
+        for length in range(1, PRECOMPUTED_PREFIX + 1):
+            start = 0
+            while start < len(self.keys):
+                prefix = self.keys[start][:length]
+                if len(prefix) < length:
+                    start += 1
+                    continue
+                end = self.end(prefix, start)
+                self.top[prefix] = self.best(start, end, MAX_LIMIT)
+                start = end
+
+    def __len__(self):
+        return len(self.keys)
+
+    def end(self, prefix, start=0):
+        """Return the index just past the run of keys starting with prefix."""
+        return bisect_left(self.keys, prefix + '\U0010ffff', start)
+
+    def best(self, start, end, limit):
+        """Return the indices of the most common keys in keys[start:end], then alphabetically."""
+        counts = self.counts
+        return heapq.nsmallest(limit, range(start, end), key=lambda i: (-counts[i], i))
+
+    def complete(self, prefix, limit):
+        """Return up to limit (label, count) pairs for the most common values starting with prefix."""
+        if prefix in self.top:
+            indices = self.top[prefix][:limit]
+        else:
+            start = bisect_left(self.keys, prefix)
+            indices = self.best(start, self.end(prefix, start), limit)
+        return [(self.labels[i], self.counts[i]) for i in indices]
+
+
+class Autocomplete:
+    """Prefix indexes of every kind."""
+    def __init__(self, indexes):
+        self.indexes = indexes
+
+    @classmethod
+    def build(cls):
+        counts = {kind: {} for kind in KINDS}
+        rows = House.objects.order_by().values_list(*KINDS).iterator(chunk_size=10000)
+        for row in rows:
+            for kind, value in zip(KINDS, row):
+                if not value:
+                    continue
+                key = fold(value)
+                entry = counts[kind].get(key)
+                if entry is None:
+                    counts[kind][key] = [value, 1]
+                else:
+                    entry[1] += 1
+        return cls({kind: PrefixIndex(counts[kind]) for kind in KINDS})
+
+    def complete(self, prefix, kinds=KINDS, limit=10):
+        """
+        Return the most common values of the given kinds starting with
+        prefix (ignoring case), as dicts of value, kind and count.
+        """
+        prefix = fold(prefix)
+        matches = [
+            (count, kind, label)
+            for kind in kinds
+            for label, count in self.indexes[kind].complete(prefix, limit)
+        ]
+        matches.sort(key=lambda match: (-match[0], fold(match[2])))
+        return [{'value': label, 'kind': kind, 'count': count} for count, kind, label in matches[:limit]]
+
+
+autocomplete = ProcessIndex(Autocomplete.build, 'autocomplete')
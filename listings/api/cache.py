@@ -0,0 +1,143 @@
+"""
+Dataset versioning and cache keys for the houses endpoints.
+
+Every write to House bumps a dataset version kept in the DatasetVersion
+row, and every cached entry embeds the version in its key, so a write
+invalidates all of them at once and stale entries simply age out. The
+version is bumped in the writer's transaction, so every process, including
+one running an import, sees it move on exactly when the write commits.
+Entries live in the 'houses' cache when one is configured.
+"""
+import hashlib
+import json
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from . import metrics
+from .importer import FOLDED_FIELDS, fold
+from .models import DatasetVersion
+from .search import RelevanceOrderingFilter
+
+CACHE_ALIAS = 'houses'
+
+
+def dataset_version():
+    """Return the current dataset version, starting one if there is none."""
+    version = DatasetVersion.objects.filter(pk=DatasetVersion.ID).values_list('version', flat=True).first()
+    if version is None:
+        bump_dataset_version()
+        version = DatasetVersion.objects.values_list('version', flat=True).get(pk=DatasetVersion.ID)
+    return version
+
+
+def bump_dataset_version():
+    """
+    Start a new dataset version, invalidating everything cached under the
+    old one. Inside a transaction, the new version commits with it.
+    """
+    # Versions are nanosecond timestamps, so they keep increasing even if
+    # the row is lost, and Last-Modified can be derived from them
+    now = time.time_ns()
+    versions = DatasetVersion.objects.filter(pk=DatasetVersion.ID)
+    if not versions.update(version=Greatest(F('version') + 1, Value(now))):
+        DatasetVersion.objects.bulk_create([DatasetVersion(pk=DatasetVersion.ID, version=now)], ignore_conflicts=True)
+
+
+def house_cache():
+    """Return the cache that holds house data."""
+    return caches[CACHE_ALIAS] if CACHE_ALIAS in settings.CACHES else cache
+
+
+def cached(kind, key):
+    """Return the house cache entry under key, or None, recording the hit or miss."""
+    value = house_cache().get(key)
+    metrics.cache_requests.inc(kind=kind, result='miss' if value is None else 'hit')
+    return value
+
+
+def cache_timeout():
+    return getattr(settings, 'HOUSE_CACHE_TIMEOUT', 300)
+
+
+def cache_key(kind, signature, version=None):
+    """Return the cache key for a signature under a dataset version (default: the current one)."""
+    encoded = json.dumps(signature, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    digest = hashlib.blake2b(encoded, digest_size=16).hexdigest()
+    return f'houses:{kind}:{dataset_version() if version is None else version}:{digest}'
+
+
+def _canonical(name, value):
+    if isinstance(value, Decimal):
+        return format(value.normalize(), 'f')
+    if name in FOLDED_FIELDS:
+        return fold(value)
+    return str(value)
+
+
+def filter_signature(request, view):
+    """
+    Return the request's filters in canonical form: the filterset's cleaned
+    values with empty ones dropped, plus the search terms. Requests that
+    select the same rows get the same signature. Returns None for invalid
+    filters.
+    """
+    filterset = view.filterset_class(request.query_params, queryset=view.queryset, request=request)
+    if not filterset.is_valid():
+        return None
+    signature = {
+        name: _canonical(name, value)
+        for name, value in filterset.form.cleaned_data.items()
+        if value not in (None, '')
+    }
+    search = ' '.join(request.query_params.get('search', '').replace(',', ' ').lower().split())
+    if search:
+        signature['search'] = search
+    return signature
+
+
+def selected_fields(request):
+    """Return the fields requested with ?fields=, in order without repeats, or None for all."""
+    fields = request.query_params.get('fields')
+    return list(dict.fromkeys(name.strip() for name in fields.split(','))) if fields else None
+
+
+def detail_signature(request):
+    """Return everything that determines a detail response: its URL and selected fields."""
+    return {'url': request.build_absolute_uri(request.path), 'fields': selected_fields(request)}
+
+
+def list_signature(request, view):
+    """
+    Return everything that determines a list response in canonical form:
+    the filter signature, the effective ordering (the default filled in),
+    the page or cursor, the selected fields and the base URL that links are
+    built on. Returns None when the filters are invalid.
+    """
+    filters = filter_signature(request, view)
+    if filters is None:
+        return None
+    params = request.query_params
+    signature = {
+        'url': request.build_absolute_uri(request.path),
+        'filters': filters,
+        'ordering': RelevanceOrderingFilter().get_ordering(request, view.queryset, view),
+        'fields': selected_fields(request),
+    }
+    paginator = view.paginator
+    if paginator is not None:
+        if paginator.use_keyset(request):
+            cursor_param = paginator.keyset_class.cursor_query_param
+            signature['cursor'] = params.get(cursor_param, '')
+        else:
+            signature['page'] = params.get(paginator.page_query_param) or '1'
+    return signature
+
+
+def etag(signature, version, media_type):
+    """Return a quoted strong ETag for a response's signature under a dataset version and media type."""
+    encoded = json.dumps([version, media_type, signature], sort_keys=True, separators=(',', ':'))
+    return '"%s"' % hashlib.blake2b(encoded.encode('utf-8'), digest_size=16).hexdigest()
@@ -0,0 +1,251 @@
+"""
+Column-at-a-time cleaning for the house data import.
+
+Rows are cleaned in blocks. Each numeric column in the block is parsed at
+once with NumPy, working on the matrix of code points so no per-cell Python
+parsing happens. The fast path covers cells in the shapes the feed actually
+uses: plain digits with at most one '.', an optional '$' and ',' and a K/M
+suffix on prices, and zero-padded MM/DD/YYYY dates. Every other non-empty
+cell goes through the per-cell cleaner in api.importer, so the output is
+identical to importer.iter_records.
+"""
+import csv
+from decimal import Decimal
+
+import numpy as np
+
+from .importer import (
+    DATE_FIELDS, FLOAT_FIELDS, HASHED_FIELDS, INT_FIELDS, NORMALIZERS, PRICE_FIELDS, STRING_FIELDS,
+    clean_date, clean_float, clean_int, clean_price, folded_fields, hash_values, iter_lines,
+)
+
+# Rows cleaned together; bounds the memory held per block
+BLOCK_ROWS = 10000
+
+# Longest digit string parsed on the fast path, so values stay exact in
+# int64 and float64
+MAX_DIGITS = 15
+
+ZERO = ord('0')
+NINE = ord('9')
+POW10 = 10 ** np.arange(19, dtype=np.int64)
+POW10_FLOAT = 10.0 ** np.arange(19)
+MULTIPLIER_DIGITS = {ord('K'): 3, ord('M'): 6}
+
+# Cleaned in the same order as importer.clean_row so the first error
+# reported for a row is the same
+CLEANED_FIELDS = PRICE_FIELDS + DATE_FIELDS + INT_FIELDS + FLOAT_FIELDS
+
+
+def _codepoints(values):
+    """Return the (n, width) code point matrix of a fixed-width str array."""
+    values = np.ascontiguousarray(values)
+    width = values.dtype.itemsize // 4
+    return values.view(np.uint32).reshape(len(values), width).astype(np.int64)
+
+
+def _parse_numbers(codepoints, length):
+    """
+    Parse the first length characters of each row as digits with at most one '.'.
+
+    Returns (ok, coefficient, scale, digits) arrays where, for rows that
+    are ok, the value is coefficient / 10 ** scale.
+    """
+    in_string = np.arange(codepoints.shape[1]) < length[:, None]
+    is_digit = (codepoints >= ZERO) & (codepoints <= NINE) & in_string
+    is_dot = (codepoints == ord('.')) & in_string
+    digits = is_digit.sum(axis=1)
+    dots = is_dot.sum(axis=1)
+    ok = (digits + dots == length) & (dots <= 1) & (digits > 0) & (digits <= MAX_DIGITS)
+
+    # Place value of each digit is the number of digits to its right
+    places = np.cumsum(is_digit[:, ::-1], axis=1)[:, ::-1] - is_digit
+    coefficient = np.where(
+        is_digit & ok[:, None], (codepoints - ZERO) * POW10[np.minimum(places, 18)], 0
+    ).sum(axis=1)
+    scale = np.where(dots == 1, length - np.argmax(is_dot, axis=1) - 1, 0)
+    return ok, coefficient, scale, digits
+
+
+def _prepare(values):
+    """Strip a column and return (stripped, empty) arrays; None counts as empty."""
+    stripped = np.char.strip(np.array(['' if value is None else value for value in values], dtype=str))
+    return stripped, np.char.str_len(stripped) == 0
+
+
+def _finish(values, result, fast, empty, cleaner, errors):
+    """Run cleaner on every cell that is neither empty nor handled by the fast path."""
+    for i in np.flatnonzero(~fast & ~empty).tolist():
+        try:
+            result[i] = cleaner(values[i])
+        except Exception as e:
+            if errors[i] is None:
+                errors[i] = str(e)
+    return result
+
+
+def clean_price_column(values, errors):
+    """Column version of importer.clean_price."""
+    stripped, empty = _prepare(values)
+    stripped = np.char.replace(np.char.replace(stripped, '$', ''), ',', '')
+    codepoints = _codepoints(stripped)
+    length = np.char.str_len(stripped)
+
+    last = codepoints[np.arange(len(values)), np.maximum(length - 1, 0)]
+    exponent = np.zeros(len(values), dtype=np.int64)
+    for suffix, suffix_digits in MULTIPLIER_DIGITS.items():
+        exponent[(last == suffix) & (length > 0)] = suffix_digits
+    length = length - (exponent > 0)
+
+    ok, coefficient, scale, digits = _parse_numbers(codepoints, length)
+    fast = ok & ~empty & (digits + exponent <= 18)
+    coefficient = np.where(fast, coefficient * POW10[exponent], 0)
+
+    result = [None] * len(values)
+    for i, value, places in zip(
+        np.flatnonzero(fast).tolist(), coefficient[fast].tolist(), scale[fast].tolist()
+    ):
+        # Decimal(digits) * multiplier keeps the digits' exponent, e.g. 1.2M -> 1200000.0
+        result[i] = Decimal(value).scaleb(-places) if places else Decimal(value)
+    return _finish(values, result, fast, empty, clean_price, errors)
+
+
+def clean_date_column(values, errors):
+    """Column version of importer.clean_date."""
+    stripped, empty = _prepare(values)
+    codepoints = _codepoints(stripped)
+    length = np.char.str_len(stripped)
+    result = [None] * len(values)
+    if codepoints.shape[1] < 10:
+        return _finish(values, result, np.zeros(len(values), dtype=bool), empty, clean_date, errors)
+
+    codepoints = codepoints[:, :10]
+    digit_columns = [0, 1, 3, 4, 6, 7, 8, 9]
+    digits = codepoints[:, digit_columns] - ZERO
+    fast = (
+        (length == 10)
+        & (codepoints[:, 2] == ord('/')) & (codepoints[:, 5] == ord('/'))
+        & np.all((digits >= 0) & (digits <= 9), axis=1)
+    )
+    month = digits[:, 0] * 10 + digits[:, 1]
+    day = digits[:, 2] * 10 + digits[:, 3]
+    year = digits[:, 4] * 1000 + digits[:, 5] * 100 + digits[:, 6] * 10 + digits[:, 7]
+    fast &= (month >= 1) & (month <= 12) & (day >= 1) & (year >= 1)
+
+    month_start = (
+        np.where(fast, year - 1970, 0).astype('datetime64[Y]').astype('datetime64[M]')
+        + np.where(fast, month - 1, 0)
+    )
+    dates = month_start.astype('datetime64[D]') + np.where(fast, day - 1, 0)
+    # Days past the end of the month roll over; leave those to strptime
+    fast &= dates.astype('datetime64[M]') == month_start
+
+    for i, value in zip(np.flatnonzero(fast).tolist(), dates[fast].astype(object).tolist()):
+        result[i] = value
+    return _finish(values, result, fast, empty, clean_date, errors)
+
+
+def _number_column(values):
+    """Parse a column as floats, returning (result, fast, empty, floats) for the caller to finish."""
+    stripped, empty = _prepare(values)
+    ok, coefficient, scale, _ = _parse_numbers(_codepoints(stripped), np.char.str_len(stripped))
+    fast = ok & ~empty
+    # Both operands are exact, so the quotient is the correctly rounded value
+    # that float() would return for the same digits
+    floats = coefficient.astype(np.float64) / POW10_FLOAT[scale]
+    return [None] * len(values), fast, empty, floats
+
+
+def clean_int_column(values, errors):
+    """Column version of importer.clean_int."""
+    result, fast, empty, floats = _number_column(values)
+    for i, value in zip(np.flatnonzero(fast).tolist(), np.trunc(floats[fast]).astype(np.int64).tolist()):
+        result[i] = value
+    return _finish(values, result, fast, empty, clean_int, errors)
+
+
+def clean_float_column(values, errors):
+    """Column version of importer.clean_float."""
+    result, fast, empty, floats = _number_column(values)
+    for i, value in zip(np.flatnonzero(fast).tolist(), floats[fast].tolist()):
+        result[i] = value
+    return _finish(values, result, fast, empty, clean_float, errors)
+
+
+COLUMN_CLEANERS = {
+    **{name: clean_price_column for name in PRICE_FIELDS},
+    **{name: clean_date_column for name in DATE_FIELDS},
+    **{name: clean_int_column for name in INT_FIELDS},
+    **{name: clean_float_column for name in FLOAT_FIELDS},
+}
+
+
+def _normalize_column(name, values, errors):
+    """
+    Normalize a column for the content hash. A value that cannot be (say a
+    price too large to quantize) fails its row with the error
+    importer.content_hash would raise, unless the row failed already.
+    """
+    normalize = NORMALIZERS[name]
+    result = []
+    for i, value in enumerate(values):
+        if value is not None and errors[i] is None:
+            try:
+                value = normalize(value)
+            except Exception as e:
+                errors[i] = str(e)
+                value = None
+        result.append(value)
+    return result
+
+
+def clean_block(block, fieldnames):
+    """
+    Clean a block of (end_offset, row) pairs, where each row is a list of
+    raw cells, into the records produced by importer.iter_records.
+    """
+    index = {name: i for i, name in enumerate(fieldnames)}
+    rows = [row for _, row in block]
+    errors = [None] * len(rows)
+
+    def column(name):
+        # Mirror DictReader: a missing column reads as '', a short row as None
+        if name not in index:
+            return [''] * len(rows)
+        i = index[name]
+        return [row[i] if i < len(row) else None for row in rows]
+
+    names = CLEANED_FIELDS + STRING_FIELDS
+    columns = [COLUMN_CLEANERS[name](column(name), errors) for name in CLEANED_FIELDS]
+    columns += [column(name) for name in STRING_FIELDS]
+    zillow_ids = column('zillow_id') if 'zillow_id' in index else [None] * len(rows)
+
+    # Normalize the content hash inputs a column at a time as well
+    by_name = dict(zip(names, columns))
+    hash_columns = [_normalize_column(name, by_name[name], errors) for name in HASHED_FIELDS]
+
+    for (end_offset, _), zillow_id, error, values, hash_input in zip(
+        block, zillow_ids, errors, zip(*columns), zip(*hash_columns)
+    ):
+        if error is not None:
+            yield end_offset, zillow_id, None, error
+            continue
+        fields = dict(zip(names, values))
+        fields.update(folded_fields(fields))
+        fields['content_hash'] = hash_values(list(hash_input))
+        yield end_offset, zillow_id, fields, None
+
+
+def iter_records_columnar(file, fieldnames, offset, block_rows=BLOCK_ROWS):
+    """Columnar counterpart of importer.iter_records, cleaning block_rows rows at a time."""
+    position = [offset]
+    block = []
+    for row in csv.reader(iter_lines(file, position), skipinitialspace=True):
+        if not row:
+            continue
+        block.append((position[0], row))
+        if len(block) >= block_rows:
+            yield from clean_block(block, fieldnames)
+            block = []
+    if block:
+        yield from clean_block(block, fieldnames)
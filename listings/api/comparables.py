@@ -0,0 +1,105 @@
+"""
+In-memory nearest neighbour search behind the comparables action.
+
+Every listing is a row of a NumPy feature matrix: bedrooms, bathrooms, home
+size, property size, year built and price, with the sizes and price on a
+log scale, each standardized to unit variance and missing values set to the
+mean. Rows are sorted by state and zipcode, so the listings in a zipcode or
+a state are one contiguous block, and a search is a vectorized brute force
+distance over just that block.
+
+The index is built per process from the database and rebuilt as the
+listings change (see api.indexes).
+"""
+import numpy as np
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+
+from .indexes import ProcessIndex
+from .models import House
+
+FEATURES = ['bedrooms', 'bathrooms', 'home_size', 'property_size', 'year_built', 'price']
+
+# Skewed features compared by ratio rather than difference
+LOG_FEATURES = ['home_size', 'property_size', 'price']
+
+SCOPES = ['zipcode', 'state']
+
+# Largest number of comparables a search may ask for
+MAX_K = 50
+
+
+class Comparables:
+    """Standardized feature matrix of every listing, in (state, zipcode) blocks."""
+    def __init__(self, ids, matrix, center, scale, blocks):
+        self.ids = ids
+        self.matrix = matrix
+        self.center = center
+        self.scale = scale
+        # scope -> group key -> (start, end) rows
+        self.blocks = blocks
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def transform(matrix):
+        """Put raw feature rows on the comparison scale, in place."""
+        logged = [FEATURES.index(name) for name in LOG_FEATURES]
+        with np.errstate(invalid='ignore'):
+            matrix[:, logged] = np.log1p(np.maximum(matrix[:, logged], 0))
+        return matrix
+
+    @classmethod
+    def build(cls):
+        casts = [Cast(name, FloatField()) for name in FEATURES]
+        rows = (
+            House.objects.order_by('state_key', 'zipcode', 'id')
+            .values_list('id', 'state_key', 'zipcode', *casts)
+            .iterator(chunk_size=10000)
+        )
+        ids, features = [], []
+        blocks = {scope: {} for scope in SCOPES}
+        for i, (pk, state, zipcode, *values) in enumerate(rows):
+            ids.append(pk)
+            features.append(values)
+            for scope, key in (('state', state), ('zipcode', (state, zipcode))):
+                start, _ = blocks[scope].get(key, (i, i))
+                blocks[scope][key] = (start, i + 1)
+
+        # None becomes NaN
+        matrix = cls.transform(np.array(features, dtype=np.float64).reshape(-1, len(FEATURES)))
+        if len(matrix):
+            center = np.nan_to_num(np.nanmean(matrix, axis=0))
+            scale = np.nan_to_num(np.nanstd(matrix, axis=0))
+        else:
+            center, scale = np.zeros(len(FEATURES)), np.ones(len(FEATURES))
+        scale[scale == 0] = 1
+        matrix = np.nan_to_num((matrix - center) / scale).astype(np.float32)
+        return cls(np.array(ids, dtype=np.int64), matrix, center, scale, blocks)
+
+    def vector(self, house):
+        """Return a house's features on the comparison scale."""
+        values = [getattr(house, name) for name in FEATURES]
+        row = self.transform(np.array([values], dtype=np.float64))[0]
+        return np.nan_to_num((row - self.center) / self.scale).astype(np.float32)
+
+    def nearest(self, house, scope='zipcode', k=10):
+        """
+        Return the (id, distance) of up to k listings most like house in its
+        zipcode or state, nearest first, leaving out the house itself.
+        """
+        key = house.state_key if scope == 'state' else (house.state_key, house.zipcode)
+        start, end = self.blocks[scope].get(key, (0, 0))
+        if start == end:
+            return []
+        distances = np.square(self.matrix[start:end] - self.vector(house)).sum(axis=1)
+        distances[self.ids[start:end] == house.pk] = np.inf
+        k = min(k, end - start)
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+        nearest = nearest[np.isfinite(distances[nearest])]
+        return [(int(self.ids[start + i]), float(np.sqrt(distances[i]))) for i in nearest]
+
+
+comparables = ProcessIndex(Comparables.build, 'comparables')
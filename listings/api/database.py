@@ -0,0 +1,46 @@
+"""
+SQLite connection tuning and read/write routing.
+
+Each database alias may list PRAGMAs to run on every new SQLite connection
+under a PRAGMAS key (see the production profile in settings). With WAL,
+readers never wait on a writer, so the production profile also opens a
+'replica' alias on the same file with query_only set: ReadReplicaRouter
+sends reads there and writes to 'default', so API reads keep their own
+connections, and keep flowing, while import_house_data writes.
+"""
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+REPLICA = 'replica'
+
+
+@receiver(connection_created)
+def apply_pragmas(sender, connection, **kwargs):
+    pragmas = connection.settings_dict.get('PRAGMAS')
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    for name, value in pragmas.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+class ReadReplicaRouter:
+    """
+    Reads from the read-only 'replica' alias and writes to 'default'.
+    Reads inside a transaction on 'default' stay there, so they see its
+    uncommitted writes.
+    """
+    def db_for_read(self, model, **hints):
+        if connections['default'].in_atomic_block:
+            return 'default'
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases are the same database
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
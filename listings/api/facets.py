@@ -0,0 +1,77 @@
+"""
+Facet counts for the houses list: how many of the filtered houses have each
+home type, bedroom count, bathroom count and city, and fall in each price
+bucket.
+
+All facets come from one GROUP BY over their combined values, which the
+database answers in a single scan of the filtered rows; the per-facet
+counts are then summed up from the (much smaller) grouped result.
+"""
+from django.db.models import Case, Count, IntegerField, Value, When
+
+from .importer import fold
+
+FACET_FIELDS = ['home_type', 'bedrooms', 'bathrooms', 'city']
+
+# Facets whose values are matched case-insensitively by their filter; their
+# counts are merged by case-folded value
+FOLDED_FACETS = {'home_type', 'city'}
+
+# Upper bounds of the price buckets; the last bucket has no upper bound
+PRICE_BUCKETS = [100000, 200000, 300000, 400000, 500000, 750000, 1000000, 2000000]
+
+
+def price_bucket(edges):
+    """Return an expression numbering the price bucket of each row (NULL for no price)."""
+    return Case(
+        *(When(price__lt=edge, then=Value(i)) for i, edge in enumerate(edges)),
+        When(price__isnull=False, then=Value(len(edges))),
+        output_field=IntegerField(),
+    )
+
+
+def facet_counts(queryset, fields=FACET_FIELDS, edges=PRICE_BUCKETS):
+    """
+    Return the total and per-facet counts of a queryset. Facet values are
+    ordered by count (most first), except numeric ones which are in value
+    order; price buckets are {min, max, count} with min inclusive and max
+    exclusive. Houses without a price are left out of the price buckets.
+    """
+    groups = (
+        queryset.order_by()
+        .values(*fields, price_bucket=price_bucket(edges))
+        .annotate(count=Count('id'))
+        .values_list(*fields, 'price_bucket', 'count')
+    )
+
+    total = 0
+    counts = {name: {} for name in fields}
+    labels = {name: {} for name in FOLDED_FACETS}
+    buckets = [0] * (len(edges) + 1)
+    for *values, bucket, count in groups:
+        total += count
+        for name, value in zip(fields, values):
+            if name in FOLDED_FACETS:
+                key = fold(value)
+                labels[name].setdefault(key, value)
+            else:
+                key = value
+            counts[name][key] = counts[name].get(key, 0) + count
+        if bucket is not None:
+            buckets[bucket] += count
+
+    facets = {'count': total}
+    for name in fields:
+        if name in FOLDED_FACETS:
+            items = sorted(counts[name].items(), key=lambda item: (-item[1], item[0]))
+            facets[name] = [{'value': labels[name][key], 'count': count} for key, count in items]
+        else:
+            # None (unknown) sorts last
+            items = sorted(counts[name].items(), key=lambda item: (item[0] is None, item[0] or 0))
+            facets[name] = [{'value': value, 'count': count} for value, count in items]
+    bounds = [0, *edges, None]
+    facets['price'] = [
+        {'min': bounds[i], 'max': bounds[i + 1], 'count': count}
+        for i, count in enumerate(buckets)
+    ]
+    return facets
@@ -0,0 +1,240 @@
+"""
+CSV parsing and cleaning for the house data import.
+
+Nothing in this module touches the ORM, so the functions can run in worker
+processes without a configured Django project.
+"""
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+
+# Target size of the byte ranges handed to worker processes
+CHUNK_BYTES = 4 * 1024 * 1024
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+PRICE_FIELDS = [
+    'last_sold_price', 'price', 'rent_price', 'rentzestimate_amount', 'tax_value', 'zestimate_amount',
+]
+DATE_FIELDS = ['last_sold_date', 'rentzestimate_last_updated', 'zestimate_last_updated']
+INT_FIELDS = ['bedrooms', 'home_size', 'property_size', 'tax_year', 'year_built']
+FLOAT_FIELDS = ['bathrooms']
+STRING_FIELDS = ['area_unit', 'home_type', 'link', 'zillow_id', 'address', 'city', 'state', 'zipcode']
+HASHED_FIELDS = sorted(PRICE_FIELDS + DATE_FIELDS + INT_FIELDS + FLOAT_FIELDS + STRING_FIELDS)
+# Case-insensitive filters match on case-folded copies of these fields
+FOLDED_FIELDS = {'city': 'city_key', 'state': 'state_key', 'home_type': 'home_type_key'}
+
+CENT = Decimal('0.01')
+
+
+def clean_price(price_str):
+    """Clean price string by removing $, K, M and converting to decimal."""
+    if not price_str or price_str.strip() == '':
+        return None
+
+    # Remove $ and whitespace
+    price_str = price_str.strip().replace('$', '').replace(',', '')
+
+    # Handle K (thousands) and M (millions)
+    multiplier = 1
+    if price_str.endswith('K'):
+        multiplier = 1000
+        price_str = price_str[:-1]
+    elif price_str.endswith('M'):
+        multiplier = 1000000
+        price_str = price_str[:-1]
+
+    try:
+        return Decimal(price_str) * multiplier
+    except (ValueError, TypeError):
+        return None
+
+
+def clean_date(date_str):
+    """Convert date string to datetime object."""
+    if not date_str or date_str.strip() == '':
+        return None
+    try:
+        return datetime.strptime(date_str.strip(), '%m/%d/%Y').date()
+    except (ValueError, TypeError):
+        return None
+
+
+def clean_int(value):
+    """Convert string to integer, handling empty values."""
+    if not value or value.strip() == '':
+        return None
+    try:
+        return int(float(value))
+    except (ValueError, TypeError):
+        return None
+
+
+def clean_float(value):
+    """Convert string to float, handling empty values."""
+    if not value or value.strip() == '':
+        return None
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _normalize_price(value):
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return format(value.quantize(CENT), 'f')
+
+
+# Render each field the same way whether it came from the CSV or the database
+NORMALIZERS = {
+    **{name: _normalize_price for name in PRICE_FIELDS},
+    **{name: lambda value: repr(float(value)) for name in FLOAT_FIELDS},
+    **{name: int for name in INT_FIELDS},
+    **{name: str for name in DATE_FIELDS + STRING_FIELDS},
+}
+
+
+def normalize(name, value):
+    """Render a field value the same way whether it came from the CSV or the database."""
+    return None if value is None else NORMALIZERS[name](value)
+
+
+def hash_values(values):
+    """Return a stable hex digest of normalized values in HASHED_FIELDS order."""
+    return hashlib.blake2b(json.dumps(values).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def content_hash(fields):
+    """Return a stable hex digest of the listing content in a field dict."""
+    return hash_values([normalize(name, fields.get(name)) for name in HASHED_FIELDS])
+
+
+def fold(value):
+    """Return the case-folded form of a string used for case-insensitive matching."""
+    # lower() rather than casefold() keeps the length within the column size
+    return (value or '').lower()
+
+
+def folded_fields(fields):
+    """Return the case-folded shadow columns for a field dict."""
+    return {key: fold(fields.get(name)) for name, key in FOLDED_FIELDS.items()}
+
+
+def clean_row(row):
+    """Convert a raw CSV row into keyword arguments for House."""
+    fields = {name: clean_price(row.get(name, '')) for name in PRICE_FIELDS}
+    fields.update((name, clean_date(row.get(name, ''))) for name in DATE_FIELDS)
+    fields.update((name, clean_int(row.get(name, ''))) for name in INT_FIELDS)
+    fields.update((name, clean_float(row.get(name, ''))) for name in FLOAT_FIELDS)
+    fields.update((name, row.get(name, '')) for name in STRING_FIELDS)
+    fields.update(folded_fields(fields))
+    fields['content_hash'] = content_hash(fields)
+    return fields
+
+
+def is_gzip(path):
+    """Return True if the file starts with the gzip magic number."""
+    with open(path, 'rb') as file:
+        return file.read(2) == GZIP_MAGIC
+
+
+def open_source(path):
+    """Open a plain or gzip-compressed CSV file for binary reading."""
+    return gzip.open(path, 'rb') if is_gzip(path) else open(path, 'rb')
+
+
+def read_header(file):
+    """
+    Read the CSV column names from the start of an open binary file.
+
+    Returns the column names and the byte offset where the data starts.
+    """
+    line = file.readline()
+    fieldnames = next(csv.reader([line.decode('utf-8')], skipinitialspace=True))
+    return [name.strip() for name in fieldnames], len(line)
+
+
+def iter_lines(file, position):
+    """
+    Decode lines from an open binary file, advancing position[0] by the size
+    of each line as it is consumed.
+    """
+    for raw in file:
+        position[0] += len(raw)
+        yield raw.decode('utf-8')
+
+
+def iter_records(file, fieldnames, offset):
+    """
+    Stream and clean rows from an open binary file positioned at offset.
+
+    Yields (end_offset, zillow_id, fields, error) tuples, where end_offset is
+    the byte position just past the row and exactly one of fields and error
+    is None. Only the current row is held in memory.
+    """
+    position = [offset]
+    for row in csv.DictReader(iter_lines(file, position), fieldnames=fieldnames, skipinitialspace=True):
+        try:
+            yield position[0], row.get('zillow_id'), clean_row(row), None
+        except Exception as e:
+            yield position[0], row.get('zillow_id'), None, str(e)
+
+
+def split_byte_ranges(path, data_start, count):
+    """
+    Split the data section of a file into roughly equal (start, end) byte
+    ranges, each beginning at the start of a line.
+    """
+    size = os.path.getsize(path)
+    step = max((size - data_start) // count, 1)
+    boundaries = [data_start]
+    with open(path, 'rb') as file:
+        for i in range(1, count):
+            file.seek(data_start + i * step)
+            file.readline()
+            position = file.tell()
+            if boundaries[-1] < position < size:
+                boundaries.append(position)
+    boundaries.append(size)
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def parse_range(path, fieldnames, start, end, records=iter_records):
+    """Parse and clean the rows in a byte range. Runs in a worker process."""
+    with open(path, 'rb') as file:
+        file.seek(start)
+        data = file.read(end - start)
+    return list(records(io.BytesIO(data), fieldnames, start))
+
+
+def iter_records_parallel(path, fieldnames, offset, workers, records=iter_records):
+    """
+    Parse and clean a plain CSV file from offset in a pool of worker processes.
+
+    The file is split into byte ranges on line boundaries, so quoted fields
+    must not contain newlines. Each range is cleaned with the records
+    function (iter_records or a drop-in replacement). Records are yielded in
+    file order, with a bounded number of ranges in flight so that parsing
+    overlaps with whatever the caller does with each record.
+    """
+    size = os.path.getsize(path)
+    if offset >= size:
+        return
+    ranges = split_byte_ranges(path, offset, max(workers, -(-(size - offset) // CHUNK_BYTES)))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for start, end in ranges:
+            pending.append(pool.submit(parse_range, path, fieldnames, start, end, records))
+            if len(pending) > workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
@@ -0,0 +1,70 @@
+"""
+Per-process in-memory indexes built from the listings.
+
+A ProcessIndex builds its index on first use and tags it with the dataset
+version, so imports and other writes are picked up once the version moves
+on. Reading the version is a query, so it is checked at most once per
+VERSION_CHECK_INTERVAL seconds. A stale index keeps answering while its
+replacement is built in a background thread, at most once per
+HOUSE_INDEX_REFRESH_INTERVAL seconds; with an interval of 0 the version is
+checked, and the index rebuilt, before every answer instead.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from .cache import dataset_version
+
+VERSION_CHECK_INTERVAL = 1.0
+
+
+class ProcessIndex:
+    """Holds the index returned by build(), rebuilding it as the dataset changes."""
+    def __init__(self, build, name):
+        self.build = build
+        self.name = name
+        self.current = None
+        self.version = None
+        self.built_at = None
+        self.checked_at = None
+        self.lock = threading.Lock()
+        self.refreshing = False
+
+    def load(self, version):
+        index = self.build()
+        self.current, self.version, self.built_at = index, version, time.monotonic()
+        return index
+
+    def refresh(self, version):
+        try:
+            self.load(version)
+        finally:
+            self.refreshing = False
+            connections.close_all()
+
+    def get(self):
+        """Return the index, building or refreshing it as needed."""
+        current = self.current
+        interval = getattr(settings, 'HOUSE_INDEX_REFRESH_INTERVAL', 60)
+        now = time.monotonic()
+        if current is not None and interval > 0 and now - self.checked_at < VERSION_CHECK_INTERVAL:
+            return current
+        version = dataset_version()
+        self.checked_at = now
+        if current is not None and self.version == version:
+            return current
+
+        if current is None or interval <= 0:
+            with self.lock:
+                if self.current is None or self.version != version:
+                    return self.load(version)
+                return self.current
+
+        with self.lock:
+            if self.refreshing or time.monotonic() - self.built_at < interval:
+                return current
+            self.refreshing = True
+        threading.Thread(target=self.refresh, args=(version,), name=f'{self.name}-refresh', daemon=True).start()
+        return current
@@ -0,0 +1,73 @@
+"""
+Structured, non-blocking logging.
+
+JSONFormatter writes each record as one JSON object per line, with any
+extra= fields as keys. BackgroundHandler puts records on a queue and
+returns at once; a listener thread hands them to the real handlers (files,
+streams), so a slow disk never stalls a request.
+"""
+import atexit
+import copy
+import json
+import logging
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else came in through extra=
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats a record as a single line of JSON."""
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        data.update((name, value) for name, value in vars(record).items() if name not in RECORD_ATTRIBUTES)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exception'] = record.exc_text
+        return json.dumps(data, default=str)
+
+
+class BackgroundHandler(QueueHandler):
+    """
+    Queues records for a listener thread that passes them to handlers.
+
+    Configure it after the handlers it wraps, referring to them as
+    'cfg://handlers.<name>'; dictConfig sets up handlers in name order, so
+    the wrapped handlers' names must sort before this one's.
+    """
+    def __init__(self, handlers=()):
+        super().__init__(queue.SimpleQueue())
+        # Index rather than iterate so dictConfig resolves cfg:// references
+        handlers = [handlers[i] for i in range(len(handlers))]
+        self.listener = QueueListener(self.queue, *handlers, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.close)
+
+    def prepare(self, record):
+        """
+        Merge the arguments into the message and render any traceback now,
+        as the record is handled after the caller has moved on, but keep
+        the extra fields for the formatters downstream.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def close(self):
+        # Flush what is queued to the wrapped handlers before shutting down
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        super().close()
@@ -1,136 +1,325 @@
-import csv
-from datetime import datetime
-from decimal import Decimal
+import os
+import time
+from collections import Counter
 from django.core.management.base import BaseCommand, CommandError
-from api.models import House
+from django.db import DatabaseError, connections, router, transaction
+from api import columnar, importer, metrics
+from api.cache import bump_dataset_version
+from api.models import House, ImportCheckpoint, MarketStats
+from api.stats import GROUP_COLUMNS, listing_groups, refresh_market_stats
+
+# Every column except the primary key and the upsert key is refreshed on update
+UPDATE_FIELDS = [
+    field.name for field in House._meta.concrete_fields
+    if not field.primary_key and field.name != 'zillow_id'
+]
+
+# House columns that place a listing in its market stats groups
+GROUP_FIELDS = sorted({name for columns in GROUP_COLUMNS.values() for name in columns if name})
+
+# Backends that support INSERT ... ON CONFLICT DO UPDATE; others fall back to
+# bulk_create/bulk_update
+UPSERT_VENDORS = ('sqlite', 'postgresql')
 
 class Command(BaseCommand):
     help = 'Imports house data from a CSV file'
 
     def add_arguments(self, parser):
         parser.add_argument('csv_file', type=str, help='Path to the CSV file containing house data')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of rows upserted per transaction (default: 1000)'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Number of processes used to parse and clean the CSV file (default: 1)'
+        )
+        parser.add_argument(
+            '--columnar', action='store_true',
+            help='Clean rows a block at a time with vectorized column parsers'
+        )
+        parser.add_argument(
+            '--delta', action='store_true',
+            help='Skip rows whose content hash matches the stored listing'
+        )
+        parser.add_argument(
+            '--delete-missing', action='store_true',
+            help='Delete listings whose zillow_id does not appear in the file'
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Continue from the last checkpoint committed by an interrupted import of the same file'
+        )
 
-    def clean_price(self, price_str):
-        """Clean price string by removing $, K, M and converting to decimal."""
-        if not price_str or price_str.strip() == '':
-            return None
-        
-        # Remove $ and whitespace
-        price_str = price_str.strip().replace('$', '').replace(',', '')
-        
-        # Handle K (thousands) and M (millions)
-        multiplier = 1
-        if price_str.endswith('K'):
-            multiplier = 1000
-            price_str = price_str[:-1]
-        elif price_str.endswith('M'):
-            multiplier = 1000000
-            price_str = price_str[:-1]
-        
-        try:
-            return Decimal(price_str) * multiplier
-        except (ValueError, TypeError):
-            return None
-
-    def clean_date(self, date_str):
-        """Convert date string to datetime object."""
-        if not date_str or date_str.strip() == '':
-            return None
-        try:
-            return datetime.strptime(date_str.strip(), '%m/%d/%Y').date()
-        except (ValueError, TypeError):
-            return None
-
-    def clean_int(self, value):
-        """Convert string to integer, handling empty values."""
-        if not value or value.strip() == '':
-            return None
-        try:
-            return int(float(value))
-        except (ValueError, TypeError):
-            return None
-
-    def clean_float(self, value):
-        """Convert string to float, handling empty values."""
-        if not value or value.strip() == '':
-            return None
+    # The cleaners live in api.importer so worker processes can use them
+    clean_price = staticmethod(importer.clean_price)
+    clean_date = staticmethod(importer.clean_date)
+    clean_int = staticmethod(importer.clean_int)
+    clean_float = staticmethod(importer.clean_float)
+
+    # Market stats groups of the listings written or deleted so far, as
+    # (dimension, state_key, value_key); None when not being tracked
+    stats_groups = None
+
+    def upsert(self, rows, stats):
+        """
+        Insert or update cleaned rows keyed on zillow_id, counting the outcome in stats.
+
+        When the same zillow_id appears more than once, the last row wins and
+        the earlier ones count as updates. In delta mode, rows whose content
+        hash matches the stored one are left untouched.
+        """
+        by_zillow_id = {fields['zillow_id']: fields for fields in rows}
+        existing = {
+            zillow_id: (pk, stored_hash, dict(zip(GROUP_FIELDS, groups)))
+            for zillow_id, pk, stored_hash, *groups in House.objects.filter(
+                zillow_id__in=list(by_zillow_id)
+            ).values_list('zillow_id', 'id', 'content_hash', *GROUP_FIELDS)
+        }
+        if self.delta:
+            for zillow_id, (pk, stored_hash, _) in existing.items():
+                if by_zillow_id[zillow_id]['content_hash'] == stored_hash:
+                    del by_zillow_id[zillow_id]
+                    stats['unchanged'] += 1
+
+        to_create = []
+        to_update = []
+        for zillow_id, fields in by_zillow_id.items():
+            if zillow_id in existing:
+                to_update.append(House(id=existing[zillow_id][0], **fields))
+            else:
+                to_create.append(House(**fields))
+        stats['created'] += len(to_create)
+        stats['updated'] += len(to_update) + len(rows) - len({fields['zillow_id'] for fields in rows})
+        if self.stats_groups is not None:
+            # Updated listings leave their old groups as well as joining new ones
+            for zillow_id, fields in by_zillow_id.items():
+                self.stats_groups |= listing_groups(fields)
+                if zillow_id in existing:
+                    self.stats_groups |= listing_groups(existing[zillow_id][2])
+
+        connection = connections[router.db_for_write(House)]
+        if connection.vendor in UPSERT_VENDORS:
+            self.execute_upsert(connection, to_create + to_update)
+        else:
+            House.objects.bulk_create(to_create)
+            House.objects.bulk_update(to_update, UPDATE_FIELDS)
+
+    def execute_upsert(self, connection, houses):
+        """Write houses with a single INSERT ... ON CONFLICT (zillow_id) DO UPDATE statement."""
+        if not houses:
+            return
+        fields = [House._meta.get_field(name) for name in ['zillow_id'] + UPDATE_FIELDS]
+        quote = connection.ops.quote_name
+        columns = [quote(field.column) for field in fields]
+        sql = (
+            f'INSERT INTO {quote(House._meta.db_table)} ({", ".join(columns)}) '
+            f'VALUES ({", ".join(["%s"] * len(columns))}) '
+            f'ON CONFLICT ({quote("zillow_id")}) DO UPDATE SET '
+            + ', '.join(f'{column} = excluded.{column}' for column in columns[1:])
+        )
+        params = [
+            [field.get_db_prep_save(field.pre_save(house, add=True), connection) for field in fields]
+            for house in houses
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, params)
+
+    def write_batch(self, batch, stats, position):
+        """
+        Upsert a batch of (zillow_id, fields) pairs in a single transaction,
+        committing a new dataset version and the checkpoint for position
+        along with it.
+
+        If the batch is rejected by the database, it is retried one row at a
+        time so that only the offending rows are reported and skipped.
+        """
+        batch_stats = Counter()
         try:
-            return float(value)
-        except (ValueError, TypeError):
-            return None
+            with transaction.atomic(using=router.db_for_write(House)):
+                self.upsert([fields for _, fields in batch], batch_stats)
+                self.invalidate(batch_stats)
+                self.save_checkpoint(position)
+            stats.update(batch_stats)
+            return
+        except DatabaseError:
+            batch_stats = Counter()
+
+        for zillow_id, fields in batch:
+            row_stats = Counter()
+            try:
+                with transaction.atomic(using=router.db_for_write(House)):
+                    self.upsert([fields], row_stats)
+                stats.update(row_stats)
+                batch_stats.update(row_stats)
+            except DatabaseError as e:
+                self.stdout.write(self.style.WARNING(
+                    f"Error processing row: {zillow_id or 'unknown'} - {str(e)}"
+                ))
+                stats['skipped'] += 1
+        with transaction.atomic(using=router.db_for_write(House)):
+            self.invalidate(batch_stats)
+            self.save_checkpoint(position)
+
+    @staticmethod
+    def invalidate(batch_stats):
+        """
+        Invalidate cached house data, with the transaction of a batch that
+        wrote or deleted rows; upserts and batch deletes send no signals.
+        """
+        if batch_stats['created'] or batch_stats['updated'] or batch_stats['deleted']:
+            bump_dataset_version()
+
+    def save_checkpoint(self, position):
+        """Record that every row up to position = (byte_offset, row_number) has been written."""
+        byte_offset, row_number = position
+        ImportCheckpoint.objects.update_or_create(
+            source=self.source,
+            defaults={'file_size': self.file_size, 'byte_offset': byte_offset, 'row_number': row_number},
+        )
+
+    def delete_missing(self, seen_zillow_ids, stats, batch_size):
+        """Delete houses whose zillow_id did not appear in the imported file."""
+        missing = []
+        rows = House.objects.values_list('id', 'zillow_id', *GROUP_FIELDS).iterator(chunk_size=batch_size)
+        for pk, zillow_id, *groups in rows:
+            if zillow_id not in seen_zillow_ids:
+                missing.append(pk)
+                if self.stats_groups is not None:
+                    self.stats_groups |= listing_groups(dict(zip(GROUP_FIELDS, groups)))
+
+        using = router.db_for_write(House)
+        for start in range(0, len(missing), batch_size):
+            with transaction.atomic(using=using):
+                # Nothing references House, so the rows go in one DELETE,
+                # without a post_delete signal (and version bump) for each
+                deleted = House.objects.filter(pk__in=missing[start:start + batch_size])._raw_delete(using)
+                self.invalidate(Counter(deleted=deleted))
+            stats['deleted'] += deleted
 
     def handle(self, *args, **options):
         csv_file = options['csv_file']
-        
+        batch_size = options['batch_size']
+        workers = options['workers']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be a positive integer')
+        if workers < 1:
+            raise CommandError('--workers must be a positive integer')
+        if options['resume'] and options['delete_missing']:
+            raise CommandError('--resume cannot be combined with --delete-missing')
+        self.delta = options['delta']
+        self.source = os.path.abspath(csv_file)
+
         try:
-            with open(csv_file, 'r') as file:
-                reader = csv.DictReader(file)
-                houses_created = 0
-                houses_skipped = 0
-                
-                for row in reader:
-                    try:
-                        # Clean and convert data
-                        price = self.clean_price(row.get('price', ''))
-                        last_sold_price = self.clean_price(row.get('last_sold_price', ''))
-                        rent_price = self.clean_price(row.get('rent_price', ''))
-                        rentzestimate_amount = self.clean_price(row.get('rentzestimate_amount', ''))
-                        tax_value = self.clean_price(row.get('tax_value', ''))
-                        zestimate_amount = self.clean_price(row.get('zestimate_amount', ''))
-                        
-                        last_sold_date = self.clean_date(row.get('last_sold_date', ''))
-                        rentzestimate_last_updated = self.clean_date(row.get('rentzestimate_last_updated', ''))
-                        zestimate_last_updated = self.clean_date(row.get('zestimate_last_updated', ''))
-                        
-                        bathrooms = self.clean_float(row.get('bathrooms', ''))
-                        bedrooms = self.clean_int(row.get('bedrooms', ''))
-                        home_size = self.clean_int(row.get('home_size', ''))
-                        property_size = self.clean_int(row.get('property_size', ''))
-                        tax_year = self.clean_int(row.get('tax_year', ''))
-                        year_built = self.clean_int(row.get('year_built', ''))
-
-                        # Create house instance
-                        house = House(
-                            area_unit=row.get('area_unit', ''),
-                            bathrooms=bathrooms,
-                            bedrooms=bedrooms,
-                            home_size=home_size,
-                            home_type=row.get('home_type', ''),
-                            last_sold_date=last_sold_date,
-                            last_sold_price=last_sold_price,
-                            link=row.get('link', ''),
-                            price=price,
-                            property_size=property_size,
-                            rent_price=rent_price,
-                            rentzestimate_amount=rentzestimate_amount,
-                            rentzestimate_last_updated=rentzestimate_last_updated,
-                            tax_value=tax_value,
-                            tax_year=tax_year,
-                            year_built=year_built,
-                            zestimate_amount=zestimate_amount,
-                            zestimate_last_updated=zestimate_last_updated,
-                            zillow_id=row.get('zillow_id', ''),
-                            address=row.get('address', ''),
-                            city=row.get('city', ''),
-                            state=row.get('state', ''),
-                            zipcode=row.get('zipcode', '')
-                        )
-                        
-                        house.save()
-                        houses_created += 1
-                        
-                    except Exception as e:
-                        self.stdout.write(self.style.WARNING(
-                            f"Error processing row: {row.get('zillow_id', 'unknown')} - {str(e)}"
-                        ))
-                        houses_skipped += 1
-                        continue
+            self.file_size = os.path.getsize(csv_file)
+            with importer.open_source(csv_file) as file:
+                fieldnames, offset = importer.read_header(file)
+                row_number = 0
+                if options['resume']:
+                    offset, row_number = self.load_checkpoint(offset)
+                    file.seek(offset)
+
+                if workers > 1 and importer.is_gzip(csv_file):
+                    self.stdout.write(self.style.WARNING(
+                        'Compressed files cannot be split between workers; parsing in a single process.'
+                    ))
+                    workers = 1
+                iter_records = columnar.iter_records_columnar if options['columnar'] else importer.iter_records
+                if workers > 1:
+                    records = importer.iter_records_parallel(csv_file, fieldnames, offset, workers, iter_records)
+                else:
+                    records = iter_records(file, fieldnames, offset)
 
+                stats = Counter()
+                seen_zillow_ids = set() if options['delete_missing'] else None
+                self.stats_groups = set()
+                start_time = time.monotonic()
+                self.import_records(records, row_number, batch_size, stats, seen_zillow_ids, options)
+                if seen_zillow_ids is not None:
+                    self.delete_missing(seen_zillow_ids, stats, batch_size)
+                self.refresh_stats(options['resume'])
+                ImportCheckpoint.objects.filter(source=self.source).delete()
+                elapsed = time.monotonic() - start_time
+
+                processed = stats['created'] + stats['updated'] + stats['unchanged'] + stats['skipped']
+                for result in ['created', 'updated', 'unchanged', 'skipped', 'deleted']:
+                    metrics.import_rows.inc(stats[result], result=result)
+                metrics.import_duration.inc(elapsed)
                 self.stdout.write(self.style.SUCCESS(
-                    f'Successfully imported {houses_created} houses. Skipped {houses_skipped} houses.'
+                    f"Successfully imported {stats['created'] + stats['updated']} houses "
+                    f"({stats['created']} created, {stats['updated']} updated, "
+                    f"{stats['unchanged']} unchanged, {stats['deleted']} deleted). "
+                    f"Skipped {stats['skipped']} houses. "
+                    f"{processed / elapsed if elapsed else 0:.0f} rows/sec."
                 ))
 
         except FileNotFoundError:
             raise CommandError(f'CSV file not found: {csv_file}')
+        except CommandError:
+            raise
         except Exception as e:
             raise CommandError(f'Error reading CSV file: {str(e)}')
+
+    def refresh_stats(self, resumed):
+        """
+        Refresh the market stats of the groups this import touched. A resumed
+        import cannot know what the interrupted run touched, and an empty
+        table has never been filled, so those refresh every group.
+        """
+        if resumed or not MarketStats.objects.exists():
+            refresh_market_stats()
+        elif self.stats_groups:
+            refresh_market_stats(self.stats_groups)
+
+    def load_checkpoint(self, data_start):
+        """Return the (byte_offset, row_number) to resume from."""
+        checkpoint = ImportCheckpoint.objects.filter(source=self.source).first()
+        if checkpoint is None:
+            self.stdout.write('No checkpoint found; starting from the beginning.')
+            return data_start, 0
+        if checkpoint.file_size != self.file_size:
+            raise CommandError(
+                f'{self.source} has changed size since the checkpoint was written; '
+                'run without --resume to start over.'
+            )
+        self.stdout.write(f'Resuming after row {checkpoint.row_number}.')
+        return checkpoint.byte_offset, checkpoint.row_number
+
+    def import_records(self, records, row_number, batch_size, stats, seen_zillow_ids, options):
+        """
+        Write cleaned (end_offset, zillow_id, fields, error) records in batches,
+        numbering rows from row_number.
+
+        Every zillow_id is added to seen_zillow_ids when it is a set, including
+        those of rows that were skipped, so bad rows are never deleted as missing.
+        """
+        batch = []
+        start_time = time.monotonic()
+
+        for end_offset, zillow_id, fields, error in records:
+            row_number += 1
+            if seen_zillow_ids is not None and zillow_id:
+                seen_zillow_ids.add(zillow_id)
+            if error is not None:
+                self.stdout.write(self.style.WARNING(
+                    f"Error processing row: {zillow_id or 'unknown'} - {error}"
+                ))
+                stats['skipped'] += 1
+                continue
+
+            batch.append((zillow_id, fields))
+            if len(batch) >= batch_size:
+                self.write_batch(batch, stats, (end_offset, row_number))
+                batch = []
+                self.report_progress(options, stats, start_time)
+
+        if batch:
+            self.write_batch(batch, stats, (end_offset, row_number))
+
+    def report_progress(self, options, stats, start_time):
+        """Print running throughput at verbosity 2 and above."""
+        if options['verbosity'] < 2:
+            return
+        processed = stats['created'] + stats['updated'] + stats['unchanged'] + stats['skipped']
+        elapsed = time.monotonic() - start_time
+        self.stdout.write(f'{processed} rows processed ({processed / elapsed if elapsed else 0:.0f} rows/sec)')
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from api.stats import refresh_market_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the market statistics of every zipcode, city and home type from the listings'
+
+    def handle(self, *args, **options):
+        written = refresh_market_stats()
+        self.stdout.write(self.style.SUCCESS(f'Refreshed market stats for {written} groups.'))
@@ -0,0 +1,259 @@
+"""
+Request, database, cache, import and rate limit metrics, served in the
+Prometheus text format at /api/metrics/.
+
+Metrics are kept in a per-process registry. With METRICS_DIR set, every
+process also writes its samples to METRICS_DIR/<pid>.json from a background
+thread, every METRICS_FLUSH_INTERVAL seconds and at exit, and a scrape adds
+up the files of all processes, so any worker answers for every worker (and
+for import_house_data runs). Files of exited processes are kept, as
+counters never go down; empty the directory when the server restarts.
+"""
+import atexit
+import bisect
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Upper bounds, in seconds, of the request latency buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value) if value != float('inf') else '+Inf'
+    return str(value)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    escaped = (value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for value in values)
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(names, escaped)) + '}'
+
+
+class Metric:
+    """A family of samples told apart by label values."""
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # label values -> value (see the subclasses)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def lines(self, values):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} {self.type}'
+        for key in sorted(values):
+            yield from self.samples(key, values[key])
+
+
+class Counter(Metric):
+    """A count that only goes up; name it with a _total suffix."""
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        registry.ensure_flushing()
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    @staticmethod
+    def merge(value, other):
+        return value + other
+
+    def samples(self, key, value):
+        yield f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+
+
+class Histogram(Metric):
+    """
+    Observations counted into buckets by upper bound. A value is the count
+    in each bucket (not cumulative, +Inf last) followed by the sum.
+    """
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, amount, **labels):
+        key = self.key(labels)
+        index = bisect.bisect_left(self.buckets, amount)
+        registry.ensure_flushing()
+        with self.lock:
+            value = self.values.get(key)
+            if value is None:
+                value = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            value[index] += 1
+            value[-1] += amount
+
+    @staticmethod
+    def merge(value, other):
+        return [a + b for a, b in zip(value, other)]
+
+    def samples(self, key, value):
+        names = self.labelnames + ('le',)
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), value):
+            cumulative += count
+            labels = _format_labels(names, key + (_format_value(float(bound)),))
+            yield f'{self.name}_bucket{labels} {cumulative}'
+        labels = _format_labels(self.labelnames, key)
+        yield f'{self.name}_sum{labels} {_format_value(value[-1])}'
+        yield f'{self.name}_count{labels} {cumulative}'
+
+
+class Registry:
+    """The metrics of this process, and of the others through their files."""
+    def __init__(self):
+        self.metrics = {}
+        self.flusher = None
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self):
+        """Return every metric's values as {name: [[label values, value], ...]}."""
+        snapshot = {}
+        for name, metric in self.metrics.items():
+            with metric.lock:
+                snapshot[name] = [
+                    [list(key), list(value) if isinstance(value, list) else value]
+                    for key, value in metric.values.items()
+                ]
+        return snapshot
+
+    def flush(self, directory):
+        """Write this process's values to directory/<pid>.json, replacing the last write."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', dir=directory, suffix='.tmp', delete=False) as file:
+            json.dump(self.snapshot(), file)
+        os.replace(file.name, directory / f'{os.getpid()}.json')
+
+    def collect(self, directory=None):
+        """
+        Return {name: {label values: value}} for this process, added to the
+        last values written by every other process to directory.
+        """
+        collected = {name: {} for name in self.metrics}
+        snapshots = [self.snapshot()]
+        if directory is not None:
+            for path in Path(directory).glob('*.json'):
+                if path.stem == str(os.getpid()):
+                    continue
+                try:
+                    snapshots.append(json.loads(path.read_text()))
+                except (OSError, ValueError):
+                    # Removed or being replaced; it is picked up on the next scrape
+                    continue
+        for snapshot in snapshots:
+            for name, samples in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                values = collected[name]
+                for key, value in samples:
+                    key = tuple(key)
+                    values[key] = metric.merge(values[key], value) if key in values else value
+        return collected
+
+    def exposition(self, directory=None):
+        """Return the collected metrics in the Prometheus text format."""
+        collected = self.collect(directory)
+        lines = [line for name, metric in self.metrics.items() for line in metric.lines(collected[name])]
+        return '\n'.join(lines) + '\n'
+
+    def ensure_flushing(self):
+        """Start writing this process's values to METRICS_DIR, once per process, if it is set."""
+        if self.flusher is not None:
+            return
+        with self.lock:
+            if self.flusher is not None:
+                return
+            directory = metrics_directory()
+            if directory is None:
+                self.flusher = False
+                return
+            interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 1)
+            self.flusher = threading.Thread(
+                target=self.flush_periodically, args=(directory, interval), name='metrics-flush', daemon=True
+            )
+            self.flusher.start()
+            atexit.register(self.flush, directory)
+
+    def flush_periodically(self, directory, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.flush(directory)
+            except OSError:
+                logger.exception('Could not write metrics to %s', directory)
+
+    def reset_after_fork(self):
+        """Start a forked worker from zero; its parent's values are in the parent's file."""
+        self.flusher = None
+        self.lock = threading.Lock()
+        for metric in self.metrics.values():
+            metric.values = {}
+            metric.lock = threading.Lock()
+
+
+registry = Registry()
+os.register_at_fork(after_in_child=registry.reset_after_fork)
+
+request_duration = registry.register(Histogram(
+    'api_request_duration_seconds', 'Time taken to handle requests.', ['route', 'method', 'status'],
+))
+db_queries = registry.register(Counter(
+    'api_db_queries_total', 'Database queries run while handling requests.', ['route'],
+))
+db_duration = registry.register(Counter(
+    'api_db_duration_seconds_total', 'Time spent in database queries while handling requests.', ['route'],
+))
+cache_requests = registry.register(Counter(
+    'api_cache_requests_total', 'House cache lookups, by kind of entry and hit or miss.', ['kind', 'result'],
+))
+import_rows = registry.register(Counter(
+    'api_import_rows_total', 'Rows processed by import_house_data, by outcome.', ['result'],
+))
+import_duration = registry.register(Counter(
+    'api_import_duration_seconds_total', 'Time spent by import_house_data runs.',
+))
+rate_limited = registry.register(Counter(
+    'api_rate_limit_rejections_total', 'Requests rejected by the rate limiter, by kind of client.', ['client'],
+))
+
+
+def observe_request(request, response, timer):
+    """Record a handled request and the database work it did."""
+    match = request.resolver_match
+    route = match.view_name if match is not None else 'unmatched'
+    request_duration.observe(timer.total, route=route, method=request.method, status=response.status_code)
+    if timer.queries:
+        db_queries.inc(timer.queries, route=route)
+        db_duration.inc(timer.durations['db'], route=route)
+
+
+def metrics_directory():
+    """Return the directory processes share their metrics through, or None."""
+    return getattr(settings, 'METRICS_DIR', None) or None
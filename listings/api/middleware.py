@@ -1,48 +1,122 @@
+import asyncio
+import hashlib
+import math
 import time
 import logging
+from asgiref.sync import sync_to_async
 from django.http import JsonResponse
-from django.core.cache import cache
+from django.core.cache import cache, caches
 from django.conf import settings
+from django.utils.functional import classproperty
+from rest_framework.authtoken.models import Token
+from . import metrics
+from .timing import RequestTimer, current_timer
 
 logger = logging.getLogger(__name__)
 
-class RequestLoggingMiddleware:
+class SyncAndAsyncMiddleware:
     """
-    Middleware to log all API requests and their response times.
+    Base for middleware that can run natively under both WSGI and ASGI.
+    Subclasses implement __call__ for sync requests, handing async ones to
+    __acall__.
+
+    Async mode only pays off when the whole chain is async-native: under
+    ASGI, Django runs each hook of MiddlewareMixin-based middleware (all of
+    Django's own) in a thread when the chain is async, but runs a sync
+    chain in a single thread hop. So it is opt-in, with API_ASYNC_MIDDLEWARE,
+    read when Django builds the middleware chain.
     """
+    sync_capable = True
+
+    @classproperty
+    def async_capable(cls):
+        return getattr(settings, 'API_ASYNC_MIDDLEWARE', False)
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Mark the instance as a coroutine function, as Django's MiddlewareMixin does
+            self._is_coroutine = asyncio.coroutines._is_coroutine
 
-    def __call__(self, request):
-        # Start timer
-        start_time = time.time()
+class RequestLoggingMiddleware(SyncAndAsyncMiddleware):
+    """
+    Middleware to time API requests, reporting database time and query
+    count, serialization time and render time in a Server-Timing header,
+    logging them as structured fields and recording them in api.metrics.
 
-        # Process the request
-        response = self.get_response(request)
+    Streaming responses are timed up to the start of the response.
+    """
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if self.is_async:
+            # Django runs a sync hook in a thread; this one need not leave the event loop
+            self.process_template_response = self.aprocess_template_response
 
-        # Calculate duration
-        duration = time.time() - start_time
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timer = RequestTimer()
+        with timer.activate():
+            response = self.get_response(request)
+        return self.finish(request, response, timer)
 
-        # Log the request
+    async def __acall__(self, request):
+        timer = RequestTimer()
+        with timer.activate():
+            response = await self.get_response(request)
+        return self.finish(request, response, timer)
+
+    def finish(self, request, response, timer):
+        response['Server-Timing'] = timer.header()
+        metrics.observe_request(request, response, timer)
         logger.info(
-            f"Method: {request.method} | "
-            f"Path: {request.path} | "
-            f"Status: {response.status_code} | "
-            f"Duration: {duration:.2f}s"
+            f"{request.method} {request.path} {response.status_code} {timer.total * 1000:.2f}ms",
+            extra={
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                **timer.as_dict(),
+            },
         )
+        return response
 
+    def process_template_response(self, request, response):
+        return self.time_render(response)
+
+    async def aprocess_template_response(self, request, response):
+        return self.time_render(response)
+
+    @staticmethod
+    def time_render(response):
+        # Called just before a DRF response is rendered. The render itself is
+        # timed, as under ASGI it runs later, in a worker thread
+        timer = current_timer()
+        if timer is not None:
+            render = response.render
+
+            def timed_render():
+                timer.start('render')
+                try:
+                    return render()
+                finally:
+                    timer.stop('render')
+            response.render = timed_render
         return response
 
-class ErrorHandlingMiddleware:
+class ErrorHandlingMiddleware(SyncAndAsyncMiddleware):
     """
     Middleware to handle exceptions and return standardized error responses.
     """
-    def __init__(self, get_response):
-        self.get_response = get_response
-
     def __call__(self, request):
-        response = self.get_response(request)
-        
+        if self.is_async:
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
         if response.status_code >= 400:
             error_message = {
                 404: 'Not found',
@@ -50,63 +124,154 @@ class ErrorHandlingMiddleware:
                 401: 'Unauthorized',
                 403: 'Forbidden',
                 405: 'Method not allowed',
+                429: 'Too many requests',
                 500: 'Internal server error'
             }.get(response.status_code, 'An error occurred')
             
-            return JsonResponse({
+            error_response = JsonResponse({
                 'error': error_message,
                 'status_code': response.status_code,
                 'path': request.path
             }, status=response.status_code)
+            # Keep headers such as Retry-After, WWW-Authenticate and Allow
+            for name, value in response.items():
+                if name.lower() not in ('content-type', 'content-length'):
+                    error_response[name] = value
+            return error_response
         
         return response
 
-class RateLimitMiddleware:
-    """
-    Middleware to implement rate limiting on API endpoints.
+class RateLimitMiddleware(SyncAndAsyncMiddleware):
     """
-    _request_count = 0
-    _last_reset = time.time()
-    _rate_limit = getattr(settings, 'API_RATE_LIMIT', 100)  # Default to 100 requests per minute
-    _window = 60  # 1 minute window
+    Per-client rate limiting of API requests, with a sliding window.
 
-    def __init__(self, get_response):
-        self.get_response = get_response
+    Clients are told apart by their auth token, or by IP address when they
+    send none. Each client's requests are counted per fixed window in the
+    cache with atomic increments, so every worker sharing the cache shares
+    the limit, and a request is allowed while the current window's count
+    plus the previous window's, weighted by how much of it still overlaps
+    the sliding window, is within API_RATE_LIMIT. Counters expire after two
+    windows, so idle clients leave nothing behind.
+    """
+    cache_alias = 'ratelimit'
+    key_prefix = 'ratelimit'
 
     def __call__(self, request):
-        # Skip rate limiting for non-API requests
-        if not request.path.startswith('/api/'):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.applies(request):
             return self.get_response(request)
 
-        current_time = time.time()
-        
-        # Reset counter if window has passed
-        if current_time - self._last_reset >= self._window:
-            self._request_count = 0
-            self._last_reset = current_time
-        
-        # Increment counter
-        self._request_count += 1
-        
-        # Check if rate limit exceeded
-        if self._request_count > self._rate_limit:
-            return JsonResponse({
-                'error': 'Rate limit exceeded',
-                'detail': f'Too many requests. Limit is {self._rate_limit} requests per minute.'
-            }, status=429)
-        
-        return self.get_response(request)
+        rejection, headers = self.count(request)
+        response = rejection or self.get_response(request)
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    async def __acall__(self, request):
+        if not self.applies(request):
+            return await self.get_response(request)
+
+        # Cache and database calls block, so they run off the event loop
+        rejection, headers = await sync_to_async(self.count)(request)
+        response = rejection or await self.get_response(request)
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    @staticmethod
+    def applies(request):
+        # Skip rate limiting for non-API requests, and when it is turned off
+        return request.path.startswith('/api/') and getattr(settings, 'API_RATE_LIMIT', 100) > 0
+
+    def count(self, request):
+        """Count a request against its client; see check."""
+        return self.check(self._get_client_key(request))
+
+    def check(self, client):
+        """
+        Count a request by client. Return the 429 response if it is over
+        the limit (else None) and the rate limit headers.
+        """
+        limit = getattr(settings, 'API_RATE_LIMIT', 100)
+        window = getattr(settings, 'API_RATE_LIMIT_WINDOW', 60)
+        now = time.time()
+        current = int(now // window)
+        elapsed = now - current * window
+        store = self.get_cache()
+
+        key = f'{self.key_prefix}:{client}:{current}'
+        try:
+            count = store.incr(key)
+        except ValueError:
+            # First request of the window; another worker may have raced us to it
+            count = 1 if store.add(key, 1, 2 * window) else store.incr(key)
+        previous = store.get(f'{self.key_prefix}:{client}:{current - 1}', 0)
+        weight = 1 - elapsed / window
+        used = previous * weight + count
+
+        headers = {
+            'X-RateLimit-Limit': str(limit),
+            'X-RateLimit-Remaining': str(max(0, math.floor(limit - used))),
+            'X-RateLimit-Reset': str(math.ceil(window - elapsed)),
+        }
+        if used <= limit:
+            return None, headers
+        headers['Retry-After'] = str(self._retry_after(limit, window, elapsed, previous, count))
+        metrics.rate_limited.inc(client=client.split(':', 1)[0])
+        return JsonResponse({
+            'error': 'Rate limit exceeded',
+            'detail': f'Too many requests. Limit is {limit} requests per {window} seconds.'
+        }, status=429), headers
+
+    @staticmethod
+    def _retry_after(limit, window, elapsed, previous, count):
+        """Return the seconds until the weighted count leaves room for another request."""
+        remaining = window - elapsed
+        if previous and count < limit:
+            # The previous window's share decays by previous / window per second
+            excess = previous * (1 - elapsed / window) + count - (limit - 1)
+            remaining = min(remaining, excess * window / previous)
+        return max(1, math.ceil(remaining))
+
+    @classmethod
+    def get_cache(cls):
+        return caches[cls.cache_alias] if cls.cache_alias in settings.CACHES else cache
 
     @classmethod
     def reset_counter(cls):
-        """Reset the rate limit counter."""
-        cls._request_count = 0
-        cls._last_reset = time.time()
+        """Reset the rate limit counters of every client by clearing their cache."""
+        cls.get_cache().clear()
+
+    def _get_client_key(self, request):
+        """
+        Identify the client by the user its auth token belongs to, or by its
+        IP address. Token owners are cached briefly; unknown tokens count
+        against the IP address, so made-up tokens cannot dodge the limit.
+        """
+        authorization = request.META.get('HTTP_AUTHORIZATION', '').split()
+        if len(authorization) == 2 and authorization[0] == 'Token':
+            store = self.get_cache()
+            digest = hashlib.blake2b(authorization[1].encode(), digest_size=16).hexdigest()
+            key = f'{self.key_prefix}:owner:{digest}'
+            owner = store.get(key)
+            if owner is None:
+                owner = Token.objects.filter(key=authorization[1]).values_list('user_id', flat=True).first() or ''
+                store.set(key, owner, getattr(settings, 'API_RATE_LIMIT_WINDOW', 60))
+            if owner:
+                return f'user:{owner}'
+        return f'ip:{self._get_client_ip(request)}'
 
     def _get_client_ip(self, request):
+        """
+        Return the client's address: REMOTE_ADDR, or behind
+        API_RATE_LIMIT_TRUSTED_PROXIES proxies, the X-Forwarded-For entry
+        the outermost of them added. Entries left of it come from the
+        client, which could otherwise pick a fresh address per request.
+        """
+        proxies = getattr(settings, 'API_RATE_LIMIT_TRUSTED_PROXIES', 0)
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip 
\ No newline at end of file
+        if proxies > 0 and x_forwarded_for:
+            entries = [entry.strip() for entry in x_forwarded_for.split(',')]
+            return entries[max(0, len(entries) - proxies)]
+        return request.META.get('REMOTE_ADDR')
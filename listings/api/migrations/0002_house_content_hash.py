@@ -0,0 +1,35 @@
+# Generated by Django 3.2.4 on 2026-10-17 22:56
+
+from django.db import migrations, models
+
+from api.importer import HASHED_FIELDS, content_hash
+
+
+def fill_hashes(apps, schema_editor):
+    # The hash has to match the one imports compute, so it comes from the
+    # importer rather than a frozen copy
+    houses = apps.get_model('api', 'House').objects.db_manager(schema_editor.connection.alias)
+    batch = []
+    for house in houses.only('id', *HASHED_FIELDS).order_by().iterator(chunk_size=5000):
+        house.content_hash = content_hash({name: getattr(house, name) for name in HASHED_FIELDS})
+        batch.append(house)
+        if len(batch) >= 5000:
+            houses.bulk_update(batch, ['content_hash'])
+            batch = []
+    houses.bulk_update(batch, ['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='house',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32),
+        ),
+        migrations.RunPython(fill_hashes, migrations.RunPython.noop),
+    ]
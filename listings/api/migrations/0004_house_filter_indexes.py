@@ -0,0 +1,45 @@
+# Generated by Django 3.2.4 on 2026-10-17 23:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_importcheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['price'], name='house_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['state', 'city', 'price'], name='house_state_city_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['zipcode', 'price'], name='house_zipcode_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['home_type', 'price'], name='house_home_type_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['bedrooms'], name='house_bedrooms_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['bathrooms'], name='house_bathrooms_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['home_size'], name='house_home_size_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['year_built'], name='house_year_built_idx'),
+        ),
+    ]
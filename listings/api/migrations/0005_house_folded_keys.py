@@ -0,0 +1,60 @@
+# Generated by Django 3.2.4 on 2026-10-17 23:09
+
+from django.db import migrations, models
+
+FOLDED_FIELDS = {'city': 'city_key', 'state': 'state_key', 'home_type': 'home_type_key'}
+
+
+def fill_keys(apps, schema_editor):
+    houses = apps.get_model('api', 'House').objects.db_manager(schema_editor.connection.alias)
+    batch = []
+    for house in houses.only('id', *FOLDED_FIELDS).order_by().iterator(chunk_size=5000):
+        for name, key in FOLDED_FIELDS.items():
+            setattr(house, key, (getattr(house, name) or '').lower())
+        batch.append(house)
+        if len(batch) >= 5000:
+            houses.bulk_update(batch, list(FOLDED_FIELDS.values()))
+            batch = []
+    houses.bulk_update(batch, list(FOLDED_FIELDS.values()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_house_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='house',
+            name='house_state_city_price_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='house',
+            name='house_home_type_price_idx',
+        ),
+        migrations.AddField(
+            model_name='house',
+            name='city_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='house',
+            name='home_type_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='house',
+            name='state_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=2),
+        ),
+        migrations.RunPython(fill_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['state_key', 'city_key', 'price'], name='house_state_city_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['home_type_key', 'price'], name='house_home_type_price_idx'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+from django.db import migrations
+
+# External-content FTS5 index over the searchable House columns, kept in
+# sync with api_house by triggers so bulk upserts are covered too
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE api_house_search USING fts5(
+        address, city, state, zipcode,
+        content='api_house', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER api_house_search_insert AFTER INSERT ON api_house BEGIN
+        INSERT INTO api_house_search(rowid, address, city, state, zipcode)
+        VALUES (new.id, new.address, new.city, new.state, new.zipcode);
+    END
+    """,
+    """
+    CREATE TRIGGER api_house_search_delete AFTER DELETE ON api_house BEGIN
+        INSERT INTO api_house_search(api_house_search, rowid, address, city, state, zipcode)
+        VALUES ('delete', old.id, old.address, old.city, old.state, old.zipcode);
+    END
+    """,
+    """
+    CREATE TRIGGER api_house_search_update AFTER UPDATE OF address, city, state, zipcode ON api_house BEGIN
+        INSERT INTO api_house_search(api_house_search, rowid, address, city, state, zipcode)
+        VALUES ('delete', old.id, old.address, old.city, old.state, old.zipcode);
+        INSERT INTO api_house_search(rowid, address, city, state, zipcode)
+        VALUES (new.id, new.address, new.city, new.state, new.zipcode);
+    END
+    """,
+    "INSERT INTO api_house_search(api_house_search) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS api_house_search_insert',
+    'DROP TRIGGER IF EXISTS api_house_search_delete',
+    'DROP TRIGGER IF EXISTS api_house_search_update',
+    'DROP TABLE IF EXISTS api_house_search',
+]
+
+
+def has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return ('ENABLE_FTS5',) in cursor.fetchall()
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        # Other backends, and SQLite builds without FTS5, keep using the icontains search
+        if schema_editor.connection.vendor != 'sqlite' or not has_fts5(schema_editor.connection):
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_house_folded_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(CREATE_SQL), run(DROP_SQL)),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 3.2.4 on 2026-10-17 23:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_house_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarketStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('zipcode', 'Zipcode'), ('city', 'City'), ('home_type', 'Home type')], max_length=10)),
+                ('state_key', models.CharField(blank=True, default='', max_length=2)),
+                ('value_key', models.CharField(max_length=100)),
+                ('state', models.CharField(blank=True, default='', max_length=2)),
+                ('value', models.CharField(max_length=100)),
+                ('count', models.IntegerField()),
+                ('median_price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('median_price_per_sqft', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('median_rent_to_price', models.FloatField(blank=True, null=True)),
+                ('median_rentzestimate', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('median_zestimate', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('median_tax_value', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Market stats',
+                'verbose_name_plural': 'Market stats',
+                'ordering': ['dimension', 'value_key', 'state_key'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='marketstats',
+            constraint=models.UniqueConstraint(fields=('dimension', 'value_key', 'state_key'), name='market_stats_group_unique'),
+        ),
+    ]
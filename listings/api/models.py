@@ -1,5 +1,6 @@
 from django.db import models
 from django.core.validators import MinValueValidator
+from .importer import HASHED_FIELDS, content_hash, folded_fields
 
 # TODO: Create your models here.
 
@@ -27,11 +28,105 @@ class House(models.Model):
     city = models.CharField(max_length=100)
     state = models.CharField(max_length=2)
     zipcode = models.CharField(max_length=10)
+    # Case-folded copies of city, state and home_type, so the case-insensitive
+    # filters are plain equality lookups that the indexes below can serve
+    city_key = models.CharField(max_length=100, blank=True, default='', editable=False)
+    state_key = models.CharField(max_length=2, blank=True, default='', editable=False)
+    home_type_key = models.CharField(max_length=50, blank=True, default='', editable=False)
+    # Digest of the listing fields, used by the import command to skip unchanged rows
+    content_hash = models.CharField(max_length=32, blank=True, default='', editable=False)
 
     def __str__(self):
         return f"{self.address}, {self.city}, {self.state} {self.zipcode}"
 
+    def save(self, *args, **kwargs):
+        derived = folded_fields({'city': self.city, 'state': self.state, 'home_type': self.home_type})
+        for name, value in derived.items():
+            setattr(self, name, value)
+        self.content_hash = content_hash({name: getattr(self, name) for name in HASHED_FIELDS})
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | set(derived) | {'content_hash'}
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "House"
         verbose_name_plural = "Houses"
         ordering = ['-price']
+        # Driven by HouseFilter and the allowed ordering fields. Location and
+        # type indexes end in price so filtered lists come back already in
+        # the default order, and range counts are answered from the index.
+        indexes = [
+            models.Index(fields=['price'], name='house_price_idx'),
+            models.Index(fields=['state_key', 'city_key', 'price'], name='house_state_city_price_idx'),
+            models.Index(fields=['zipcode', 'price'], name='house_zipcode_price_idx'),
+            models.Index(fields=['home_type_key', 'price'], name='house_home_type_price_idx'),
+            models.Index(fields=['bedrooms'], name='house_bedrooms_idx'),
+            models.Index(fields=['bathrooms'], name='house_bathrooms_idx'),
+            models.Index(fields=['home_size'], name='house_home_size_idx'),
+            models.Index(fields=['year_built'], name='house_year_built_idx'),
+        ]
+
+
+class ImportCheckpoint(models.Model):
+    """
+    Progress of an import_house_data run, committed with each batch so an
+    interrupted import can be resumed.
+    """
+    source = models.CharField(max_length=500, unique=True)
+    file_size = models.BigIntegerField()
+    byte_offset = models.BigIntegerField()
+    row_number = models.BigIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source} @ row {self.row_number}"
+
+
+class DatasetVersion(models.Model):
+    """
+    The single row holding the version of the house data, moved on by
+    every write (see api.cache). It lives in the database so every process
+    sees writes made by the others, in the same transaction as the write.
+    """
+    ID = 1
+
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return str(self.version)
+
+
+class MarketStats(models.Model):
+    """
+    Medians of the listings in one zipcode, city (within a state) or home
+    type, materialized from House by api.stats.refresh_market_stats.
+    """
+    DIMENSIONS = [('zipcode', 'Zipcode'), ('city', 'City'), ('home_type', 'Home type')]
+
+    dimension = models.CharField(max_length=10, choices=DIMENSIONS)
+    # Case-folded state (cities only) and value, identifying the group
+    state_key = models.CharField(max_length=2, blank=True, default='')
+    value_key = models.CharField(max_length=100)
+    state = models.CharField(max_length=2, blank=True, default='')
+    value = models.CharField(max_length=100)
+    count = models.IntegerField()
+    median_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    median_price_per_sqft = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    # Monthly rent estimate over price
+    median_rent_to_price = models.FloatField(null=True, blank=True)
+    median_rentzestimate = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    median_zestimate = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    median_tax_value = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.dimension} {self.value}" + (f", {self.state}" if self.state else '')
+
+    class Meta:
+        verbose_name = "Market stats"
+        verbose_name_plural = "Market stats"
+        ordering = ['dimension', 'value_key', 'state_key']
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'value_key', 'state_key'], name='market_stats_group_unique'),
+        ]
@@ -0,0 +1,320 @@
+import base64
+import json
+from collections import OrderedDict
+from decimal import Decimal
+from functools import partial
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .cache import cache_key, cache_timeout, cached, filter_signature, house_cache
+from .search import RANK
+
+# Sampling used to estimate large counts: this many rows in total, read
+# from evenly spaced id windows
+SAMPLE_ROWS = 10000
+SAMPLE_WINDOWS = 10
+
+
+def estimate_count(queryset):
+    """
+    Estimate the number of rows in a queryset without counting them all.
+
+    PostgreSQL's planner estimate is used directly. Elsewhere the filters
+    are applied to a sample of id windows spread across the table and the
+    match rate is scaled up to the table's id span.
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    table = queryset.model._default_manager.db_manager(queryset.db)
+    # Separate queries, since SQLite only answers a lone MIN or MAX from the index
+    low = table.order_by('pk').values_list('pk', flat=True).first()
+    high = table.order_by('-pk').values_list('pk', flat=True).first()
+    if low is None:
+        return 0
+    span = high - low + 1
+    if span <= SAMPLE_ROWS:
+        return queryset.count()
+
+    width = SAMPLE_ROWS // SAMPLE_WINDOWS
+    matched = 0
+    for i in range(SAMPLE_WINDOWS):
+        start = low + (span - width) * i // (SAMPLE_WINDOWS - 1)
+        # As a subquery, the window drives the plan rather than a filter's index
+        window = table.filter(pk__gte=start, pk__lt=start + width).values('pk')
+        matched += queryset.filter(pk__in=window).order_by().count()
+    return round(matched * span / (width * SAMPLE_WINDOWS))
+
+
+class ApproximatePage(Page):
+    """A page whose successor is known from fetching one row past it rather than from the count."""
+    def __init__(self, object_list, number, paginator, more):
+        super().__init__(object_list, number, paginator)
+        self.more = more
+
+    def has_next(self):
+        return self.more
+
+
+class CountedPaginator(Paginator):
+    """
+    Paginator given its count up front. When the count is approximate, page
+    numbers are not checked against it and pages are never cut short by it.
+    """
+    def __init__(self, object_list, per_page, count=None, approximate=False, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.approximate = approximate
+        if count is not None:
+            self.count = count
+
+    def validate_number(self, number):
+        if not self.approximate:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_('That page number is not an integer'))
+        if number < 1:
+            raise EmptyPage(_('That page number is less than 1'))
+        return number
+
+    def page(self, number):
+        if not self.approximate:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        return ApproximatePage(rows[:self.per_page], number, self, len(rows) > self.per_page)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks past the last row seen instead of using
+    OFFSET, and never counts the result set.
+
+    Rows are ordered by the first ordering field with id as a tiebreaker in
+    the same direction; rows where the field is NULL come last. The NULL rows
+    are fetched as a separate segment so each query stays a range seek on
+    the field's index, whatever the page depth.
+    """
+    page_size = None
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, page_size=None):
+        self.page_size = page_size or self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.field, self.descending = self.get_ordering(queryset)
+        position, reverse = self.decode_cursor(request)
+        # Restated so the tiebreaker is always id in the same direction
+        queryset = queryset.order_by()
+
+        if reverse:
+            rows = self.fetch(queryset, position, forward=False)
+            self.has_previous, self.has_next = len(rows) > self.page_size, True
+            page = rows[:self.page_size][::-1]
+        else:
+            rows = self.fetch(queryset, position, forward=True)
+            self.has_previous, self.has_next = position is not None, len(rows) > self.page_size
+            page = rows[:self.page_size]
+
+        self.first = self.position(page[0]) if page else position
+        self.last = self.position(page[-1]) if page else position
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        return self.encode_cursor(self.last, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.first is None:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.first, reverse=True)
+
+    def get_ordering(self, queryset):
+        """Return (field, descending) for the first term the queryset is ordered by."""
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        terms = [term for term in ordering if isinstance(term, str)]
+        if RANK in terms:
+            raise ValidationError({'ordering': 'Cursor pagination does not support ordering by relevance; pass an ordering.'})
+        if len(terms) != len(ordering) or len(terms) > 1:
+            raise ValidationError({'ordering': 'Cursor pagination supports ordering by a single field.'})
+        if not terms or terms[0].lstrip('-') in ('id', 'pk'):
+            return None, bool(terms) and terms[0].startswith('-')
+        return terms[0].lstrip('-'), terms[0].startswith('-')
+
+    def position(self, row):
+        """Return the (value, id) position of a House or a named values_list row."""
+        value = getattr(row, self.field) if self.field else None
+        return value, row.id
+
+    def fetch(self, queryset, position, forward):
+        """
+        Return up to page_size + 1 rows after position, in the given direction,
+        walking the non-NULL segment and then the NULL segment (or back).
+        """
+        limit = self.page_size + 1
+        descending = self.descending == forward
+        segments = [False, True] if forward else [True, False]
+        if self.field is None:
+            segments = [True]
+        elif position is not None:
+            # Skip the segments that lie entirely before the cursor
+            segments = segments[segments.index(position[0] is None):]
+
+        rows = []
+        for is_null in segments:
+            bounded = position is not None and (position[0] is None) == is_null
+            rows += self.fetch_segment(queryset, is_null, position if bounded else None, descending, limit - len(rows))
+            if len(rows) >= limit:
+                break
+        return rows
+
+    def fetch_segment(self, queryset, is_null, position, descending, limit):
+        prefix = '-' if descending else ''
+        after = 'lt' if descending else 'gt'
+        if is_null:
+            if self.field:
+                queryset = queryset.filter(**{f'{self.field}__isnull': True})
+            if position is not None:
+                queryset = queryset.filter(**{f'id__{after}': position[1]})
+            return list(queryset.order_by(f'{prefix}id')[:limit])
+
+        queryset = queryset.filter(**{f'{self.field}__isnull': False})
+        if position is not None:
+            value, pk = position
+            # Written as a range plus a tiebreak so the index can seek to the cursor
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{after}e': value}),
+                Q(**{f'{self.field}__{after}': value}) | Q(**{f'id__{after}': pk}),
+            )
+        return list(queryset.order_by(f'{prefix}{self.field}', f'{prefix}id')[:limit])
+
+    def encode_cursor(self, position, reverse):
+        return replace_query_param(self.base_url, self.cursor_query_param, self.cursor_token(position, reverse))
+
+    def cursor_token(self, position, reverse):
+        """Return the opaque token for a position in the current ordering."""
+        value, pk = position
+        if isinstance(value, Decimal):
+            value = str(value)
+        payload = {'o': ('-' if self.descending else '') + (self.field or 'id'), 'v': value, 'i': pk}
+        if reverse:
+            payload['r'] = 1
+        return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, request):
+        """Return (position, reverse) for the request's cursor, or (None, False) for the first page."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            ordering = payload['o']
+            position = (payload['v'], int(payload['i']))
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+        # A cursor only makes sense for the ordering it was issued under
+        if ordering != ('-' if self.descending else '') + (self.field or 'id'):
+            raise NotFound(self.invalid_cursor_message)
+        if self.field is None:
+            position = (None, position[1])
+        return position, reverse
+
+
+class HousePagination(PageNumberPagination):
+    """
+    Page number pagination, with keyset pagination opted into by passing
+    pagination=cursor (or following a cursor link).
+
+    Page number counts are cached per filter signature until the houses
+    change. Counts above HOUSE_COUNT_ESTIMATE_THRESHOLD are estimated and
+    flagged with count_approximate.
+    """
+    mode_query_param = 'pagination'
+    keyset_class = KeysetPagination
+
+    def use_keyset(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.keyset_class.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.keyset_class(self.get_page_size(request)) if self.use_keyset(request) else None
+        if self.keyset is not None:
+            return self.keyset.paginate_queryset(queryset, request, view)
+        count, approximate = self.get_count(queryset, request, view)
+        self.django_paginator_class = partial(CountedPaginator, count=count, approximate=approximate)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count(self, queryset, request, view=None):
+        """Return (count, approximate) for the filtered queryset, from the cache when possible."""
+        signature = filter_signature(request, view) if getattr(view, 'filterset_class', None) else None
+        key = cache_key('count', signature) if signature is not None else None
+        if key is not None:
+            counted = cached('count', key)
+            if counted is not None:
+                return counted
+
+        threshold = getattr(settings, 'HOUSE_COUNT_ESTIMATE_THRESHOLD', 0)
+        queryset = queryset.order_by()
+        if threshold > 0:
+            # Counting stops at the threshold, so it costs at most that many rows
+            count, approximate = queryset[:threshold + 1].count(), False
+            if count > threshold:
+                count, approximate = max(estimate_count(queryset), threshold + 1), True
+        else:
+            count, approximate = queryset.count(), False
+
+        if key is not None:
+            house_cache().set(key, (count, approximate), cache_timeout())
+        return count, approximate
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return Response(OrderedDict([
+            ('count', self.page.paginator.count),
+            ('count_approximate', self.page.paginator.approximate),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_approximate'] = {'type': 'boolean', 'example': False}
+        return response_schema
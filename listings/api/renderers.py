@@ -0,0 +1,108 @@
+import csv
+import io
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed.
+
+    Output matches JSONRenderer's compact form byte for byte: strings
+    (including serialized Decimals and dates) are untouched, dates render
+    as ISO 8601, and datetimes, Decimals and anything else orjson does not
+    handle natively go through DRF's JSONEncoder. The exceptions are floats
+    written in exponent form (1e16 rather than 1e+16) and NaN/Infinity,
+    which become null instead of raising.
+
+    Indented output, non-default JSON settings, a missing orjson and data
+    orjson rejects (such as non-string keys or integers over 64 bits) all
+    fall back to JSONRenderer.
+    """
+    options = orjson.OPT_PASSTHROUGH_DATETIME if orjson is not None else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None
+            or self.ensure_ascii or not self.compact or not self.strict
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Escaped like JSONRenderer so the output stays a strict JavaScript subset
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Newline-delimited JSON. stream() encodes chunks of row dicts one object
+    per line; render() writes a single object (or one per list item), as
+    used for error responses.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    @staticmethod
+    def encode(item):
+        if orjson is not None:
+            try:
+                return orjson.dumps(item, option=orjson.OPT_APPEND_NEWLINE)
+            except orjson.JSONEncodeError:
+                pass
+        return (json.dumps(item, cls=encoders.JSONEncoder, ensure_ascii=False, separators=(',', ':')) + '\n').encode()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        items = data if isinstance(data, list) else [data]
+        return b''.join(self.encode(item) for item in items)
+
+    def stream(self, chunks, fields):
+        for chunk in chunks:
+            yield b''.join(self.encode(item) for item in chunk)
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    CSV with a header row. stream() encodes chunks of row dicts with the
+    given columns; render() writes a dict (or list of dicts), as used for
+    error responses. None is written as an empty cell.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        items = data if isinstance(data, list) else [data]
+        fields = list(dict.fromkeys(name for item in items for name in item))
+        return b''.join(self.stream([items], fields))
+
+    def stream(self, chunks, fields):
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(fields)
+        yield output.getvalue().encode(self.charset)
+        output.seek(0)
+        output.truncate()
+        for chunk in chunks:
+            writer.writerows([item.get(name) for name in fields] for item in chunk)
+            yield output.getvalue().encode(self.charset)
+            output.seek(0)
+            output.truncate()
@@ -0,0 +1,131 @@
+"""
+Full-text search for houses.
+
+On SQLite the search parameter is answered from the api_house_search FTS5
+index (see migration 0006) instead of icontains lookups on every search
+field. Elsewhere, or before the migration has run, DRF's SearchFilter is
+used unchanged.
+
+Triggers on api_house keep the index in sync. SQLite drops them whenever a
+migration rebuilds the table (AddField, AlterField and the like), so they
+are recreated after every migrate by restore_search_triggers.
+"""
+from django.db import connections
+from rest_framework import filters
+
+SEARCH_TABLE = 'api_house_search'
+
+# Annotation holding the bm25 score of a full-text match; lower is better
+RANK = 'search_rank'
+
+_has_search_table = {}
+
+TRIGGERS = {
+    'api_house_search_insert': """
+        CREATE TRIGGER IF NOT EXISTS api_house_search_insert AFTER INSERT ON api_house BEGIN
+            INSERT INTO api_house_search(rowid, address, city, state, zipcode)
+            VALUES (new.id, new.address, new.city, new.state, new.zipcode);
+        END
+    """,
+    'api_house_search_delete': """
+        CREATE TRIGGER IF NOT EXISTS api_house_search_delete AFTER DELETE ON api_house BEGIN
+            INSERT INTO api_house_search(api_house_search, rowid, address, city, state, zipcode)
+            VALUES ('delete', old.id, old.address, old.city, old.state, old.zipcode);
+        END
+    """,
+    'api_house_search_update': """
+        CREATE TRIGGER IF NOT EXISTS api_house_search_update
+        AFTER UPDATE OF address, city, state, zipcode ON api_house BEGIN
+            INSERT INTO api_house_search(api_house_search, rowid, address, city, state, zipcode)
+            VALUES ('delete', old.id, old.address, old.city, old.state, old.zipcode);
+            INSERT INTO api_house_search(rowid, address, city, state, zipcode)
+            VALUES (new.id, new.address, new.city, new.state, new.zipcode);
+        END
+    """,
+}
+
+
+def has_search_table(alias):
+    """Return whether the full-text index exists on a database, checking once per process."""
+    if alias not in _has_search_table:
+        connection = connections[alias]
+        _has_search_table[alias] = (
+            connection.vendor == 'sqlite' and SEARCH_TABLE in connection.introspection.table_names()
+        )
+    return _has_search_table[alias]
+
+
+def restore_search_triggers(alias):
+    """
+    Recreate whichever of the index's triggers are missing on a database and,
+    if any were, rebuild the index from api_house, since writes made without
+    them were not indexed. Returns the names of the recreated triggers.
+    """
+    connection = connections[alias]
+    if connection.vendor != 'sqlite' or SEARCH_TABLE not in connection.introspection.table_names():
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'api_house'")
+        existing = {name for name, in cursor.fetchall()}
+        missing = [name for name in TRIGGERS if name not in existing]
+        for name in missing:
+            cursor.execute(TRIGGERS[name])
+        if missing:
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
+    return missing
+
+
+def match_query(terms):
+    """
+    Build an FTS5 query matching rows that contain every term, each as a
+    prefix. Terms are quoted so user input cannot inject query syntax.
+    """
+    return ' '.join('"%s"*' % term.replace('"', '""') for term in terms)
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter answered from the full-text index, with prefix matching.
+    Matching rows are annotated with their relevance as search_rank.
+    """
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms or not has_search_table(queryset.db):
+            return super().filter_queryset(request, queryset, view)
+
+        table = queryset.model._meta.db_table
+        # A join rather than an id__in subquery, since bm25 ranks are only
+        # available alongside the MATCH
+        return queryset.extra(
+            select={RANK: f'{SEARCH_TABLE}.rank'},
+            tables=[SEARCH_TABLE],
+            where=[f'{SEARCH_TABLE}.rowid = {table}.id', f'{SEARCH_TABLE} MATCH %s'],
+            params=[match_query(terms)],
+        )
+
+
+class RelevanceOrderingFilter(filters.OrderingFilter):
+    """
+    OrderingFilter whose default, when a full-text search is active, is by
+    relevance (then the view's default ordering) instead.
+    """
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if ordering:
+            return queryset.order_by(*ordering)
+        return queryset
+
+    def get_ordering(self, request, queryset, view):
+        params = request.query_params.get(self.ordering_param)
+        if not params and self.is_ranked(request, queryset, view):
+            return [RANK, *self.get_default_ordering(view)]
+        return super().get_ordering(request, queryset, view)
+
+    @staticmethod
+    def is_ranked(request, queryset, view):
+        search = next((backend for backend in view.filter_backends if issubclass(backend, FullTextSearchFilter)), None)
+        return (
+            search is not None
+            and bool(search().get_search_terms(request))
+            and has_search_table(queryset.db)
+        )
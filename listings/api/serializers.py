@@ -1,10 +1,36 @@
+import decimal
+from functools import lru_cache
 from django.contrib.auth.models import User, Group
-from rest_framework import serializers
-from .models import House
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from .models import House, MarketStats
+from .timing import timer
 
 # TODO: Create your serializers here.
 
-class HouseSerializer(serializers.ModelSerializer):
+class TimedSerializerMixin:
+    """Counts a serializer's output time toward the request's serialize timing."""
+    @property
+    def data(self):
+        with timer('serialize'):
+            return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+
+class HouseSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """
+    Serializer for House. Pass fields=[...] to include only some of the
+    fields, for this instance only.
+    """
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     class Meta:
         model = House
         fields = [
@@ -34,3 +60,107 @@ class HouseSerializer(serializers.ModelSerializer):
             'zipcode'
         ]
         read_only_fields = ['id']  # ID is auto-generated
+        list_serializer_class = TimedListSerializer
+
+
+def _decimal_converter(field):
+    """Precompiled equivalent of DecimalField.to_representation for non-None values."""
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if field.decimal_places is None or field.localize or not coerce_to_string:
+        return field.to_representation
+    quantum = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return format(value.quantize(quantum, rounding=rounding, context=context), 'f')
+    return convert
+
+
+def _date_converter(field):
+    """Precompiled equivalent of DateField.to_representation for non-None values."""
+    output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+    return lambda value: value if isinstance(value, str) else value.isoformat()
+
+
+# Fields whose database values already are their representation
+PASSTHROUGH_FIELDS = (serializers.CharField, serializers.IntegerField, serializers.FloatField)
+
+
+class HouseValuesSerializer:
+    """
+    Read-only serializer producing exactly what HouseSerializer would for
+    rows of values_list(*columns()) instead of House instances.
+
+    Converters are worked out once from HouseSerializer's own fields, and
+    only the decimal and date columns need one, so no model instances or
+    per-field serializer calls are involved.
+    """
+    def __init__(self, fields=None):
+        serializer_fields = HouseSerializer(fields=fields).fields
+        self.fields = list(serializer_fields)
+        self.converters = []
+        for name, field in serializer_fields.items():
+            if isinstance(field, serializers.DecimalField):
+                self.converters.append((name, _decimal_converter(field)))
+            elif isinstance(field, serializers.DateField):
+                self.converters.append((name, _date_converter(field)))
+            elif not isinstance(field, PASSTHROUGH_FIELDS):
+                self.converters.append((name, field.to_representation))
+
+    def columns(self, extra=()):
+        """Return the columns to select: the serialized fields, then any extra ones not among them."""
+        return self.fields + [name for name in extra if name not in self.fields]
+
+    def to_representation(self, rows):
+        names = self.fields
+        converters = self.converters
+        data = []
+        with timer('serialize'):
+            for row in rows:
+                item = dict(zip(names, row))
+                for name, convert in converters:
+                    value = item[name]
+                    if value is not None:
+                        item[name] = convert(value)
+                data.append(item)
+        return data
+
+
+@lru_cache(maxsize=256)
+def _values_serializer(fields):
+    return HouseValuesSerializer(None if fields is None else list(fields))
+
+
+def values_serializer(fields=None):
+    """
+    Return a HouseValuesSerializer for fields, shared by every request that
+    selects the same ones; building one costs far more than a row.
+    """
+    return _values_serializer(None if fields is None else tuple(fields))
+
+
+class MarketStatsSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Serializer for the market statistics of one zipcode, city or home type."""
+    class Meta:
+        model = MarketStats
+        list_serializer_class = TimedListSerializer
+        fields = [
+            'dimension',
+            'state',
+            'value',
+            'count',
+            'median_price',
+            'median_price_per_sqft',
+            'median_rent_to_price',
+            'median_rentzestimate',
+            'median_zestimate',
+            'median_tax_value',
+            'refreshed_at',
+        ]
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from .cache import bump_dataset_version
+from .models import House
+from .search import restore_search_triggers
+
+
+@receiver(post_save, sender=House)
+@receiver(post_delete, sender=House)
+def house_changed(sender, instance, using, **kwargs):
+    """Invalidate cached house data, when the write commits."""
+    bump_dataset_version()
+
+
+@receiver(post_migrate)
+def search_triggers(sender, using, **kwargs):
+    """Recreate the full-text index triggers that migrations rebuilding api_house dropped."""
+    if sender.name == 'api':
+        restore_search_triggers(using)
@@ -0,0 +1,156 @@
+"""
+Market statistics materialized from the listings into MarketStats.
+
+Each zipcode, city (within its state) and home type gets one row of
+medians. Groups are refreshed by streaming their listings in group order,
+so only one group's values are held in memory at a time. The import command
+refreshes just the groups its batches touched; refresh_market_stats with no
+groups rebuilds the whole table.
+"""
+from decimal import Decimal
+from statistics import median
+
+from django.db import router, transaction
+from django.db.models import FloatField, Q
+from django.db.models.functions import Cast
+
+from .models import House, MarketStats
+
+# House columns identifying a listing's group in each dimension, as
+# (state, value) pairs of folded keys
+GROUP_COLUMNS = {
+    'zipcode': (None, 'zipcode'),
+    'city': ('state_key', 'city_key'),
+    'home_type': (None, 'home_type_key'),
+}
+
+# Displayed (state, value) columns of each dimension
+LABEL_COLUMNS = {
+    'zipcode': (None, 'zipcode'),
+    'city': ('state', 'city'),
+    'home_type': (None, 'home_type'),
+}
+
+VALUE_COLUMNS = ['price', 'home_size', 'rentzestimate_amount', 'zestimate_amount', 'tax_value']
+
+CENTS = Decimal('0.01')
+
+# Groups deleted or written per statement
+CHUNK_SIZE = 500
+
+
+def listing_groups(fields):
+    """Return the (dimension, state_key, value_key) groups a listing's field values belong to."""
+    return {
+        (dimension, fields[state] if state else '', fields[value])
+        for dimension, (state, value) in GROUP_COLUMNS.items()
+        if fields[value]
+    }
+
+
+def _median(values):
+    return Decimal(median(values)).quantize(CENTS) if values else None
+
+
+def summarize(dimension, key, label, rows):
+    """Return an unsaved MarketStats for a group from its (price, home_size, rent, zestimate, tax) float rows."""
+    prices, per_sqft, rent_to_price, rents, zestimates, taxes = [], [], [], [], [], []
+    for price, home_size, rent, zestimate, tax_value in rows:
+        if price is not None:
+            prices.append(price)
+            if home_size:
+                per_sqft.append(price / home_size)
+            if rent is not None and price:
+                rent_to_price.append(rent / price)
+        if rent is not None:
+            rents.append(rent)
+        if zestimate is not None:
+            zestimates.append(zestimate)
+        if tax_value is not None:
+            taxes.append(tax_value)
+    return MarketStats(
+        dimension=dimension,
+        state_key=key[0], value_key=key[1],
+        state=label[0], value=label[1],
+        count=len(rows),
+        median_price=_median(prices),
+        median_price_per_sqft=_median(per_sqft),
+        median_rent_to_price=round(median(rent_to_price), 6) if rent_to_price else None,
+        median_rentzestimate=_median(rents),
+        median_zestimate=_median(zestimates),
+        median_tax_value=_median(taxes),
+    )
+
+
+def keys_filter(state, value, keys):
+    """Return a Q matching rows whose state and value columns are among the (state_key, value_key) keys."""
+    if state is None:
+        return Q(**{f'{value}__in': [value_key for _, value_key in keys]})
+    by_state = {}
+    for state_key, value_key in keys:
+        by_state.setdefault(state_key, []).append(value_key)
+    condition = Q()
+    for state_key, value_keys in by_state.items():
+        condition |= Q(**{state: state_key, f'{value}__in': value_keys})
+    return condition
+
+
+def compute(dimension, keys=None):
+    """Yield MarketStats for the groups of a dimension (all of them when keys is None)."""
+    state, value = GROUP_COLUMNS[dimension]
+    label_state, label_value = LABEL_COLUMNS[dimension]
+    group = [name for name in (state, value) if name]
+    labels = [name for name in (label_state, label_value) if name]
+    queryset = House.objects.all()
+    if keys is not None:
+        queryset = queryset.filter(keys_filter(state, value, keys))
+    # Read as floats, which skips the Decimal conversion of every value
+    casts = [Cast(name, FloatField()) for name in VALUE_COLUMNS]
+    rows = queryset.order_by(*group).values_list(*group, *labels, *casts).iterator(chunk_size=10000)
+
+    width = len(group)
+    current, label, values = None, None, []
+    for row in rows:
+        key = tuple(row[:width])
+        if not key[-1]:
+            # Listings without the value are in no group
+            continue
+        if key != current:
+            if values:
+                yield summarize(dimension, _pair(current), _pair(label), values)
+            current, label, values = key, tuple(row[width:2 * width]), []
+        values.append(row[2 * width:])
+    if values:
+        yield summarize(dimension, _pair(current), _pair(label), values)
+
+
+def _pair(key):
+    return key if len(key) == 2 else ('', key[0])
+
+
+def refresh_market_stats(groups=None):
+    """
+    Recompute MarketStats for the given (dimension, state_key, value_key)
+    groups, dropping those with no listings left, or for every group when
+    groups is None. Returns the number of rows written.
+    """
+    using = router.db_for_write(MarketStats)
+    written = 0
+    for dimension, _ in MarketStats.DIMENSIONS:
+        if groups is None:
+            keys = None
+        else:
+            keys = sorted({(state_key, value_key) for name, state_key, value_key in groups if name == dimension})
+            if not keys:
+                continue
+        chunks = [keys] if keys is None else [keys[i:i + CHUNK_SIZE] for i in range(0, len(keys), CHUNK_SIZE)]
+        for chunk in chunks:
+            stats = list(compute(dimension, chunk))
+            with transaction.atomic(using=using):
+                existing = MarketStats.objects.filter(dimension=dimension)
+                if chunk is not None:
+                    existing = existing.filter(keys_filter('state_key', 'value_key', chunk))
+                existing.delete()
+                MarketStats.objects.bulk_create(stats, batch_size=CHUNK_SIZE)
+            written += len(stats)
+    return written
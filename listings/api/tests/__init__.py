@@ -1,3 +1,34 @@
 """
 Test suite for the House Listings API.
-""" 
\ No newline at end of file
+"""
+import os
+import tempfile
+from io import StringIO
+from django.conf import settings
+from django.core.management import call_command
+from django.test import override_settings
+
+
+def in_another_process():
+    """
+    Run code as a separate process would, such as an import: with caches of
+    its own, sharing only the database with the test's requests.
+    """
+    return override_settings(CACHES={
+        alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'another-process-{alias}'}
+        for alias in settings.CACHES
+    })
+
+
+def import_elsewhere(rows):
+    """Run import_house_data on CSV rows (see test_import_house_data.make_row) as a separate process would."""
+    from .test_import_house_data import HEADER
+
+    handle, csv_path = tempfile.mkstemp(suffix='.csv')
+    with os.fdopen(handle, 'w') as file:
+        file.write('\n'.join([HEADER] + rows) + '\n')
+    try:
+        with in_another_process():
+            call_command('import_house_data', csv_path, stdout=StringIO())
+    finally:
+        os.remove(csv_path)
@@ -0,0 +1,100 @@
+from unittest import mock
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from ..autocomplete import Autocomplete, PrefixIndex
+from ..indexes import ProcessIndex
+from ..models import House
+from ..middleware import RateLimitMiddleware
+from . import import_elsewhere
+from .test_import_house_data import make_row
+
+
+class PrefixIndexTest(SimpleTestCase):
+    def setUp(self):
+        self.index = PrefixIndex({
+            'san diego': ('San Diego', 5),
+            'san jose': ('San Jose', 9),
+            'santa cruz': ('Santa Cruz', 5),
+            'sacramento': ('Sacramento', 2),
+            's': ('S', 1),
+            'oakland': ('Oakland', 7),
+        })
+
+    def test_most_common_first(self):
+        """Test that completions are ordered by count, then alphabetically."""
+        self.assertEqual(
+            self.index.complete('san', 10),
+            [('San Jose', 9), ('San Diego', 5), ('Santa Cruz', 5)],
+        )
+        self.assertEqual(self.index.complete('sa', 2), [('San Jose', 9), ('San Diego', 5)])
+
+    def test_long_and_unmatched_prefixes(self):
+        """Test prefixes past the precomputed length and prefixes with no completions."""
+        self.assertEqual(self.index.complete('san d', 10), [('San Diego', 5)])
+        self.assertEqual(self.index.complete('santa cruz', 10), [('Santa Cruz', 5)])
+        self.assertEqual(self.index.complete('x', 10), [])
+        self.assertEqual(self.index.complete('s', 1), [('San Jose', 9)])
+
+
+@override_settings(HOUSE_INDEX_REFRESH_INTERVAL=0)
+class AutocompleteViewTest(TestCase):
+    def setUp(self):
+        RateLimitMiddleware.reset_counter()
+        self.client = APIClient()
+        self.url = reverse('house-autocomplete')
+        for i, (address, city, zipcode) in enumerate([
+            ('12 Main St', 'Springfield', '12345'),
+            ('14 Main St', 'Springfield', '12346'),
+            ('3 Spring Rd', 'Shelbyville', '54321'),
+        ]):
+            House.objects.create(
+                area_unit='SqFt', bathrooms=2.0, bedrooms=3, home_size=2000, home_type='Single Family',
+                link='https://example.com/house', price=300000.00, zillow_id=str(i),
+                address=address, city=city, state='TS', zipcode=zipcode,
+            )
+
+    def test_completions(self):
+        """Test completions across kinds, ignoring case, with counts."""
+        response = self.client.get(self.url, {'q': 'SPR'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [
+            {'value': 'Springfield', 'kind': 'city', 'count': 2},
+        ])
+
+        response = self.client.get(self.url, {'q': '1', 'kind': 'zipcode,address', 'limit': 3})
+        self.assertEqual([result['value'] for result in response.data['results']], ['12 Main St', '12345', '12346'])
+
+    def test_follows_writes(self):
+        """Test that the index is rebuilt once the houses change."""
+        self.client.get(self.url, {'q': 'spr'})
+        House.objects.filter(city='Springfield').update(city='Capital City')
+        House.objects.first().save()
+
+        response = self.client.get(self.url, {'q': 'c'})
+        self.assertEqual(response.data['results'], [{'value': 'Capital City', 'kind': 'city', 'count': 2}])
+
+    def test_follows_imports_elsewhere(self):
+        """Test that the index is rebuilt after an import run by another process."""
+        self.client.get(self.url, {'q': 'w'})
+        import_elsewhere([make_row('100'), make_row('101')])
+
+        response = self.client.get(self.url, {'q': 'w'})
+        self.assertEqual(response.data['results'], [{'value': 'West Hills', 'kind': 'city', 'count': 2}])
+
+    @override_settings(HOUSE_INDEX_REFRESH_INTERVAL=60)
+    def test_version_checked_once_per_interval(self):
+        """Test that lookups in quick succession read the dataset version only once."""
+        index = ProcessIndex(Autocomplete.build, 'test')
+        built = index.get()
+        with self.assertNumQueries(0):
+            self.assertIs(index.get(), built)
+        with mock.patch('api.indexes.VERSION_CHECK_INTERVAL', 0), self.assertNumQueries(1):
+            self.assertIs(index.get(), built)
+
+    def test_invalid_parameters(self):
+        """Test that unknown kinds and out of range limits are rejected."""
+        self.assertEqual(self.client.get(self.url, {'q': 's', 'kind': 'state'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'q': 's', 'limit': 0}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url).data['results'], [])
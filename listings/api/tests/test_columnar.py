@@ -0,0 +1,58 @@
+import io
+from django.test import SimpleTestCase
+from .. import columnar, importer
+from .test_import_house_data import HEADER, make_row
+
+class ColumnarCleaningTest(SimpleTestCase):
+    def clean(self, records_function, rows):
+        file = io.BytesIO(('\n'.join([HEADER] + rows) + '\n').encode('utf-8'))
+        fieldnames, offset = importer.read_header(file)
+        return list(records_function(file, fieldnames, offset))
+
+    def assertSameAsPerCell(self, rows):
+        expected = self.clean(importer.iter_records, rows)
+        actual = self.clean(columnar.iter_records_columnar, rows)
+        self.assertEqual(expected, actual)
+        # Decimal exponents must match too, e.g. 1200000.0 rather than 1200000
+        self.assertEqual([repr(record) for record in expected], [repr(record) for record in actual])
+
+    def test_feed_shapes(self):
+        """Test the value shapes found in the sample feed."""
+        self.assertSameAsPerCell([
+            make_row('1', price='$739K'),
+            make_row('2', price='$1.2M'),
+            make_row('3', price='$1.93M'),
+            make_row('4', price='709630'),
+            make_row('5', price=''),
+        ])
+
+    def test_irregular_cells_fall_back_to_per_cell_cleaners(self):
+        """Test cells outside the fast path, including ones that fail the row."""
+        row = make_row('1')
+        self.assertSameAsPerCell([
+            make_row('1', price='"$1,234.567K"'),
+            make_row('2', price='-5'),
+            make_row('3', price='abc'),
+            make_row('4', price='5KK'),
+            make_row('5', price='123456789012345678M'),
+            make_row('9', price='1e99'),
+            make_row('10', price='$1e30M'),
+            make_row('6', bedrooms='3.9'),
+            make_row('7', bedrooms='nan'),
+            make_row('8', bedrooms='1e3'),
+            row.replace('12/18/2017', '8/7/2018'),
+            row.replace('12/18/2017', '02/30/2018'),
+            row.replace('12/18/2017', '13/01/2018'),
+            row.replace('12/18/2017', '00/10/0000'),
+            row.replace('12/18/2017', ' 02/29/2016 '),
+            row.replace('SqFt,2.0', 'SqFt, 2.50'),
+            'SqFt,2.0,4',
+        ])
+
+    def test_unhashable_values_fail_their_row(self):
+        """Test that values the content hash cannot normalize fail only their own row."""
+        rows = [make_row('1', price='1e99'), make_row('2'), make_row('3', price='$1e30M')]
+        records = self.clean(columnar.iter_records_columnar, rows)
+        self.assertEqual(records, self.clean(importer.iter_records, rows))
+        self.assertEqual([zillow_id for _, zillow_id, _, error in records if error], ['1', '3'])
+        self.assertIsNotNone(records[1][2])
@@ -0,0 +1,73 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from ..comparables import Comparables
+from ..models import House
+from ..middleware import RateLimitMiddleware
+from . import import_elsewhere
+from .test_import_house_data import make_row
+
+
+def make_house(zillow_id, zipcode='12345', state='TS', **fields):
+    data = {
+        'area_unit': 'SqFt', 'bathrooms': 2.0, 'bedrooms': 3, 'home_size': 2000, 'home_type': 'Single Family',
+        'link': 'https://example.com/house', 'price': 300000.00, 'year_built': 1990, 'property_size': 5000,
+        'address': f'{zillow_id} Test St', 'city': 'Test City', 'state': state, 'zipcode': zipcode,
+    }
+    data.update(fields)
+    return House.objects.create(zillow_id=zillow_id, **data)
+
+
+@override_settings(HOUSE_INDEX_REFRESH_INTERVAL=0)
+class ComparablesTest(TestCase):
+    def setUp(self):
+        RateLimitMiddleware.reset_counter()
+        self.client = APIClient()
+        self.house = make_house('1')
+        self.close = make_house('2', price=310000.00, home_size=2100)
+        self.far = make_house('3', price=900000.00, bedrooms=6, bathrooms=4.0, home_size=5000)
+        self.missing = make_house('4', price=None, year_built=None, property_size=None)
+        self.elsewhere = make_house('5', zipcode='54321', price=300000.00)
+        make_house('6', state='XX', price=300000.00)
+
+    def test_nearest(self):
+        """Test that comparables are the nearest listings in the scope, excluding the house itself."""
+        index = Comparables.build()
+        self.assertEqual(len(index), 6)
+        nearest = index.nearest(self.house, 'zipcode', 10)
+        self.assertEqual([pk for pk, _ in nearest][:1], [self.close.pk])
+        self.assertEqual([pk for pk, _ in nearest][-1], self.far.pk)
+        self.assertEqual({pk for pk, _ in nearest}, {self.close.pk, self.far.pk, self.missing.pk})
+        self.assertEqual(sorted(distance for _, distance in nearest), [distance for _, distance in nearest])
+
+        self.assertEqual(len(index.nearest(self.house, 'state', 10)), 4)
+        self.assertEqual(len(index.nearest(self.house, 'state', 2)), 2)
+
+    def test_comparables_endpoint(self):
+        """Test the comparables action, its parameters and its refresh after writes."""
+        url = reverse('house-comparables', kwargs={'pk': self.house.pk})
+        response = self.client.get(url, {'k': 2, 'fields': 'id,price'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['id'] for result in response.data['results']], [self.close.pk, self.missing.pk])
+        self.assertEqual(set(response.data['results'][0]), {'id', 'price', 'distance'})
+
+        self.close.delete()
+        newcomer = make_house('7', price=300000.00)
+        response = self.client.get(url, {'k': 1})
+        self.assertEqual([result['id'] for result in response.data['results']], [newcomer.pk])
+
+        self.assertEqual(self.client.get(url, {'scope': 'city'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'k': 100}).status_code, status.HTTP_400_BAD_REQUEST)
+        missing_url = reverse('house-comparables', kwargs={'pk': 999})
+        self.assertEqual(self.client.get(missing_url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_follows_imports_elsewhere(self):
+        """Test that the matrix is rebuilt after an import run by another process."""
+        url = reverse('house-comparables', kwargs={'pk': self.house.pk})
+        self.assertEqual([result['id'] for result in self.client.get(url, {'k': 1}).data['results']], [self.close.pk])
+
+        # The closest listing is re-imported in another zipcode
+        import_elsewhere([make_row(self.close.zillow_id)])
+        response = self.client.get(url, {'k': 1})
+        self.assertEqual([result['id'] for result in response.data['results']], [self.missing.pk])
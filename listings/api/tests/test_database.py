@@ -0,0 +1,47 @@
+import sqlite3
+from types import SimpleNamespace
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase
+from ..database import REPLICA, ReadReplicaRouter, apply_pragmas
+from ..models import House
+
+
+class ApplyPragmasTest(SimpleTestCase):
+    def connection(self, vendor='sqlite', pragmas=None):
+        return SimpleNamespace(
+            vendor=vendor,
+            settings_dict={'PRAGMAS': pragmas} if pragmas else {},
+            connection=sqlite3.connect(':memory:'),
+        )
+
+    def test_pragmas_applied(self):
+        """Test that each PRAGMA of the alias runs on a new connection."""
+        connection = self.connection(pragmas={'cache_size': -2048, 'query_only': 'ON'})
+        apply_pragmas(sender=None, connection=connection)
+
+        self.assertEqual(connection.connection.execute('PRAGMA cache_size').fetchone()[0], -2048)
+        self.assertEqual(connection.connection.execute('PRAGMA query_only').fetchone()[0], 1)
+
+    def test_other_connections_untouched(self):
+        """Test that connections without PRAGMAS, or not to SQLite, are left alone."""
+        for connection in [self.connection(), self.connection(vendor='postgresql', pragmas={'query_only': 'ON'})]:
+            apply_pragmas(sender=None, connection=connection)
+            self.assertEqual(connection.connection.execute('PRAGMA query_only').fetchone()[0], 0)
+
+
+class ReadReplicaRouterTest(SimpleTestCase):
+    router = ReadReplicaRouter()
+
+    def test_routing(self):
+        """Test that reads go to the replica and writes and migrations to default."""
+        self.assertEqual(self.router.db_for_read(House), REPLICA)
+        self.assertEqual(self.router.db_for_write(House), 'default')
+        self.assertTrue(self.router.allow_migrate('default', 'api'))
+        self.assertFalse(self.router.allow_migrate(REPLICA, 'api'))
+
+
+class ReadReplicaTransactionTest(TestCase):
+    def test_reads_in_transaction(self):
+        """Test that reads inside a transaction on default stay there, to see its writes."""
+        with transaction.atomic():
+            self.assertEqual(ReadReplicaRouter().db_for_read(House), 'default')
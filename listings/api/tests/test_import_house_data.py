@@ -0,0 +1,180 @@
+import gzip
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from ..management.commands.import_house_data import Command
+from ..models import House, ImportCheckpoint, MarketStats
+
+HEADER = (
+    'area_unit,bathrooms,bedrooms,home_size,home_type,last_sold_date,last_sold_price,link,price,'
+    'property_size,rent_price,rentzestimate_amount,rentzestimate_last_updated,tax_value,tax_year,'
+    'year_built,zestimate_amount,zestimate_last_updated,zillow_id,address,city,state,zipcode'
+)
+
+def make_row(zillow_id, price='$739K', bedrooms='4'):
+    return (
+        f'SqFt,2.0,{bedrooms},1372,SingleFamily,12/18/2017,720000,https://example.com/{zillow_id},{price},'
+        f'10611,,2850,08/07/2018,215083.0,2017,1956,709630,08/07/2018,{zillow_id},'
+        f'7417 Quimby Ave,West Hills,CA,91307'
+    )
+
+class ImportHouseDataTest(TestCase):
+    def setUp(self):
+        handle, self.csv_path = tempfile.mkstemp(suffix='.csv')
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.csv_path)
+
+    def write_csv(self, rows):
+        with open(self.csv_path, 'w') as file:
+            file.write('\n'.join([HEADER] + rows) + '\n')
+
+    def run_import(self, *args):
+        out = StringIO()
+        call_command('import_house_data', self.csv_path, *args, stdout=out)
+        return out.getvalue()
+
+    def test_batched_import(self):
+        """Test that rows are written across several batches."""
+        self.write_csv([make_row(str(i)) for i in range(1, 8)])
+        output = self.run_import('--batch-size', '3')
+        self.assertEqual(House.objects.count(), 7)
+        self.assertIn('7 created, 0 updated', output)
+        self.assertIn('rows/sec', output)
+
+        house = House.objects.get(zillow_id='1')
+        self.assertEqual(house.price, 739000)
+        self.assertEqual(house.last_sold_date.isoformat(), '2017-12-18')
+        self.assertEqual((house.city_key, house.state_key, house.home_type_key), ('west hills', 'ca', 'singlefamily'))
+
+    def test_reimport_upserts_on_zillow_id(self):
+        """Test that existing zillow_ids are updated instead of skipped."""
+        self.write_csv([make_row('1'), make_row('2')])
+        self.run_import()
+
+        self.write_csv([make_row('1', price='$1.2M'), make_row('3')])
+        output = self.run_import()
+        self.assertIn('1 created, 1 updated', output)
+        self.assertEqual(House.objects.count(), 3)
+        self.assertEqual(House.objects.get(zillow_id='1').price, 1200000)
+
+    def test_bad_rows_are_skipped_individually(self):
+        """Test that a bad row is reported without losing the rest of its batch."""
+        self.write_csv([make_row('1'), make_row('2', bedrooms=''), make_row('3')])
+        output = self.run_import('--batch-size', '10')
+        self.assertIn('Error processing row: 2', output)
+        self.assertIn('Skipped 1 houses', output)
+        self.assertEqual(
+            sorted(House.objects.values_list('zillow_id', flat=True)), ['1', '3']
+        )
+
+    def test_parallel_import_matches_serial(self):
+        """Test that --workers produces the same rows as a serial import."""
+        self.write_csv([make_row(str(i), price=f'${i}K') for i in range(1, 51)])
+        self.run_import('--workers', '1')
+        serial = list(House.objects.order_by('zillow_id').values())
+        House.objects.all().delete()
+
+        output = self.run_import('--workers', '3', '--batch-size', '7')
+        self.assertIn('50 created', output)
+        parallel = list(House.objects.order_by('zillow_id').values())
+        for row in serial + parallel:
+            del row['id']
+        self.assertEqual(serial, parallel)
+
+    def test_delta_import_skips_unchanged_rows(self):
+        """Test that --delta only writes rows whose content changed."""
+        self.write_csv([make_row('1'), make_row('2'), make_row('3')])
+        self.run_import()
+
+        self.write_csv([make_row('1'), make_row('2', price='$800K'), make_row('3'), make_row('4')])
+        output = self.run_import('--delta')
+        self.assertIn('1 created, 1 updated, 2 unchanged, 0 deleted', output)
+        self.assertEqual(House.objects.get(zillow_id='2').price, 800000)
+
+    def test_delta_import_detects_api_edits(self):
+        """Test that a listing edited outside the import is restored from the feed."""
+        self.write_csv([make_row('1')])
+        self.run_import()
+        house = House.objects.get(zillow_id='1')
+        house.bedrooms = 9
+        house.save()
+
+        output = self.run_import('--delta')
+        self.assertIn('1 updated, 0 unchanged', output)
+        self.assertEqual(House.objects.get(zillow_id='1').bedrooms, 4)
+
+    def test_delete_missing(self):
+        """Test that --delete-missing removes listings absent from the feed."""
+        self.write_csv([make_row('1'), make_row('2'), make_row('3')])
+        self.run_import()
+
+        self.write_csv([make_row('1'), make_row('3', bedrooms='')])
+        output = self.run_import('--delta', '--delete-missing')
+        self.assertIn('1 deleted', output)
+        self.assertEqual(
+            sorted(House.objects.values_list('zillow_id', flat=True)), ['1', '3']
+        )
+
+    def test_delete_missing_invalidates_once_per_batch(self):
+        """Test that deleted listings move the dataset version on once per batch, not once per row."""
+        self.write_csv([make_row(str(i)) for i in range(1, 6)])
+        self.run_import()
+
+        self.write_csv([make_row('1')])
+        with mock.patch('api.signals.bump_dataset_version') as signal_bump, \
+                mock.patch('api.management.commands.import_house_data.bump_dataset_version') as import_bump:
+            output = self.run_import('--delta', '--delete-missing', '--batch-size', '3')
+        self.assertIn('4 deleted', output)
+        self.assertEqual((signal_bump.call_count, import_bump.call_count), (0, 2))
+
+    def test_gzip_import(self):
+        """Test that gzip-compressed files are streamed transparently."""
+        with gzip.open(self.csv_path, 'wt') as file:
+            file.write('\n'.join([HEADER, make_row('1'), make_row('2')]) + '\n')
+        output = self.run_import()
+        self.assertIn('2 created', output)
+
+    def test_resume_from_checkpoint(self):
+        """Test that --resume continues after the last committed batch."""
+        self.write_csv([make_row(str(i)) for i in range(1, 8)])
+        upsert = Command.upsert
+        calls = []
+
+        def failing_upsert(command, rows, stats):
+            calls.append(rows)
+            if len(calls) == 3:
+                raise RuntimeError('simulated crash')
+            return upsert(command, rows, stats)
+
+        with mock.patch.object(Command, 'upsert', failing_upsert):
+            with self.assertRaises(CommandError):
+                self.run_import('--batch-size', '2')
+        self.assertEqual(House.objects.count(), 4)
+        checkpoint = ImportCheckpoint.objects.get()
+        self.assertEqual(checkpoint.row_number, 4)
+
+        output = self.run_import('--batch-size', '2', '--resume')
+        self.assertIn('Resuming after row 4', output)
+        self.assertIn('3 created', output)
+        self.assertEqual(House.objects.count(), 7)
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_market_stats_follow_imports(self):
+        """Test that imports refresh the market stats of the groups they touch."""
+        self.write_csv([make_row('1'), make_row('2', price='$800K')])
+        self.run_import()
+        stats = MarketStats.objects.get(dimension='zipcode', value_key='91307')
+        self.assertEqual((stats.count, stats.median_price), (2, 769500))
+
+        self.write_csv([make_row('2', price='$800K').replace('91307', '91306')])
+        self.run_import()
+        stats = MarketStats.objects.get(dimension='zipcode', value_key='91307')
+        self.assertEqual((stats.count, stats.median_price), (1, 739000))
+        self.assertEqual(MarketStats.objects.get(dimension='zipcode', value_key='91306').count, 1)
+        self.assertEqual(MarketStats.objects.get(dimension='city').count, 2)
@@ -0,0 +1,76 @@
+import json
+import tempfile
+from pathlib import Path
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from ..metrics import Counter, Histogram, Registry
+from ..middleware import RateLimitMiddleware
+from ..models import House
+
+
+class RegistryTest(SimpleTestCase):
+    def setUp(self):
+        self.registry = Registry()
+        self.requests = self.registry.register(Counter('requests_total', 'Requests.', ['route']))
+        self.latency = self.registry.register(Histogram('latency_seconds', 'Latency.', ['route'], buckets=[0.1, 1]))
+
+    def test_exposition(self):
+        """Test the text format of counters and cumulative histogram buckets."""
+        self.requests.inc(route='list')
+        self.requests.inc(2, route='list')
+        for amount in [0.05, 0.1, 0.5, 3]:
+            self.latency.observe(amount, route='list')
+
+        lines = self.registry.exposition().splitlines()
+        self.assertIn('# TYPE requests_total counter', lines)
+        self.assertIn('requests_total{route="list"} 3', lines)
+        self.assertIn('# TYPE latency_seconds histogram', lines)
+        self.assertIn('latency_seconds_bucket{route="list",le="0.1"} 2', lines)
+        self.assertIn('latency_seconds_bucket{route="list",le="1.0"} 3', lines)
+        self.assertIn('latency_seconds_bucket{route="list",le="+Inf"} 4', lines)
+        self.assertIn('latency_seconds_sum{route="list"} 3.65', lines)
+        self.assertIn('latency_seconds_count{route="list"} 4', lines)
+
+    def test_processes_add_up(self):
+        """Test that the values other processes wrote to the directory are added in."""
+        self.requests.inc(route='list')
+        self.latency.observe(0.5, route='list')
+        with tempfile.TemporaryDirectory() as directory:
+            # Another process's last write, and this process's own stale one
+            other = {'requests_total': [[['list'], 4], [['detail'], 1]], 'latency_seconds': [[['list'], [1, 0, 0, 2.0]]]}
+            (Path(directory) / '1.json').write_text(json.dumps(other))
+            self.registry.flush(directory)
+            self.requests.inc(route='list')
+
+            collected = self.registry.collect(directory)
+        self.assertEqual(collected['requests_total'], {('list',): 6, ('detail',): 1})
+        self.assertEqual(collected['latency_seconds'], {('list',): [1, 1, 0, 2.5]})
+
+
+class MetricsViewTest(TestCase):
+    def setUp(self):
+        RateLimitMiddleware.reset_counter()
+        self.client = APIClient()
+        House.objects.create(
+            area_unit='SqFt', bathrooms=2.0, bedrooms=3, home_size=2000, home_type='Single Family',
+            link='https://example.com/house', price=300000.00, zillow_id='1',
+            address='12 Main St', city='Springfield', state='TS', zipcode='12345',
+        )
+
+    def test_metrics(self):
+        """Test that requests, queries, cache lookups and rejections are reported."""
+        self.client.get(reverse('house-list'))
+        self.client.get(reverse('house-list'))
+        with override_settings(API_RATE_LIMIT=1):
+            self.client.get(reverse('house-list'))
+
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        text = response.content.decode()
+        self.assertIn('api_request_duration_seconds_count{route="house-list",method="GET",status="200"}', text)
+        self.assertIn('api_db_queries_total{route="house-list"}', text)
+        self.assertIn('api_cache_requests_total{kind="list",result="hit"}', text)
+        self.assertIn('api_rate_limit_rejections_total{client="ip"}', text)
@@ -1,13 +1,22 @@
-from django.test import TestCase, RequestFactory
+from django.contrib.auth.models import User
+from django.test import AsyncClient, TestCase, RequestFactory, override_settings
+from django.http import HttpResponse
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
+from rest_framework.authtoken.models import Token
 from ..middleware import RequestLoggingMiddleware, ErrorHandlingMiddleware, RateLimitMiddleware
+from ..logs import BackgroundHandler, JSONFormatter
 from ..models import House
+import asyncio
 import json
+import logging
+import threading
+from unittest import mock
 
 class MiddlewareTest(TestCase):
     def setUp(self):
+        RateLimitMiddleware.reset_counter()
         self.factory = RequestFactory()
         self.client = APIClient()
         self.house_data = {
@@ -36,6 +45,50 @@ class MiddlewareTest(TestCase):
         # The 101st request should be rate limited
         self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
         self.assertIn('error', json.loads(response.content))
+        self.assertEqual(response['X-RateLimit-Remaining'], '0')
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+    @override_settings(API_RATE_LIMIT=3)
+    def test_rate_limit_headers(self):
+        """Test that responses report the limit and the requests left."""
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-RateLimit-Limit'], '3')
+        self.assertEqual(response['X-RateLimit-Remaining'], '2')
+        self.assertLessEqual(int(response['X-RateLimit-Reset']), 60)
+
+    @override_settings(API_RATE_LIMIT=2)
+    def test_rate_limit_per_client(self):
+        """Test that clients are limited separately, by token or by IP address."""
+        for _ in range(3):
+            response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        # Another address has its own budget
+        response = self.client.get(self.list_url, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # So does a token from the throttled address, but not a made-up one
+        token = Token.objects.create(user=User.objects.create_user('limited'))
+        response = self.client.get(self.list_url, HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(self.list_url, HTTP_AUTHORIZATION='Token made-up')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(API_RATE_LIMIT=2)
+    def test_rate_limit_ignores_spoofed_forwarded_for(self):
+        """Test that X-Forwarded-For only identifies clients behind trusted proxies."""
+        for i in range(3):
+            response = self.client.get(self.list_url, HTTP_X_FORWARDED_FOR=f'10.1.0.{i}')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        # Behind one proxy, the entry it added identifies the client, whatever the client sent before it
+        with override_settings(API_RATE_LIMIT_TRUSTED_PROXIES=1):
+            for i in range(3):
+                response = self.client.get(self.list_url, HTTP_X_FORWARDED_FOR=f'10.1.0.{i}, 10.2.0.1')
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            response = self.client.get(self.list_url, HTTP_X_FORWARDED_FOR='10.2.0.2')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
 
     def test_error_handling(self):
         """Test that error handling middleware works."""
@@ -53,4 +106,117 @@ class MiddlewareTest(TestCase):
         # Make a request and check if it's logged
         response = self.client.get(self.list_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        # Note: In a real test, you would check the log file or mock the logger 
\ No newline at end of file
+        # Note: In a real test, you would check the log file or mock the logger 
+
+    def test_server_timing(self):
+        """Test that responses break their time down into db, serialize and render."""
+        response = self.client.get(reverse('house-detail', args=[self.house.pk]))
+        metrics = {
+            metric.split(';')[0]: dict(part.split('=', 1) for part in metric.split(';')[1:])
+            for metric in response['Server-Timing'].split(', ')
+        }
+        self.assertEqual(list(metrics), ['db', 'serialize', 'render', 'total'])
+        # The dataset version and the house
+        self.assertEqual(metrics['db']['desc'], '"2 queries"')
+        self.assertGreater(float(metrics['serialize']['dur']), 0)
+        self.assertGreater(float(metrics['render']['dur']), 0)
+        self.assertGreaterEqual(
+            float(metrics['total']['dur']),
+            sum(float(metrics[name]['dur']) for name in ['db', 'serialize', 'render']),
+        )
+
+    def test_structured_logs(self):
+        """Test that log records are written as JSON by a background thread."""
+        class ListHandler(logging.Handler):
+            def __init__(self):
+                super().__init__()
+                self.lines = []
+
+            def emit(self, record):
+                self.lines.append(self.format(record))
+
+        target = ListHandler()
+        target.setFormatter(JSONFormatter())
+        handler = BackgroundHandler([target])
+        logger = logging.getLogger('api.tests.structured')
+        logger.addHandler(handler)
+        try:
+            logger.warning('%s failed', 'import', extra={'rows': 3})
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+
+        entry = json.loads(target.lines[0])
+        self.assertEqual(entry['message'], 'import failed')
+        self.assertEqual(entry['level'], 'WARNING')
+        self.assertEqual(entry['rows'], 3)
+
+    async def test_async_middleware(self):
+        """Test that the middleware runs natively on an async request path."""
+        async def get_response(request):
+            return HttpResponse()
+
+        chain = RequestLoggingMiddleware(ErrorHandlingMiddleware(RateLimitMiddleware(get_response)))
+        for middleware in [chain, chain.get_response, chain.get_response.get_response]:
+            self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        response = await chain(self.factory.get(self.list_url))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('total;dur=', response['Server-Timing'])
+        self.assertEqual(response['X-RateLimit-Remaining'], '99')
+
+        # And through Django's async handler, whichever mode the chain runs in
+        client = AsyncClient()
+        response = await client.get(self.list_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('desc="0 queries"', response['Server-Timing'])
+        response = await client.get('/api/nonexistent/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(json.loads(response.content)['error'], 'Not found')
+
+    async def test_async_rate_limit_off_event_loop(self):
+        """Test that the async path makes its cache calls in a thread, not on the event loop."""
+        async def get_response(request):
+            return HttpResponse()
+
+        threads = []
+        get_cache = RateLimitMiddleware.get_cache
+
+        def recording_get_cache(*args):
+            threads.append(threading.get_ident())
+            return get_cache()
+
+        middleware = RateLimitMiddleware(get_response)
+        request = self.factory.get(self.list_url, HTTP_AUTHORIZATION='Token unknown')
+        with mock.patch.object(RateLimitMiddleware, 'get_cache', recording_get_cache):
+            response = await middleware(request)
+        self.assertEqual(response['X-RateLimit-Remaining'], '99')
+        self.assertTrue(threads)
+        self.assertNotIn(threading.get_ident(), threads)
+
+    def test_async_capable_read_when_chain_built(self):
+        """Test that async capability follows API_ASYNC_MIDDLEWARE when the chain is built, not at import."""
+        for enabled in [False, True]:
+            with override_settings(API_ASYNC_MIDDLEWARE=enabled):
+                self.assertIs(RateLimitMiddleware.async_capable, enabled)
+
+    async def test_asgi_export(self):
+        """Test that the export streams under ASGI, reading the rows in a worker thread."""
+        from listings.asgi import StreamingASGIHandler
+
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': reverse('house-export'), 'query_string': b'format=csv',
+            'headers': [(b'host', b'localhost')], 'client': ('127.0.0.1', 1), 'server': ('localhost', 80),
+        }
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        await StreamingASGIHandler()(scope, receive, send)
+        self.assertEqual(messages[0]['status'], status.HTTP_200_OK)
+        body = b''.join(message.get('body', b'') for message in messages[1:]).decode()
+        self.assertEqual(body.splitlines()[1].split(',')[0], str(self.house.pk))
+        self.assertFalse(messages[-1].get('more_body', False))
@@ -1,6 +1,10 @@
 from django.test import TestCase
 from django.core.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
 from ..models import House
+from ..search import FullTextSearchFilter
+from ..views import HouseViewSet
 
 class HouseModelTest(TestCase):
     def setUp(self):
@@ -52,4 +56,34 @@ class HouseModelTest(TestCase):
         self.house_data['home_size'] = -100
         with self.assertRaises(ValidationError):
             house = House(**self.house_data)
-            house.full_clean() 
\ No newline at end of file
+            house.full_clean()
+
+    def test_folded_keys_follow_saves(self):
+        """Test that the case-folded lookup columns are kept in sync on save."""
+        house = House.objects.create(**self.house_data)
+        self.assertEqual((house.city_key, house.state_key, house.home_type_key), ('test city', 'ts', 'single family'))
+
+        house.city = 'New CITY'
+        house.save(update_fields=['city'])
+        self.assertEqual(House.objects.get(pk=house.pk).city_key, 'new city')
+
+    def test_search_index_follows_writes(self):
+        """Test that the full-text index is kept in sync by inserts, updates, bulk updates and deletes."""
+        def matches(term):
+            return list(FullTextSearchFilter().filter_queryset(
+                Request(APIRequestFactory().get('/', {'search': term})), House.objects.all(), HouseViewSet
+            ).values_list('id', flat=True))
+
+        house = House.objects.create(**self.house_data)
+        self.assertEqual(matches('test'), [house.id])
+
+        house.city = 'Springfield'
+        house.save()
+        self.assertEqual(matches('springf'), [house.id])
+        self.assertEqual(matches('test city'), [])
+
+        House.objects.filter(pk=house.pk).update(address='7 Elm Rd')
+        self.assertEqual(matches('elm'), [house.id])
+
+        house.delete()
+        self.assertEqual(matches('elm'), [])
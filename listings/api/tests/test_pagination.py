@@ -0,0 +1,162 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from ..models import House
+from ..middleware import RateLimitMiddleware
+from . import import_elsewhere
+from .test_import_house_data import make_row
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        RateLimitMiddleware.reset_counter()
+        self.client = APIClient()
+        self.list_url = reverse('house-list')
+        # Repeated and missing values exercise the id tiebreaker and NULL ordering
+        for i in range(23):
+            House.objects.create(
+                area_unit='SqFt',
+                bathrooms=None if i % 5 == 0 else 1.5 + i % 3,
+                bedrooms=i % 4,
+                home_size=None if i % 7 == 0 else 1000 + (i % 6) * 100,
+                home_type='SingleFamily',
+                link=f'https://example.com/{i}',
+                price=None if i % 6 == 0 else 100000 + (i % 5) * 50000,
+                year_built=None if i % 4 == 0 else 1950 + i % 3,
+                zillow_id=str(i),
+                address=f'{i} Test St',
+                city='Test City',
+                state='TS',
+                zipcode='12345',
+            )
+
+    def expected_ids(self, ordering):
+        field = ordering.lstrip('-')
+        descending = ordering.startswith('-')
+        houses = list(House.objects.all())
+        present = sorted(
+            (house for house in houses if getattr(house, field) is not None),
+            key=lambda house: (getattr(house, field), house.pk), reverse=descending,
+        )
+        missing = sorted(
+            (house for house in houses if getattr(house, field) is None),
+            key=lambda house: house.pk, reverse=descending,
+        )
+        return [house.pk for house in present + missing]
+
+    def walk(self, url, direction):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            page = [house['id'] for house in response.data['results']]
+            ids = ids + page if direction == 'next' else page + ids
+            last = response
+            url = response.data[direction]
+        return ids, last
+
+    def test_walks_every_ordering_field(self):
+        """Test that following next and previous links visits every row once, in order."""
+        for field in ['price', 'bedrooms', 'bathrooms', 'home_size', 'year_built']:
+            for ordering in [field, f'-{field}']:
+                with self.subTest(ordering=ordering):
+                    expected = self.expected_ids(ordering)
+                    ids, last = self.walk(f'{self.list_url}?pagination=cursor&ordering={ordering}', 'next')
+                    self.assertEqual(ids, expected)
+
+                    # Walk back from the last page
+                    back, first = self.walk(last.data['previous'], 'previous')
+                    self.assertEqual(back + [house['id'] for house in last.data['results']], expected)
+                    self.assertIsNone(first.data['previous'])
+
+    def test_default_ordering_with_filters(self):
+        """Test that cursors keep the filters and default ordering of the request."""
+        ids, _ = self.walk(f'{self.list_url}?pagination=cursor&min_bedrooms=2', 'next')
+        self.assertEqual(ids, [pk for pk in self.expected_ids('-price') if House.objects.get(pk=pk).bedrooms >= 2])
+
+    def test_no_count_query(self):
+        """Test that cursor pages never count the result set."""
+        response = self.client.get(f'{self.list_url}?pagination=cursor')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(response.data['next'])
+        self.assertNotIn('count', response.data)
+        self.assertFalse(any('COUNT' in query['sql'] for query in queries))
+
+    def test_invalid_cursor(self):
+        """Test that garbled cursors and cursors from another ordering are rejected."""
+        response = self.client.get(f'{self.list_url}?cursor=garbage')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        cursor = self.client.get(f'{self.list_url}?pagination=cursor').data['next']
+        response = self.client.get(f'{cursor}&ordering=bedrooms')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_number_pagination_is_default(self):
+        """Test that page number pagination is unchanged without the opt-in."""
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.data['count'], 23)
+
+@override_settings(HOUSE_COUNT_ESTIMATE_THRESHOLD=0)
+class CountCacheTest(TestCase):
+    def setUp(self):
+        RateLimitMiddleware.reset_counter()
+        cache.clear()
+        self.client = APIClient()
+        self.list_url = reverse('house-list')
+        for i in range(12):
+            House.objects.create(
+                area_unit='SqFt', bedrooms=i % 4, home_type='SingleFamily', link=f'https://example.com/{i}',
+                price=100000 + i * 1000, zillow_id=str(i), address=f'{i} Test St',
+                city='Test City', state='TS', zipcode='12345',
+            )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, sum('COUNT' in query['sql'] for query in queries)
+
+    def test_counts_are_cached_per_filter_signature(self):
+        """Test that equivalent filters share one cached count."""
+        response, counts = self.count_queries(f'{self.list_url}?city=Test City&min_bedrooms=2')
+        self.assertEqual((response.data['count'], counts), (6, 1))
+        self.assertFalse(response.data['count_approximate'])
+
+        response, counts = self.count_queries(f'{self.list_url}?min_bedrooms=2.0&city=TEST CITY&ordering=price&page=1')
+        self.assertEqual((response.data['count'], counts), (6, 0))
+
+    def test_writes_invalidate_counts(self):
+        """Test that saving or deleting a house refreshes the cached counts."""
+        self.client.get(self.list_url)
+        House.objects.get(zillow_id='0').delete()
+        response, counts = self.count_queries(self.list_url)
+        self.assertEqual((response.data['count'], counts), (11, 1))
+
+        House.objects.filter(zillow_id='1').get().save()
+        response, counts = self.count_queries(self.list_url)
+        self.assertEqual(counts, 1)
+
+    def test_imports_elsewhere_invalidate_counts(self):
+        """Test that an import run by another process refreshes the cached counts."""
+        self.client.get(self.list_url)
+        import_elsewhere([make_row('100'), make_row('101')])
+
+        response, counts = self.count_queries(self.list_url)
+        self.assertEqual((response.data['count'], counts), (14, 1))
+
+    @override_settings(HOUSE_COUNT_ESTIMATE_THRESHOLD=5)
+    def test_large_counts_are_estimated(self):
+        """Test that counts above the threshold are flagged as approximate and pages still work."""
+        response = self.client.get(self.list_url)
+        self.assertTrue(response.data['count_approximate'])
+        self.assertGreater(response.data['count'], 5)
+
+        response = self.client.get(f'{self.list_url}?page=2')
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNone(response.data['next'])
+
+        response = self.client.get(f'{self.list_url}?min_bedrooms=3')
+        self.assertEqual(response.data['count'], 3)
+        self.assertFalse(response.data['count_approximate'])
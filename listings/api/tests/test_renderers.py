@@ -0,0 +1,36 @@
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from unittest import mock
+from django.test import SimpleTestCase
+from rest_framework.renderers import JSONRenderer
+from .. import renderers
+from ..renderers import FastJSONRenderer
+
+class FastJSONRendererTest(SimpleTestCase):
+    data = OrderedDict([
+        ('count', 2),
+        ('next', None),
+        ('results', [
+            {'id': 1, 'price': '739000.00', 'bathrooms': 2.5, 'last_sold_date': '2017-12-18', 'city': 'Zürich'},
+            {'id': 2, 'price': None, 'sold': date(2018, 8, 7), 'amount': Decimal('1.10'), 'note': 'a\u2028b'},
+        ]),
+        ('updated', datetime(2018, 8, 7, 12, 30, 15, 123456, tzinfo=timezone.utc)),
+        (3, True),
+    ])
+
+    def test_matches_json_renderer(self):
+        """Test that output is byte-identical to JSONRenderer."""
+        self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    def test_indent_falls_back(self):
+        """Test that indented output is left to JSONRenderer."""
+        self.assertEqual(
+            FastJSONRenderer().render(self.data, 'application/json; indent=4'),
+            JSONRenderer().render(self.data, 'application/json; indent=4'),
+        )
+
+    def test_without_orjson(self):
+        """Test that the renderer works when orjson is not installed."""
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
@@ -0,0 +1,42 @@
+from datetime import date
+from decimal import Decimal
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+from ..models import House
+from ..serializers import HouseSerializer, HouseValuesSerializer
+
+class HouseValuesSerializerTest(TestCase):
+    def setUp(self):
+        for i in range(6):
+            House.objects.create(
+                area_unit='SqFt',
+                bathrooms=None if i % 3 == 0 else 1.5 + i,
+                bedrooms=i,
+                home_size=None if i % 2 else 1000 + i,
+                home_type='SingleFamily',
+                last_sold_date=None if i % 2 else date(2017, 12, i + 1),
+                last_sold_price=None if i % 3 == 1 else Decimal('720000.5') + i,
+                link=f'https://example.com/{i}',
+                price=Decimal('1200000') if i == 0 else Decimal('99.99') * i,
+                zestimate_amount=Decimal('0.01'),
+                zillow_id=str(i),
+                address=f'{i} Test St',
+                city='Test City',
+                state='TS',
+                zipcode='12345',
+            )
+
+    def assert_same_output(self, fields=None):
+        houses = House.objects.order_by('id')
+        expected = HouseSerializer(houses, many=True, fields=fields).data
+        serializer = HouseValuesSerializer(fields)
+        data = serializer.to_representation(houses.values_list(*serializer.columns(['id', 'price'])))
+        self.assertEqual(JSONRenderer().render(data), JSONRenderer().render(expected))
+
+    def test_matches_model_serializer(self):
+        """Test that rendered output is byte-identical to HouseSerializer."""
+        self.assert_same_output()
+
+    def test_matches_model_serializer_with_fields(self):
+        """Test that projections match, including when extra columns are selected."""
+        self.assert_same_output(['zipcode', 'last_sold_price', 'bathrooms'])
@@ -0,0 +1,61 @@
+from decimal import Decimal
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from ..models import House, MarketStats
+from ..stats import refresh_market_stats
+from ..middleware import RateLimitMiddleware
+
+
+class MarketStatsTest(TestCase):
+    def setUp(self):
+        RateLimitMiddleware.reset_counter()
+        for i, (price, home_size, rent, city, zipcode) in enumerate([
+            (300000, 1000, 1500, 'Springfield', '12345'),
+            (500000, 2000, 2000, 'springfield', '12345'),
+            (700000, 2000, None, 'Springfield', '12346'),
+            (None, 1500, 1800, 'Shelbyville', '54321'),
+        ]):
+            House.objects.create(
+                area_unit='SqFt', bathrooms=2.0, bedrooms=3, home_size=home_size, home_type='Single Family',
+                link='https://example.com/house', price=price, rentzestimate_amount=rent, zillow_id=str(i),
+                address=f'{i} Main St', city=city, state='IL', zipcode=zipcode,
+            )
+
+    def test_refresh(self):
+        """Test that medians are computed per zipcode, city and home type, ignoring missing values."""
+        self.assertEqual(refresh_market_stats(), 6)
+        city = MarketStats.objects.get(dimension='city', state_key='il', value_key='springfield')
+        self.assertEqual((city.state, city.value, city.count), ('IL', 'Springfield', 3))
+        self.assertEqual(city.median_price, Decimal('500000.00'))
+        self.assertEqual(city.median_price_per_sqft, Decimal('300.00'))
+        self.assertEqual(city.median_rent_to_price, 0.0045)
+        self.assertEqual(city.median_rentzestimate, Decimal('1750.00'))
+        self.assertIsNone(city.median_zestimate)
+
+        zipcode = MarketStats.objects.get(dimension='zipcode', value_key='54321')
+        self.assertEqual((zipcode.count, zipcode.median_price, zipcode.median_rentzestimate), (1, None, Decimal('1800.00')))
+
+    def test_refresh_groups(self):
+        """Test that refreshing some groups leaves the others alone and drops emptied ones."""
+        refresh_market_stats()
+        House.objects.filter(zipcode='12346').update(zipcode='12345', price=900000)
+        refresh_market_stats({('zipcode', '', '12345'), ('zipcode', '', '12346')})
+
+        self.assertFalse(MarketStats.objects.filter(dimension='zipcode', value_key='12346').exists())
+        self.assertEqual(MarketStats.objects.get(dimension='zipcode', value_key='12345').median_price, Decimal('500000.00'))
+        # Not refreshed
+        self.assertEqual(MarketStats.objects.get(dimension='home_type').median_price, Decimal('500000.00'))
+
+    def test_stats_endpoint(self):
+        """Test listing and filtering market stats."""
+        refresh_market_stats()
+        url = reverse('marketstats-list')
+        response = APIClient().get(url, {'dimension': 'city', 'state': 'il', 'value': 'SPRINGFIELD'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['median_price'], '500000.00')
+
+        response = APIClient().get(url, {'dimension': 'zipcode', 'ordering': '-count'})
+        self.assertEqual([row['value'] for row in response.data['results']], ['12345', '12346', '54321'])
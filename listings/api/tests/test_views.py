@@ -1,11 +1,27 @@
-from django.test import TestCase
+import gzip
+import json
+from unittest import mock
+from django.core.cache import caches
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import connection, migrations, models
+from django.db.migrations.loader import MigrationLoader
+from django.test.utils import CaptureQueriesContext
+from django.test import TestCase, TransactionTestCase
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
+from rest_framework.permissions import BasePermission
+from rest_framework.renderers import JSONRenderer
 from ..models import House
+from ..serializers import HouseSerializer
+from ..views import HouseViewSet
+from ..middleware import RateLimitMiddleware
+from . import import_elsewhere
+from .test_import_house_data import make_row
 
 class HouseViewSetTest(TestCase):
     def setUp(self):
+        RateLimitMiddleware.reset_counter()
         self.client = APIClient()
         self.house_data = {
             'area_unit': 'SqFt',
@@ -37,6 +53,29 @@ class HouseViewSetTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['address'], self.house_data['address'])
 
+    def test_retrieve_matches_model_serializer(self):
+        """Test that detail responses, served from values_list rows, match the model serializer."""
+        self.assertEqual(self.client.get(self.detail_url).data, HouseSerializer(self.house).data)
+        response = self.client.get(f"{self.detail_url}?fields=price,id")
+        self.assertEqual(response.data, HouseSerializer(self.house, fields=['price', 'id']).data)
+
+        missing_url = reverse('house-detail', kwargs={'pk': self.house.pk + 1})
+        self.assertEqual(self.client.get(missing_url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_retrieve_with_object_permissions(self):
+        """Test that object permissions are checked against a House instance, not a row."""
+        class UnderPrice(BasePermission):
+            def has_object_permission(self, request, view, obj):
+                return obj.price < 350000
+
+        with mock.patch.object(HouseViewSet, 'permission_classes', [UnderPrice]):
+            response = self.client.get(self.detail_url)
+            self.assertEqual(response.data, HouseSerializer(self.house).data)
+            House.objects.filter(pk=self.house.pk).update(price=400000)
+            House.objects.get(pk=self.house.pk).save()
+            # Denied to an anonymous client
+            self.assertEqual(self.client.get(self.detail_url).status_code, status.HTTP_401_UNAUTHORIZED)
+
     def test_filter_by_price(self):
         """Test filtering houses by price range."""
         response = self.client.get(f"{self.list_url}?min_price=200000&max_price=400000")
@@ -49,12 +88,44 @@ class HouseViewSetTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 1)
 
+    def test_filter_by_location_ignores_case(self):
+        """Test that city, state and home type filters are case-insensitive."""
+        response = self.client.get(f"{self.list_url}?city=test city&state=ts&home_type=SINGLE FAMILY&zipcode=12345")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+
+        response = self.client.get(f"{self.list_url}?city=Other City")
+        self.assertEqual(len(response.data['results']), 0)
+
     def test_search(self):
         """Test searching houses."""
         response = self.client.get(f"{self.list_url}?search=Test City")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 1)
 
+    def test_search_matches_prefixes_by_relevance(self):
+        """Test that search matches word prefixes and orders by relevance unless asked otherwise."""
+        other = House.objects.create(**{
+            **self.house_data, 'zillow_id': '123457', 'price': 400000.00,
+            'address': '9 Test Test Ave', 'city': 'Testville',
+        })
+        House.objects.create(**{**self.house_data, 'zillow_id': '123458', 'address': '1 Main St', 'city': 'Elsewhere'})
+
+        response = self.client.get(f"{self.list_url}?search=tes")
+        self.assertEqual([house['id'] for house in response.data['results']], [other.id, self.house.id])
+
+        response = self.client.get(f"{self.list_url}?search=test st 123")
+        self.assertEqual([house['id'] for house in response.data['results']], [self.house.id])
+
+        response = self.client.get(f"{self.list_url}?search=tes&ordering=price")
+        self.assertEqual([house['id'] for house in response.data['results']], [self.house.id, other.id])
+
+        response = self.client.get(f'{self.list_url}?search="test')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(f"{self.list_url}?search=tes&pagination=cursor")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_ordering(self):
         """Test ordering houses."""
         # Create another house with higher price
@@ -79,4 +150,200 @@ class HouseViewSetTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('address', response.data['results'][0])
         self.assertIn('price', response.data['results'][0])
-        self.assertNotIn('bedrooms', response.data['results'][0]) 
\ No newline at end of file
+        self.assertNotIn('bedrooms', response.data['results'][0])
+
+    def test_field_selection_is_per_request(self):
+        """Test that a projection reads only its columns and does not leak into other requests."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f"{self.list_url}?fields=id,price,zipcode")
+        self.assertEqual(set(response.data['results'][0]), {'id', 'price', 'zipcode'})
+        select = next(query['sql'] for query in queries if 'LIMIT' in query['sql'])
+        self.assertNotIn('"bedrooms"', select)
+
+        response = self.client.get(self.detail_url)
+        self.assertIn('bedrooms', response.data)
+
+        response = self.client.get(f"{self.list_url}?fields=id,nonexistent")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_responses_are_cached(self):
+        """Test that repeated list queries are served from the cache until a house changes."""
+        caches['houses'].clear()
+        url = f"{self.list_url}?city=Test City&min_bedrooms=2&fields=id,address,price"
+        first = self.client.get(url)
+        # Only the dataset version is read
+        with self.assertNumQueries(1):
+            response = self.client.get(f"{self.list_url}?min_bedrooms=2&fields=id,address,price&city=test city&ordering=-price")
+        self.assertEqual(response.data, first.data)
+
+        # Different fields are a different response
+        response = self.client.get(f"{self.list_url}?city=Test City&min_bedrooms=2&fields=id,address")
+        self.assertNotIn('price', response.data['results'][0])
+
+        self.house.price = 350000
+        self.house.save()
+        response = self.client.get(url)
+        self.assertEqual(float(response.data['results'][0]['price']), 350000.00)
+
+    def test_imports_elsewhere_refresh_cached_lists(self):
+        """Test that a bulk import in another process refreshes cached list pages."""
+        caches['houses'].clear()
+        url = f"{self.list_url}?fields=zillow_id,price&ordering=price"
+        self.client.get(url)
+
+        import_elsewhere([make_row(self.house.zillow_id, price='$350K'), make_row('999', price='$250K')])
+        response = self.client.get(url)
+        self.assertEqual(
+            [(house['zillow_id'], house['price']) for house in response.data['results']],
+            [('999', '250000.00'), (self.house.zillow_id, '350000.00')],
+        )
+
+    def test_conditional_get(self):
+        """Test that unchanged list and detail responses are answered with 304 from the dataset version alone."""
+        for url in [f"{self.list_url}?city=Test City", self.detail_url]:
+            response = self.client.get(url)
+            self.assertIn('ETag', response)
+            self.assertIn('Last-Modified', response)
+
+            with self.assertNumQueries(1):
+                not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(not_modified['ETag'], response['ETag'])
+
+            # Last-Modified has whole seconds, too coarse to answer with 304
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Another representation has another ETag
+        response = self.client.get(f"{self.detail_url}?fields=id,address,price")
+        self.assertNotEqual(response['ETag'], not_modified['ETag'])
+
+        # Writes change the ETag
+        self.house.save()
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=not_modified['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_changes_within_a_second(self):
+        """Test that a second import within the same second is not answered with 304."""
+        import_elsewhere([make_row(self.house.zillow_id, price='$350K')])
+        first = self.client.get(self.detail_url)
+        import_elsewhere([make_row(self.house.zillow_id, price='$360K')])
+
+        for headers in [{'HTTP_IF_NONE_MATCH': first['ETag']}, {'HTTP_IF_MODIFIED_SINCE': first['Last-Modified']}]:
+            response = self.client.get(self.detail_url, **headers)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['price'], '360000.00')
+
+    def test_writes_elsewhere_change_etags(self):
+        """Test that a write made by another process changes list and detail ETags."""
+        urls = [f"{self.list_url}?fields=zillow_id,price", self.detail_url]
+        tags = [self.client.get(url)['ETag'] for url in urls]
+
+        import_elsewhere([make_row(self.house.zillow_id, price='$350K')])
+        for url, tag in zip(urls, tags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=tag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotEqual(response['ETag'], tag)
+            self.assertIn('350000.00', response.content.decode())
+
+    def export(self, url, **headers):
+        response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = b''.join(response.streaming_content)
+        if response.get('Content-Encoding') == 'gzip':
+            content = gzip.decompress(content)
+        return response, content.decode('utf-8')
+
+    def test_export(self):
+        """Test streaming NDJSON and CSV exports with filters and field selection."""
+        house2_data = dict(self.house_data, zillow_id='123457', price=400000.00, city='Other City')
+        House.objects.create(**house2_data)
+        export_url = reverse('house-export')
+
+        response, content = self.export(export_url)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['price'] for row in rows], ['400000.00', '300000.00'])
+        self.assertEqual(rows[1], json.loads(JSONRenderer().render(HouseSerializer(self.house).data)))
+
+        response, content = self.export(f"{export_url}?format=csv&city=test city&fields=id,address,price")
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(content.splitlines(), ['id,price,address', f'{self.house.pk},300000.00,123 Test St'])
+
+        response, content = self.export(f"{export_url}?ordering=price", HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual([json.loads(line)['price'] for line in content.splitlines()], ['300000.00', '400000.00'])
+
+    def test_facets(self):
+        """Test facet counts under the list filters, and their caching."""
+        House.objects.create(**dict(self.house_data, zillow_id='123457', price=450000.00, bedrooms=4, city='test city'))
+        House.objects.create(**dict(self.house_data, zillow_id='123458', price=None, home_type='Condo', city='Other City'))
+        facets_url = reverse('house-facets')
+
+        response = self.client.get(facets_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(response.data['home_type'], [
+            {'value': 'Single Family', 'count': 2}, {'value': 'Condo', 'count': 1},
+        ])
+        self.assertEqual(response.data['bedrooms'], [{'value': 3, 'count': 2}, {'value': 4, 'count': 1}])
+        self.assertEqual(response.data['city'], [{'value': 'Test City', 'count': 2}, {'value': 'Other City', 'count': 1}])
+        prices = {(bucket['min'], bucket['max']): bucket['count'] for bucket in response.data['price']}
+        self.assertEqual(prices[(300000, 400000)], 1)
+        self.assertEqual(prices[(400000, 500000)], 1)
+        self.assertEqual(sum(prices.values()), 2)
+
+        response = self.client.get(f"{facets_url}?min_bedrooms=4")
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['bedrooms'], [{'value': 4, 'count': 1}])
+
+        response = self.client.get(f"{facets_url}?search=other")
+        self.assertEqual(response.data['home_type'], [{'value': 'Condo', 'count': 1}])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(f"{facets_url}?min_bedrooms=4")
+        self.assertEqual([query['sql'] for query in queries if 'api_datasetversion' not in query['sql']], [])
+
+        response = self.client.get(f"{facets_url}?min_bedrooms=many")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SearchTriggersTest(TransactionTestCase):
+    # Reads outside a transaction go to the replica under DB_PROFILE=production
+    databases = '__all__'
+
+    def setUp(self):
+        RateLimitMiddleware.reset_counter()
+        caches['houses'].clear()
+
+    def search_triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'api_house_search_%'")
+            return sorted(name for name, in cursor.fetchall())
+
+    def test_search_follows_writes_after_table_rebuild(self):
+        """Test that the index triggers dropped when a migration rebuilds api_house are recreated after migrate."""
+        if not self.search_triggers():
+            self.skipTest('SQLite without FTS5')
+        # An AddField, which SQLite carries out by rebuilding the table
+        operation = migrations.AddField('house', 'rebuild_probe', models.IntegerField(null=True))
+        state = MigrationLoader(connection).project_state()
+        new_state = state.clone()
+        operation.state_forwards('api', new_state)
+        with connection.schema_editor() as editor:
+            operation.database_forwards('api', editor, state, new_state)
+        self.assertEqual(self.search_triggers(), [])
+
+        try:
+            emit_post_migrate_signal(verbosity=0, interactive=False, db=connection.alias)
+            self.assertEqual(len(self.search_triggers()), 3)
+            House.objects.create(
+                area_unit='SqFt', bedrooms=3, home_type='Condo', link='https://example.com/1', price=100000,
+                zillow_id='1', address='1 Quimby Ave', city='West Hills', state='CA', zipcode='91307',
+            )
+            response = APIClient().get(f"{reverse('house-list')}?search=quimby")
+            self.assertEqual([house['zillow_id'] for house in response.data['results']], ['1'])
+        finally:
+            with connection.schema_editor() as editor:
+                operation.database_backwards('api', editor, new_state, state)
+            emit_post_migrate_signal(verbosity=0, interactive=False, db=connection.alias)
@@ -0,0 +1,113 @@
+"""
+Per-request timing breakdown, reported in the Server-Timing header and the
+request log.
+
+RequestLoggingMiddleware runs each request under a RequestTimer. Database
+time and query count come from an execute wrapper installed on every
+connection as it opens, which reports to the timer of the request in
+context, so queries are counted whichever thread runs them (under ASGI,
+sync views and the ORM run in a worker thread). Serializers and the
+response render record their own phases with timer().
+A phase leaves out the database time spent inside it (lazy querysets are
+often evaluated while serializing), so the phases never overlap.
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_current = contextvars.ContextVar('request_timer', default=None)
+
+# Server-Timing metrics in the order they are reported
+PHASES = ['db', 'serialize', 'render']
+
+
+class RequestTimer:
+    """Wall-clock time of one request, split into database, serialize and render phases."""
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished = None
+        self.durations = dict.fromkeys(PHASES, 0.0)
+        self.queries = 0
+        self.active = {}
+
+    @contextmanager
+    def activate(self):
+        """Time the enclosed block as the current request, including its queries."""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+            self.finished = time.perf_counter()
+
+    def start(self, name):
+        self.active[name] = (time.perf_counter(), self.durations['db'])
+
+    def stop(self, name):
+        if name in self.active:
+            start, db = self.active.pop(name)
+            elapsed = time.perf_counter() - start - (self.durations['db'] - db)
+            self.durations[name] = self.durations.get(name, 0.0) + elapsed
+
+    @property
+    def total(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def as_dict(self):
+        """Return the timings in milliseconds, with the query count."""
+        data = {'duration_ms': round(self.total * 1000, 3), 'queries': self.queries}
+        data.update((f'{name}_ms', round(duration * 1000, 3)) for name, duration in self.durations.items())
+        return data
+
+    def header(self):
+        """Return the Server-Timing header value."""
+        queries = '1 query' if self.queries == 1 else f'{self.queries} queries'
+        metrics = [
+            f'db;dur={self.durations["db"] * 1000:.3f};desc="{queries}"',
+            *(f'{name};dur={self.durations[name] * 1000:.3f}' for name in PHASES[1:]),
+            f'total;dur={self.total * 1000:.3f}',
+        ]
+        return ', '.join(metrics)
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper adding each query's time to the current request's timer."""
+    current = _current.get()
+    if current is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        current.durations['db'] += time.perf_counter() - start
+        current.queries += 1
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    # Fires again when a connection reopens, on the same wrapper object
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def current_timer():
+    """Return the RequestTimer of the request being handled, or None."""
+    return _current.get()
+
+
+@contextmanager
+def timer(name):
+    """Add the time spent in the enclosed block to the current request's phase name."""
+    current = _current.get()
+    if current is None or name in current.active:
+        # Nested in the same phase, which is already being timed
+        yield
+        return
+    current.start(name)
+    try:
+        yield
+    finally:
+        current.stop(name)
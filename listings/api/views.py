@@ -1,17 +1,53 @@
-from django.shortcuts import render
+import zlib
+from django.shortcuts import get_object_or_404, render
 from rest_framework import viewsets, filters, status
-from rest_framework.pagination import PageNumberPagination
-from django_filters.rest_framework import DjangoFilterBackend, FilterSet, NumberFilter
+from django_filters.rest_framework import CharFilter, ChoiceFilter, DjangoFilterBackend, FilterSet, NumberFilter
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
-from .models import House
-from .serializers import HouseSerializer
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS, BasePermission, IsAuthenticatedOrReadOnly
+from .autocomplete import KINDS, MAX_LIMIT as AUTOCOMPLETE_MAX_LIMIT, autocomplete
+from .cache import (
+    cache_key, cache_timeout, cached, dataset_version, detail_signature, etag, filter_signature,
+    house_cache, list_signature, selected_fields,
+)
+from .comparables import MAX_K as COMPARABLES_MAX_K, SCOPES as COMPARABLE_SCOPES, comparables
+from .facets import facet_counts
+from .importer import FOLDED_FIELDS, fold
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, metrics_directory, registry
+from .models import House, MarketStats
+from .pagination import HousePagination
+from .renderers import CSVRenderer, NDJSONRenderer
+from .search import RANK, FullTextSearchFilter, RelevanceOrderingFilter
+from .serializers import HouseSerializer, MarketStatsSerializer, values_serializer
 from .middleware import RequestLoggingMiddleware, ErrorHandlingMiddleware, RateLimitMiddleware
 from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
 
 # TODO: Create your views here.
 
+def gzip_chunks(chunks):
+    """Gzip-compress an iterable of byte strings, yielding compressed output as it is produced."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+class FoldedCharFilter(CharFilter):
+    """
+    Case-insensitive exact match, answered from the case-folded shadow column
+    of the field so the lookup can use an index.
+    """
+    def __init__(self, field_name=None, **kwargs):
+        super().__init__(field_name=FOLDED_FIELDS[field_name], lookup_expr='exact', **kwargs)
+
+    def filter(self, qs, value):
+        return super().filter(qs, fold(value) if value else value)
+
 class HouseFilter(FilterSet):
     """
     Custom filter set for House model with price range filtering.
@@ -24,10 +60,10 @@ class HouseFilter(FilterSet):
     max_bathrooms = NumberFilter(field_name="bathrooms", lookup_expr='lte')
     min_home_size = NumberFilter(field_name="home_size", lookup_expr='gte')
     max_home_size = NumberFilter(field_name="home_size", lookup_expr='lte')
-    home_type = NumberFilter(field_name="home_type", lookup_expr='iexact')
-    city = NumberFilter(field_name="city", lookup_expr='iexact')
-    state = NumberFilter(field_name="state", lookup_expr='iexact')
-    zipcode = NumberFilter(field_name="zipcode", lookup_expr='exact')
+    home_type = FoldedCharFilter(field_name="home_type")
+    city = FoldedCharFilter(field_name="city")
+    state = FoldedCharFilter(field_name="state")
+    zipcode = CharFilter(field_name="zipcode", lookup_expr='exact')
 
     class Meta:
         model = House
@@ -46,34 +82,280 @@ class HouseFilter(FilterSet):
             'zipcode'
         ]
 
+class MarketStatsFilter(FilterSet):
+    """
+    Filter set for MarketStats. state and value match case-insensitively.
+    """
+    dimension = ChoiceFilter(choices=MarketStats.DIMENSIONS)
+    state = CharFilter(field_name="state_key", method='filter_folded')
+    value = CharFilter(field_name="value_key", method='filter_folded')
+
+    class Meta:
+        model = MarketStats
+        fields = ['dimension', 'state', 'value']
+
+    def filter_folded(self, queryset, name, value):
+        return queryset.filter(**{name: fold(value)})
+
 class HouseViewSet(viewsets.ModelViewSet):
     """
     ViewSet for handling house listings with filtering, pagination, and field selection.
     """
     queryset = House.objects.all()
     serializer_class = HouseSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, RelevanceOrderingFilter]
     filterset_class = HouseFilter
     search_fields = ['address', 'city', 'state', 'zipcode']
     ordering_fields = ['price', 'bedrooms', 'bathrooms', 'home_size', 'year_built']
     ordering = ['-price']  # Default ordering
-    pagination_class = PageNumberPagination
+    pagination_class = HousePagination
     permission_classes = [IsAuthenticatedOrReadOnly]  # Allow read operations without auth
+    export_chunk_size = 2000  # Rows fetched and encoded at a time by export
+
+    def get_selected_fields(self):
+        """
+        Return the fields requested with ?fields= on reads, or None for all
+        of them. Writes always use every field.
+        """
+        if self.request.method not in SAFE_METHODS:
+            return None
+        fields = selected_fields(self.request)
+        if fields is not None:
+            unknown = [name for name in fields if name not in self.serializer_class.Meta.fields]
+            if unknown:
+                raise ValidationError({'fields': f"Unknown fields: {', '.join(unknown)}"})
+        return fields
 
     def get_queryset(self):
         """
-        Override to handle field selection and additional filtering.
+        Override to load only the selected fields, plus those the list is
+        ordered by.
         """
         queryset = super().get_queryset()
-        
-        # Handle field selection
-        fields = self.request.query_params.get('fields', None)
+
+        fields = self.get_selected_fields()
         if fields:
-            fields = fields.split(',')
-            self.serializer_class.Meta.fields = fields
-        
+            ordering = RelevanceOrderingFilter().get_ordering(self.request, queryset, self) or []
+            queryset = queryset.only(*fields, *(name.lstrip('-') for name in ordering if name != RANK))
+
         return queryset
 
+    def get_serializer(self, *args, **kwargs):
+        """Build a serializer limited to the selected fields of this request."""
+        kwargs.setdefault('fields', self.get_selected_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def conditional_response(self, request, signature, respond):
+        """
+        Answer a conditional GET for a response identified by signature.
+
+        The ETag and Last-Modified headers come from the dataset version, so
+        a client that already has the current response gets a 304 before
+        the database or serializer are touched. Otherwise respond() builds
+        the response and the validators are added to it.
+
+        Only the ETag can answer with 304: Last-Modified has whole seconds,
+        and the dataset can change several times within one.
+        """
+        version = dataset_version()
+        tag = etag(signature, version, request.accepted_media_type)
+        # Rounded up, so it is never earlier than the change it reports
+        last_modified = -(-version // 10 ** 9)
+        response = get_conditional_response(request, etag=tag)
+        if response is None:
+            response = respond(version)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        response['ETag'] = tag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        """
+        List houses, serving repeated queries from the cache until the
+        houses change.
+        """
+        signature = list_signature(request, self)
+        if signature is None:
+            return super().list(request, *args, **kwargs)
+
+        def respond(version):
+            key = cache_key('list', signature, version)
+            data = cached('list', key)
+            if data is not None:
+                return Response(data)
+            response = self.list_values(request)
+            if response.status_code == status.HTTP_200_OK:
+                house_cache().set(key, response.data, cache_timeout())
+            return response
+
+        return self.conditional_response(request, signature, respond)
+
+    def list_values(self, request):
+        """
+        List houses from values_list() rows through HouseValuesSerializer,
+        which gives the same output as the model serializer for less work.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = values_serializer(self.get_selected_fields())
+        # The keyset paginator reads the id and ordering fields from each row
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        extra = ['id'] + [name.lstrip('-') for name in ordering if isinstance(name, str) and name != RANK]
+        rows = queryset.values_list(*serializer.columns(extra), named=True)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serializer.to_representation(page))
+        return Response(serializer.to_representation(rows))
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a house, answering repeat polls with 304 without reading the row."""
+        def respond(version):
+            if self.has_object_permissions():
+                return super(HouseViewSet, self).retrieve(request, *args, **kwargs)
+            return self.retrieve_values(request)
+
+        return self.conditional_response(request, detail_signature(request), respond)
+
+    def has_object_permissions(self):
+        """Return whether any permission checks objects, which needs a House instance rather than a row."""
+        return any(
+            type(permission).has_object_permission is not BasePermission.has_object_permission
+            for permission in self.get_permissions()
+        )
+
+    def retrieve_values(self, request):
+        """
+        Retrieve a house as a values_list() row through a HouseValuesSerializer,
+        with the same lookup and 404 as get_object(). Only for views without
+        object permissions.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = values_serializer(self.get_selected_fields())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(
+            queryset.values_list(*serializer.columns()), **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        return Response(serializer.to_representation([row])[0])
+
+    @action(detail=False, methods=['get'], renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """
+        Stream every house matching the filters as NDJSON (default) or CSV
+        (?format=csv), honoring ordering and ?fields=. Rows are read from a
+        chunked database cursor and the response is gzip-compressed when
+        the client accepts it, so memory stays bounded for any size.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = values_serializer(self.get_selected_fields())
+        rows = queryset.values_list(*serializer.columns()).iterator(chunk_size=self.export_chunk_size)
+        renderer = request.accepted_renderer
+
+        def chunks():
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) >= self.export_chunk_size:
+                    yield serializer.to_representation(chunk)
+                    chunk = []
+            if chunk:
+                yield serializer.to_representation(chunk)
+
+        content = renderer.stream(chunks(), serializer.fields)
+        gzipped = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if gzipped:
+            content = gzip_chunks(content)
+
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type += f'; charset={renderer.charset}'
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="houses.{renderer.format}"'
+        patch_vary_headers(response, ['Accept-Encoding'])
+        if gzipped:
+            response['Content-Encoding'] = 'gzip'
+        return response
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        Count the houses matching the filters by home type, bedrooms,
+        bathrooms, city and price bucket, from one grouped query. Counts
+        are cached like list pages until the houses change.
+        """
+        filters = filter_signature(request, self)
+        if filters is None:
+            # Raises the filters' validation errors
+            self.filter_queryset(self.get_queryset())
+        signature = {'url': request.build_absolute_uri(request.path), 'filters': filters}
+
+        def respond(version):
+            key = cache_key('facets', signature, version)
+            data = cached('facets', key)
+            if data is None:
+                data = facet_counts(self.filter_queryset(self.get_queryset()))
+                house_cache().set(key, data, cache_timeout())
+            return Response(data)
+
+        return self.conditional_response(request, signature, respond)
+
+    @staticmethod
+    def get_count_param(request, name, default, maximum):
+        """Return a query parameter that must be an integer from 1 to maximum."""
+        try:
+            value = int(request.query_params.get(name, default))
+        except ValueError:
+            raise ValidationError({name: 'A valid integer is required.'})
+        if not 1 <= value <= maximum:
+            raise ValidationError({name: f'Must be between 1 and {maximum}.'})
+        return value
+
+    @action(detail=True, methods=['get'])
+    def comparables(self, request, pk=None):
+        """
+        List the ?k= listings most like this one by bedrooms, bathrooms,
+        size, property size, year built and price, within its zipcode (or
+        ?scope=state), nearest first with their distance. Searches the
+        in-memory feature matrix; honors ?fields=.
+        """
+        scope = request.query_params.get('scope', 'zipcode')
+        if scope not in COMPARABLE_SCOPES:
+            raise ValidationError({'scope': f"Must be one of: {', '.join(COMPARABLE_SCOPES)}"})
+        k = self.get_count_param(request, 'k', 10, COMPARABLES_MAX_K)
+
+        # Read in full, whatever the projection, since every feature is needed
+        house = get_object_or_404(House.objects.all(), pk=pk)
+        self.check_object_permissions(request, house)
+        nearest = comparables.get().nearest(house, scope, k)
+        # Listings deleted since the index was built are left out
+        houses = self.get_queryset().in_bulk([match for match, _ in nearest])
+        nearest = [(houses[match], distance) for match, distance in nearest if match in houses]
+
+        serializer = self.get_serializer([match for match, _ in nearest], many=True)
+        results = [
+            dict(data, distance=round(distance, 4))
+            for data, (_, distance) in zip(serializer.data, nearest)
+        ]
+        return Response({'results': results})
+
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """
+        Complete a city, zipcode or address prefix (?q=) from the in-memory
+        prefix index, most common first. ?kind= limits the kinds searched
+        (comma-separated) and ?limit= the number of completions.
+        """
+        kinds = request.query_params.get('kind')
+        kinds = [kind.strip() for kind in kinds.split(',')] if kinds else KINDS
+        unknown = [kind for kind in kinds if kind not in KINDS]
+        if unknown:
+            raise ValidationError({'kind': f"Unknown kinds: {', '.join(unknown)}"})
+        limit = self.get_count_param(request, 'limit', 10, AUTOCOMPLETE_MAX_LIMIT)
+
+        prefix = request.query_params.get('q', '').strip()
+        results = autocomplete.get().complete(prefix, kinds, limit) if prefix else []
+        return Response({'results': results})
+
     @action(detail=False, methods=['get'])
     def reset_rate_limit(self, request):
         """Reset the rate limit counter for testing purposes."""
@@ -86,3 +368,19 @@ class HouseViewSet(viewsets.ModelViewSet):
         # Reset the rate limit counter
         RateLimitMiddleware.reset_counter()
         return Response({"message": "Rate limit counter reset successfully"})
+
+class MarketStatsViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only market statistics by zipcode, city and home type, served from
+    the MarketStats table that imports keep up to date.
+    """
+    queryset = MarketStats.objects.all()
+    serializer_class = MarketStatsSerializer
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_class = MarketStatsFilter
+    ordering_fields = ['count', 'median_price', 'median_price_per_sqft', 'median_rent_to_price']
+
+
+def metrics(request):
+    """Serve the metrics of every worker process in the Prometheus text format."""
+    return HttpResponse(registry.exposition(metrics_directory()), content_type=METRICS_CONTENT_TYPE)
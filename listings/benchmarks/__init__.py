@@ -0,0 +1,5 @@
+"""
+Benchmarks for the House Listings API.
+
+Run them from the listings directory, e.g. ``python -m benchmarks.bench_cleaning``.
+"""
@@ -0,0 +1,116 @@
+"""
+Sync WSGI against async ASGI at high concurrency: throughput and latency
+percentiles of house detail and cached list requests, driven in-process
+through WSGIHandler on a thread pool and through the ASGI application on
+an event loop. ASGI runs twice: with the API middleware sync (the default,
+so Django runs the whole middleware chain in one thread hop) and async
+(API_ASYNC_MIDDLEWARE, which puts Django's own middleware in async mode,
+a thread hop per hook).
+
+    python -m benchmarks.bench_asgi --scale 50 --concurrency 64
+"""
+import argparse
+import asyncio
+import io
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from benchmarks.common import load_houses, setup_django
+
+
+def report(name, latencies, elapsed):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f'{name:<28} {len(latencies) / elapsed:8.0f} req/s   '
+          f'p50 {statistics.median(latencies) * 1000:7.2f} ms   p99 {p99 * 1000:7.2f} ms')
+
+
+def run_wsgi(handler, requests, concurrency):
+    def call(request):
+        path, query = request
+        environ = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+            'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': 'localhost', 'REMOTE_ADDR': '127.0.0.1',
+            'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+        }
+        start = time.perf_counter()
+        response = handler(environ, lambda status, headers: None)
+        b''.join(response)
+        response.close()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        latencies = list(pool.map(call, requests))
+    return latencies, time.perf_counter() - start
+
+
+def run_asgi(application, requests, concurrency):
+    async def call(request, slots):
+        path, query = request
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': path, 'query_string': query.encode(),
+            'headers': [(b'host', b'localhost')], 'client': ('127.0.0.1', 1), 'server': ('localhost', 80),
+        }
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            pass
+
+        async with slots:
+            start = time.perf_counter()
+            await application(scope, receive, send)
+            return time.perf_counter() - start
+
+    async def main():
+        slots = asyncio.Semaphore(concurrency)
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(call(request, slots) for request in requests))
+        return latencies, time.perf_counter() - start
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=50, help='Copies of sample-data/data.csv to load')
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(Path(directory) / 'bench.sqlite3')
+        import logging
+        from django.conf import settings
+        from django.core.handlers.wsgi import WSGIHandler
+        from api.models import House
+        from listings.asgi import StreamingASGIHandler
+
+        load_houses(args.scale)
+        settings.DEBUG = False
+        settings.API_RATE_LIMIT = 10 ** 9
+        logging.getLogger('api').setLevel(logging.WARNING)
+
+        ids = list(House.objects.values_list('id', flat=True)[:500])
+        workloads = {
+            'detail': [(f'/api/houses/{ids[i % len(ids)]}/', '') for i in range(args.requests)],
+            'cached list': [('/api/houses/', f'state={state}') for state in ['CA', 'TX', 'NY', 'WA']] * (args.requests // 4),
+        }
+        for name, requests in workloads.items():
+            print(f'{name}, {len(requests)} requests, concurrency {args.concurrency}')
+            report('  WSGI, threads', *run_wsgi(WSGIHandler(), requests, args.concurrency))
+            for async_capable in [False, True]:
+                settings.API_ASYNC_MIDDLEWARE = async_capable
+                report(f'  ASGI, {"async" if async_capable else "sync"} API middleware',
+                       *run_asgi(StreamingASGIHandler(), requests, args.concurrency))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Build time, size and lookup latency of the autocomplete prefix index: the
+trie walk alone, and the full path a request takes through the process
+index (autocomplete.get(), with its dataset version check, then the walk).
+
+    python -m benchmarks.bench_autocomplete --scale 1000
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import load_houses, setup_django
+
+PREFIXES = ['s', 'sh', 'she', 'west h', '9', '913', '91307', '7', '70', '7001 v', 'zzz']
+LOOKUPS = 10000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=1000, help='Copies of sample-data/data.csv to load')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(Path(directory) / 'bench.sqlite3')
+        from api.autocomplete import Autocomplete, autocomplete
+        from api.models import House
+
+        load_houses(args.scale)
+        print(f'{House.objects.count()} rows')
+
+        start = time.perf_counter()
+        index = Autocomplete.build()
+        print(f'built in {time.perf_counter() - start:.2f} s: ' + ', '.join(
+            f'{len(kind_index)} {kind} values' for kind, kind_index in index.indexes.items()
+        ))
+
+        autocomplete.get()
+        print(f'{"prefix":<10} {"walk":>10} {"get + walk":>12}  top completion')
+        for prefix in PREFIXES:
+            start = time.perf_counter()
+            for _ in range(LOOKUPS):
+                results = index.complete(prefix)
+            walk = (time.perf_counter() - start) / LOOKUPS
+            start = time.perf_counter()
+            for _ in range(LOOKUPS):
+                results = autocomplete.get().complete(prefix)
+            full = (time.perf_counter() - start) / LOOKUPS
+            top = f"{results[0]['value']} ({results[0]['count']})" if results else '-'
+            print(f'{prefix:<10} {walk * 1e6:7.1f} us {full * 1e6:9.1f} us  {top}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""
+Compare per-cell and columnar cleaning of the import feed.
+
+    python -m benchmarks.bench_cleaning --scale 500
+"""
+import argparse
+import io
+
+from api import columnar, importer
+from benchmarks.common import scaled_csv, timed
+
+
+def clean(records_function, data):
+    file = io.BytesIO(data)
+    fieldnames, offset = importer.read_header(file)
+    return list(records_function(file, fieldnames, offset))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=500, help='Copies of sample-data/data.csv to clean')
+    args = parser.parse_args()
+
+    data = scaled_csv(args.scale)
+    per_cell_time, per_cell = timed(clean, importer.iter_records, data)
+    columnar_time, columns = timed(clean, columnar.iter_records_columnar, data)
+    if per_cell != columns or any(repr(a) != repr(b) for a, b in zip(per_cell, columns)):
+        raise SystemExit('Columnar cleaning produced different records')
+
+    rows = len(per_cell)
+    print(f'{rows} rows ({len(data) / 1e6:.1f} MB), identical output')
+    print(f'per-cell: {per_cell_time:.2f}s ({rows / per_cell_time:,.0f} rows/sec)')
+    print(f'columnar: {columnar_time:.2f}s ({rows / columnar_time:,.0f} rows/sec)')
+    print(f'speedup:  {per_cell_time / columnar_time:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
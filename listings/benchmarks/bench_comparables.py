@@ -0,0 +1,59 @@
+"""
+Comparables: build time and size of the feature matrix, and search latency
+within a zipcode and within a state, against scoring the same listings
+after reading them from the database.
+
+    python -m benchmarks.bench_comparables --scale 1000
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import load_houses, setup_django, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=1000, help='Copies of sample-data/data.csv to load')
+    parser.add_argument('-k', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(Path(directory) / 'bench.sqlite3')
+        import numpy as np
+        from api.comparables import FEATURES, Comparables
+        from api.models import House
+
+        load_houses(args.scale)
+        print(f'{House.objects.count()} rows')
+
+        start = time.perf_counter()
+        index = Comparables.build()
+        print(f'built in {time.perf_counter() - start:.2f} s, {index.matrix.nbytes / 2 ** 20:.1f} MiB matrix')
+
+        houses = list(House.objects.order_by('?')[:20])
+        for scope in ['zipcode', 'state']:
+            indexed, _ = timed(lambda: [index.nearest(house, scope, args.k) for house in houses])
+
+            def scan():
+                for house in houses:
+                    key = {'state_key': house.state_key}
+                    if scope == 'zipcode':
+                        key['zipcode'] = house.zipcode
+                    rows = House.objects.filter(**key).values_list('id', *FEATURES)
+                    matrix = index.transform(np.array([row[1:] for row in rows], dtype=np.float64))
+                    matrix = np.nan_to_num((matrix - index.center) / index.scale)
+                    distances = np.square(matrix - index.vector(house)).sum(axis=1)
+                    np.argsort(distances)[:args.k + 1]
+
+            scanned, _ = timed(scan, repeat=1)
+            size = np.mean([np.subtract(*index.blocks[scope][
+                house.state_key if scope == 'state' else (house.state_key, house.zipcode)
+            ][::-1]) for house in houses])
+            print(f'{scope:<8} ~{size:8.0f} candidates: index {indexed / len(houses) * 1000:6.2f} ms, '
+                  f'read and score {scanned / len(houses) * 1000:8.2f} ms per search')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Facet counts from the single grouped query of the facets action against
+one filtered count per facet value, as a client building a filter sidebar
+from the list endpoint would issue.
+
+    python -m benchmarks.bench_facets --scale 1000
+"""
+import argparse
+import tempfile
+from pathlib import Path
+
+from benchmarks.common import load_houses, setup_django, timed
+
+FILTERS = [{}, {'state': 'CA'}, {'state': 'TX', 'min_bedrooms': 3}]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=1000, help='Copies of sample-data/data.csv to load')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(Path(directory) / 'bench.sqlite3')
+        from api.facets import FACET_FIELDS, PRICE_BUCKETS, facet_counts
+        from api.models import House
+        from api.views import HouseFilter
+
+        load_houses(args.scale)
+        print(f'{House.objects.count()} rows')
+
+        def per_value(queryset):
+            counts = {}
+            for name in FACET_FIELDS:
+                values = queryset.order_by().values_list(name, flat=True).distinct()
+                counts[name] = {value: queryset.filter(**{name: value}).count() for value in values}
+            bounds = [0, *PRICE_BUCKETS]
+            counts['price'] = [
+                queryset.filter(price__gte=low, price__lt=high).count() for low, high in zip(bounds, bounds[1:])
+            ]
+            return counts
+
+        print(f'{"filters":<36} {"grouped":>10} {"per value":>12} {"queries":>8}')
+        for params in FILTERS:
+            queryset = HouseFilter(params, queryset=House.objects.all()).qs
+            grouped, _ = timed(lambda: facet_counts(queryset.all()))
+            separate, counts = timed(lambda: per_value(queryset.all()), repeat=1)
+            queries = sum(len(values) + 1 for values in counts.values() if isinstance(values, dict)) + len(PRICE_BUCKETS)
+            print(f'{str(params):<36} {grouped * 1000:7.1f} ms {separate * 1000:9.1f} ms {queries:8}')
+
+
+if __name__ == '__main__':
+    main()
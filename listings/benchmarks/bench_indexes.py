@@ -0,0 +1,78 @@
+"""
+Query plans and latencies of the HouseFilter lookups with and without the
+House indexes.
+
+    python -m benchmarks.bench_indexes --scale 5000   # ~2.2M rows
+"""
+import argparse
+import tempfile
+from pathlib import Path
+
+from benchmarks.common import load_houses, setup_django, timed
+
+# HouseFilter parameters and ordering for each query
+QUERIES = {
+    'default ordering': ({}, '-price'),
+    'price range': ({'min_price': 500000, 'max_price': 600000}, '-price'),
+    'state + city + max price': ({'state': 'ny', 'city': 'WEST HILLS', 'max_price': 800000}, '-price'),
+    'zipcode + min price': ({'zipcode': '91307', 'min_price': 500000}, '-price'),
+    'home type': ({'home_type': 'condominium'}, '-price'),
+    'bedroom range': ({'min_bedrooms': 6, 'max_bedrooms': 7}, '-bedrooms'),
+    'home size range': ({'min_home_size': 4000, 'max_home_size': 5000}, 'home_size'),
+    'order by year built': ({}, '-year_built'),
+}
+COUNTS = {
+    'count state + city': {'state': 'NY', 'city': 'West Hills'},
+    'count home type': {'home_type': 'Condominium'},
+}
+
+
+def filtered(params):
+    from api.models import House
+    from api.views import HouseFilter
+
+    return HouseFilter(params, queryset=House.objects.all()).qs
+
+
+def run(label):
+    print(f'== {label}')
+    cases = [(name, filtered(params).order_by(ordering)[:10], False) for name, (params, ordering) in QUERIES.items()]
+    cases += [(name, filtered(params).order_by(), True) for name, params in COUNTS.items()]
+    for name, queryset, count in cases:
+        if count:
+            elapsed, _ = timed(lambda: queryset.all().count(), repeat=5)
+            plan = queryset.values('id').explain()
+        else:
+            elapsed, _ = timed(lambda: list(queryset.all()), repeat=5)
+            plan = queryset.explain()
+        print(f'{name:28} {elapsed * 1000:9.2f} ms   {" | ".join(plan.splitlines())}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=5000, help='Copies of sample-data/data.csv to load')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(Path(directory) / 'bench.sqlite3')
+        from django.db import connection
+
+        load_houses(args.scale)
+        print(f'{args.scale * 448} rows')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND name LIKE 'house\\_%' ESCAPE '\\'"
+            )
+            indexes = cursor.fetchall()
+            for name, _ in indexes:
+                cursor.execute(f'DROP INDEX "{name}"')
+            run('without indexes')
+
+            for _, sql in indexes:
+                cursor.execute(sql)
+            cursor.execute('ANALYZE')
+            run('with indexes')
+
+
+if __name__ == '__main__':
+    main()
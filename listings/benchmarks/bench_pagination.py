@@ -0,0 +1,64 @@
+"""
+Latency of list pages at increasing depth with page number (COUNT + OFFSET)
+and cursor (keyset) pagination.
+
+    python -m benchmarks.bench_pagination --scale 2000
+"""
+import argparse
+import tempfile
+from pathlib import Path
+
+from benchmarks.common import load_houses, setup_django, timed
+
+DEPTHS = [1, 100, 1000, 10000, 40000]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=2000, help='Copies of sample-data/data.csv to load')
+    parser.add_argument('--ordering', default='-price')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(Path(directory) / 'bench.sqlite3')
+        from django.conf import settings
+        from rest_framework.test import APIRequestFactory
+        from api.models import House
+        from api.pagination import KeysetPagination
+        from api.views import HouseViewSet
+
+        settings.ALLOWED_HOSTS = ['*']
+        load_houses(args.scale)
+        rows = House.objects.count()
+        print(f'{rows} rows, ordering={args.ordering}')
+
+        view = HouseViewSet.as_view({'get': 'list'})
+        factory = APIRequestFactory()
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        field = args.ordering.lstrip('-')
+        keyset = KeysetPagination(page_size)
+        keyset.field, keyset.descending = field, args.ordering.startswith('-')
+
+        def get(params):
+            response = view(factory.get('/api/houses/', params))
+            assert response.status_code == 200, response.data
+            return response
+
+        print(f'{"page":>8} {"page number":>14} {"cursor":>10}')
+        for depth in [depth for depth in DEPTHS if depth * page_size < rows]:
+            page_number, _ = timed(get, {'ordering': args.ordering, 'page': depth})
+            if depth == 1:
+                cursor_params = {'ordering': args.ordering, 'pagination': 'cursor'}
+            else:
+                # Cursor of the last row on the previous page, as a client walking the pages would hold
+                previous = House.objects.order_by(args.ordering, f'{args.ordering[:-len(field)]}id')
+                # NULL ordering differs from the keyset order, but any row gives a representative seek
+                house = previous[(depth - 1) * page_size - 1]
+                cursor = keyset.cursor_token((getattr(house, field), house.pk), reverse=False)
+                cursor_params = {'ordering': args.ordering, 'cursor': cursor}
+            cursor, _ = timed(get, cursor_params)
+            print(f'{depth:8} {page_number * 1000:11.2f} ms {cursor * 1000:7.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
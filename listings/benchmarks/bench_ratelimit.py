@@ -0,0 +1,59 @@
+"""
+RateLimitMiddleware: time added to each request by the limiter, for
+anonymous clients spread over many addresses and for token clients, against
+the request with the limiter turned off.
+
+    python -m benchmarks.bench_ratelimit --requests 20000
+"""
+import argparse
+import tempfile
+from pathlib import Path
+
+from benchmarks.common import setup_django, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--clients', type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(Path(directory) / 'bench.sqlite3')
+        from django.contrib.auth.models import User
+        from django.core.management import call_command
+        from django.http import HttpResponse
+        from django.test import RequestFactory, override_settings
+        from rest_framework.authtoken.models import Token
+        from api.middleware import RateLimitMiddleware
+
+        call_command('migrate', verbosity=0)
+        tokens = [Token.objects.create(user=User.objects.create_user(f'user{i}')).key for i in range(100)]
+        factory = RequestFactory()
+        anonymous = [
+            factory.get('/api/houses/', REMOTE_ADDR=f'10.{i // 65536}.{i // 256 % 256}.{i % 256}')
+            for i in range(args.clients)
+        ]
+        authenticated = [
+            factory.get('/api/houses/', HTTP_AUTHORIZATION=f'Token {tokens[i % len(tokens)]}')
+            for i in range(args.clients)
+        ]
+        middleware = RateLimitMiddleware(lambda request: HttpResponse())
+
+        def run(requests):
+            for i in range(args.requests):
+                middleware(requests[i % len(requests)])
+
+        with override_settings(API_RATE_LIMIT=0):
+            baseline, _ = timed(run, anonymous)
+        # A limit high enough that every request is let through
+        with override_settings(API_RATE_LIMIT=10 ** 9):
+            for name, requests in [('ip', anonymous), ('token', authenticated)]:
+                RateLimitMiddleware.reset_counter()
+                elapsed, _ = timed(run, requests)
+                overhead = (elapsed - baseline) / args.requests * 10 ** 6
+                print(f'{name:<6} {overhead:6.1f} us per request over {args.clients} clients')
+
+
+if __name__ == '__main__':
+    main()
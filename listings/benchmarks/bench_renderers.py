@@ -0,0 +1,43 @@
+"""
+JSONRenderer vs FastJSONRenderer on serialized house pages.
+
+    python -m benchmarks.bench_renderers --scale 50
+"""
+import argparse
+import tempfile
+from pathlib import Path
+
+from benchmarks.common import load_houses, setup_django, timed
+
+PAGE_SIZES = [10, 100, 1000, 10000]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=50, help='Copies of sample-data/data.csv to load')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(Path(directory) / 'bench.sqlite3')
+        from rest_framework.renderers import JSONRenderer
+        from api.models import House
+        from api.renderers import FastJSONRenderer
+        from api.serializers import HouseValuesSerializer
+
+        load_houses(args.scale)
+        serializer = HouseValuesSerializer()
+        rows = list(House.objects.order_by('id').values_list(*serializer.columns()))
+
+        print(f'{"page size":>10} {"JSONRenderer":>14} {"FastJSONRenderer":>18} {"speedup":>8}')
+        for size in [size for size in PAGE_SIZES if size <= len(rows)]:
+            data = {'count': len(rows), 'next': None, 'previous': None,
+                    'results': serializer.to_representation(rows[:size])}
+            assert JSONRenderer().render(data) == FastJSONRenderer().render(data), 'outputs differ'
+            repeat = max(3, 10000 // size)
+            before, _ = timed(JSONRenderer().render, data, repeat=repeat)
+            after, _ = timed(FastJSONRenderer().render, data, repeat=repeat)
+            print(f'{size:10} {before * 1000:11.3f} ms {after * 1000:15.3f} ms {before / after:7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
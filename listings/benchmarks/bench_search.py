@@ -0,0 +1,54 @@
+"""
+Latency of ?search= with DRF's icontains SearchFilter and with the FTS5
+index: the first page of results and the count behind it.
+
+    python -m benchmarks.bench_search --scale 1000
+"""
+import argparse
+import tempfile
+from pathlib import Path
+
+from benchmarks.common import load_houses, setup_django, timed
+
+SEARCHES = ['quimby', 'west hills', 'ave 91307', 'melb', '7001 vicky']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=1000, help='Copies of sample-data/data.csv to load')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(Path(directory) / 'bench.sqlite3')
+        from rest_framework.filters import OrderingFilter, SearchFilter
+        from rest_framework.request import Request
+        from rest_framework.test import APIRequestFactory
+        from api.models import House
+        from api.search import FullTextSearchFilter, RelevanceOrderingFilter
+        from api.views import HouseViewSet
+
+        load_houses(args.scale)
+        print(f'{House.objects.count()} rows')
+
+        factory = APIRequestFactory()
+        view = HouseViewSet()
+
+        def search(backend, term):
+            request = Request(factory.get('/api/houses/', {'search': term}))
+            queryset = backend().filter_queryset(request, House.objects.all(), view)
+            # icontains results in the default ordering, full-text ones by relevance
+            ordering = RelevanceOrderingFilter if backend is FullTextSearchFilter else OrderingFilter
+            return ordering().filter_queryset(request, queryset, view)
+
+        print(f'{"search":<14} {"icontains page":>15} {"fts page":>10} {"icontains count":>16} {"fts count":>10}')
+        for term in SEARCHES:
+            page = [timed(lambda: list(search(backend, term)[:20]))[0] for backend in (SearchFilter, FullTextSearchFilter)]
+            count = [timed(lambda: search(backend, term).count())[0] for backend in (SearchFilter, FullTextSearchFilter)]
+            print(
+                f'{term:<14} {page[0] * 1000:12.2f} ms {page[1] * 1000:7.2f} ms'
+                f' {count[0] * 1000:13.2f} ms {count[1] * 1000:7.2f} ms'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+HouseSerializer on model instances vs HouseValuesSerializer on values_list
+rows, with and without the query.
+
+    python -m benchmarks.bench_serializers --scale 50
+"""
+import argparse
+import tempfile
+from pathlib import Path
+
+from benchmarks.common import load_houses, setup_django, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=50, help='Copies of sample-data/data.csv to load')
+    parser.add_argument('--fields', help='Comma-separated projection, as in ?fields=')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(Path(directory) / 'bench.sqlite3')
+        from rest_framework.renderers import JSONRenderer
+        from api.models import House
+        from api.serializers import HouseSerializer, HouseValuesSerializer
+
+        load_houses(args.scale)
+        fields = args.fields.split(',') if args.fields else None
+        queryset = House.objects.order_by('id')
+        serializer = HouseValuesSerializer(fields)
+
+        def model_query():
+            return list(queryset.only(*fields) if fields else queryset.all())
+
+        def values_query():
+            return list(queryset.values_list(*serializer.columns()))
+
+        def model_serializer(houses):
+            return HouseSerializer(houses, many=True, fields=fields).data
+
+        houses, rows = model_query(), values_query()
+        assert JSONRenderer().render(model_serializer(houses)) == JSONRenderer().render(
+            serializer.to_representation(rows)
+        ), 'outputs differ'
+        print(f'{len(rows)} rows, output identical')
+
+        results = {
+            'model query': timed(model_query)[0],
+            'values query': timed(values_query)[0],
+            'HouseSerializer': timed(model_serializer, houses)[0],
+            'HouseValuesSerializer': timed(serializer.to_representation, rows)[0],
+        }
+        for name, elapsed in results.items():
+            print(f'{name:24} {elapsed * 1000:9.1f} ms {len(rows) / elapsed:12.0f} rows/sec')
+        model_total = results['model query'] + results['HouseSerializer']
+        values_total = results['values query'] + results['HouseValuesSerializer']
+        print(f'serialize speedup {results["HouseSerializer"] / results["HouseValuesSerializer"]:.1f}x, '
+              f'query + serialize speedup {model_total / values_total:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
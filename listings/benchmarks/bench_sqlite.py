@@ -0,0 +1,136 @@
+"""
+Reads during an import, under the default SQLite settings and the
+production profile (DB_PROFILE=production): latency percentiles, throughput
+and errors of reader threads running house detail and filtered list
+queries while import_house_data writes from another process, and how long
+the import takes.
+
+    python -m benchmarks.bench_sqlite --scale 20 --readers 8
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from benchmarks.common import STATES, scaled_csv, setup_django
+
+PROFILES = ['default', 'production']
+
+
+def configure(profile, db_path):
+    """Set up Django with a database profile, before anything reads the settings."""
+    os.environ['DB_PROFILE'] = profile
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'listings.settings')
+    from django.conf import settings
+    if 'replica' in settings.DATABASES:
+        settings.DATABASES['replica']['NAME'] = str(db_path)
+    setup_django(db_path)
+
+
+def run_import(csv_path, batch_size):
+    from django.core.management import call_command
+    call_command('import_house_data', str(csv_path), '--columnar', '--batch-size', str(batch_size), stdout=io.StringIO())
+
+
+def import_in_process(profile, db_path, csv_path, batch_size):
+    configure(profile, db_path)
+    run_import(csv_path, batch_size)
+
+
+def read_during_import(profile, directory, scale, readers, batch_size, results):
+    db_path = Path(directory) / f'{profile}.sqlite3'
+    configure(profile, db_path)
+    from django.core.management import call_command
+    from django.db import connections
+    from api.models import House
+
+    call_command('migrate', verbosity=0)
+    run_import(Path(directory) / 'base.csv', 10000)
+    connections.close_all()
+    ids = list(House.objects.values_list('id', flat=True))
+
+    latencies, errors = [], []
+    importing = threading.Event()
+    importing.set()
+
+    def read():
+        rng = random.Random()
+        while importing.is_set():
+            start = time.perf_counter()
+            try:
+                if rng.random() < 0.5:
+                    House.objects.get(pk=rng.choice(ids))
+                else:
+                    list(House.objects.filter(state=rng.choice(STATES), bedrooms__gte=3).order_by('price')[:20])
+            except Exception as error:  # database is locked, and the like
+                errors.append(type(error).__name__)
+                continue
+            latencies.append(time.perf_counter() - start)
+        connections.close_all()
+
+    threads = [threading.Thread(target=read) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    writer = multiprocessing.get_context('spawn').Process(
+        target=import_in_process, args=(profile, db_path, Path(directory) / 'import.csv', batch_size),
+    )
+    start = time.perf_counter()
+    writer.start()
+    writer.join()
+    elapsed = time.perf_counter() - start
+    importing.clear()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    results[profile] = {
+        'import': elapsed,
+        # A writer that waited out its lock timeout fails with 'database is locked'
+        'imported': writer.exitcode == 0,
+        'reads': len(latencies),
+        'errors': len(errors),
+        'p50': statistics.median(latencies),
+        'p99': latencies[int(len(latencies) * 0.99)],
+        'max': latencies[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=20, help='Copies of sample-data/data.csv in the database')
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--batch-size', type=int, default=1000, help='Rows per import transaction')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # The import rewrites every existing row and adds as many new ones
+        Path(directory, 'base.csv').write_bytes(scaled_csv(args.scale))
+        Path(directory, 'import.csv').write_bytes(scaled_csv(args.scale * 2).replace(b'http', b'https'))
+
+        context = multiprocessing.get_context('spawn')
+        results = context.Manager().dict()
+        for profile in PROFILES:
+            # Settings are read once per process, so each profile gets its own
+            process = context.Process(
+                target=read_during_import,
+                args=(profile, directory, args.scale, args.readers, args.batch_size, results),
+            )
+            process.start()
+            process.join()
+
+        print(f'{"profile":<12} {"import":>15} {"reads/s":>8} {"errors":>7} {"p50":>9} {"p99":>9} {"max":>9}')
+        for profile in PROFILES:
+            r = results[profile]
+            outcome = 'done' if r['imported'] else 'FAILED'
+            print(f'{profile:<12} {outcome:>6} {r["import"]:7.1f}s {r["reads"] / r["import"]:8.0f} {r["errors"]:7} '
+                  f'{r["p50"] * 1000:7.2f}ms {r["p99"] * 1000:7.2f}ms {r["max"] * 1000:7.0f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Market stats: time to rebuild the table, to refresh the groups a small
+import touches, and to read one group's stats from the table versus
+computing them from the listings per request.
+
+    python -m benchmarks.bench_stats --scale 1000
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import load_houses, setup_django, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=1000, help='Copies of sample-data/data.csv to load')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(Path(directory) / 'bench.sqlite3')
+        from django.conf import settings
+        from rest_framework.test import APIRequestFactory
+        from api.models import House, MarketStats
+        from api.stats import compute, listing_groups, refresh_market_stats
+        from api.views import MarketStatsViewSet
+
+        settings.ALLOWED_HOSTS = ['*']
+        load_houses(args.scale)
+        print(f'{House.objects.count()} rows')
+
+        start = time.perf_counter()
+        written = refresh_market_stats()
+        print(f'full refresh            {time.perf_counter() - start:8.2f} s   ({written} groups)')
+
+        # The groups of 100 listings spread across the table, as a small import would touch
+        sample = House.objects.order_by('?').values('zipcode', 'state_key', 'city_key', 'home_type_key')[:100]
+        groups = set().union(*(listing_groups(fields) for fields in sample))
+        by_dimension = {name: sum(1 for group in groups if group[0] == name) for name, _ in MarketStats.DIMENSIONS}
+        start = time.perf_counter()
+        refresh_market_stats(groups)
+        print(f'refresh touched groups  {time.perf_counter() - start:8.2f} s   {by_dimension}')
+        touched = {group for group in groups if group[0] != 'home_type'}
+        start = time.perf_counter()
+        refresh_market_stats(touched)
+        print(f'  without home types    {time.perf_counter() - start:8.2f} s')
+
+        view = MarketStatsViewSet.as_view({'get': 'list'})
+        factory = APIRequestFactory()
+        largest = MarketStats.objects.order_by('-count')
+        for dimension in ['zipcode', 'city']:
+            stats = largest.filter(dimension=dimension).first()
+            params = {'dimension': dimension, 'state': stats.state_key, 'value': stats.value_key}
+            row, _ = timed(lambda: MarketStats.objects.get(dimension=dimension, state_key=stats.state_key, value_key=stats.value_key), repeat=20)
+            read, _ = timed(lambda: view(factory.get('/api/stats/', params)), repeat=20)
+            computed, _ = timed(lambda: list(compute(dimension, [(stats.state_key, stats.value_key)])), repeat=5)
+            print(f'{dimension} {stats} ({stats.count} listings): table row {row * 1000:.2f} ms, '
+                  f'/api/stats/ {read * 1000:.2f} ms, computed from listings {computed * 1000:.2f} ms')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Shared helpers for the benchmark scripts.
+"""
+import csv
+import io
+import os
+import tempfile
+import time
+from pathlib import Path
+
+SAMPLE_CSV = Path(__file__).resolve().parent.parent.parent / 'sample-data' / 'data.csv'
+
+# Each copy of the sample feed is moved to another state and zipcode so
+# location filters have realistic selectivity
+STATES = [
+    'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'FL', 'GA', 'HI', 'ID', 'IL', 'IN', 'IA', 'KS', 'KY',
+    'LA', 'ME', 'MD', 'MA', 'MI', 'MN', 'MS', 'MO', 'MT', 'NE', 'NV', 'NH', 'NJ', 'NM', 'NY', 'NC', 'ND',
+    'OH', 'OK', 'OR', 'PA', 'RI', 'SC', 'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY',
+]
+
+
+def scaled_csv(scale):
+    """
+    Return the sample feed repeated scale times as CSV bytes, with a unique
+    zillow_id on every row and each copy placed in its own state and zipcodes.
+    """
+    with open(SAMPLE_CSV, newline='') as file:
+        reader = csv.reader(file, skipinitialspace=True)
+        header = next(reader)
+        rows = list(reader)
+
+    zillow_id, state, zipcode = (header.index(name) for name in ('zillow_id', 'state', 'zipcode'))
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator='\n')
+    writer.writerow(header)
+    for copy in range(scale):
+        for row in rows:
+            row = list(row)
+            row[zillow_id] = f'{row[zillow_id]}{copy:06d}'
+            row[state] = STATES[copy % len(STATES)]
+            row[zipcode] = f'{(int(row[zipcode]) + copy * 7) % 100000:05d}'
+            writer.writerow(row)
+    return output.getvalue().encode('utf-8')
+
+
+def setup_django(db_path):
+    """Configure Django against a SQLite database at db_path."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'listings.settings')
+    from django.conf import settings
+    settings.DATABASES['default']['NAME'] = str(db_path)
+
+    import django
+    django.setup()
+
+
+def load_houses(scale):
+    """Migrate the configured database and import scale copies of the sample feed into it."""
+    from django.core.management import call_command
+
+    call_command('migrate', verbosity=0)
+    with tempfile.NamedTemporaryFile(suffix='.csv') as file:
+        file.write(scaled_csv(scale))
+        file.flush()
+        call_command(
+            'import_house_data', file.name, '--columnar', '--batch-size', '10000', stdout=io.StringIO()
+        )
+
+
+def timed(function, *args, repeat=3):
+    """Return the best wall-clock time of several calls and the last result."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
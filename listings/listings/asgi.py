@@ -9,8 +9,58 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'listings.settings')
 
+# Marks the end of a streaming response's iterator
+_DONE = object()
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """
+    ASGIHandler that reads streaming responses in a worker thread, a part
+    at a time. Django 3.2 iterates them on the event loop, where iterators
+    that query the database as they go (such as the houses export) fail
+    with SynchronousOnlyOperation, and blocking work stalls every request.
+    """
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        # Headers and cookies as ASGIHandler.send_response sends them
+        response_headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode('ascii')
+            if isinstance(value, str):
+                value = value.encode('latin1')
+            response_headers.append((bytes(header), bytes(value)))
+        for c in response.cookies.values():
+            response_headers.append(
+                (b'Set-Cookie', c.output(header='').encode('ascii').strip())
+            )
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': response_headers,
+        })
+
+        # The thread the view ran in, which any cursor the iterator holds belongs to
+        next_part = sync_to_async(next, thread_sensitive=True)
+        parts = iter(response)
+        while (part := await next_part(parts, _DONE)) is not _DONE:
+            for chunk, _ in self.chunk_bytes(part):
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body'})
+        await sync_to_async(response.close, thread_sensitive=True)()
+
+
+def get_asgi_application():
+    django.setup(set_prefix=False)
+    return StreamingASGIHandler()
+
+
 application = get_asgi_application()
@@ -94,6 +94,33 @@ DATABASES = {
     }
 }
 
+# Production SQLite profile (DB_PROFILE=production): WAL so readers never
+# wait on a writer, memory-mapped reads and a larger page cache, persistent
+# connections per worker thread, and reads on a read-only 'replica' alias of
+# the same file, apart from the connection imports write on (see
+# api.database)
+if os.getenv('DB_PROFILE') == 'production':
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 2 ** 20)),
+        # Negative sizes are in KiB
+        'cache_size': -int(os.getenv('SQLITE_CACHE_SIZE_KB', 64 * 1024)),
+        'temp_store': 'MEMORY',
+    }
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', 600)),
+        # Seconds a writer waits for the write lock
+        'OPTIONS': {'timeout': 20},
+        'PRAGMAS': SQLITE_PRAGMAS,
+    })
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'PRAGMAS': {**SQLITE_PRAGMAS, 'query_only': 'ON'},
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['api.database.ReadReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -146,6 +173,12 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
+    # FastJSONRenderer uses orjson when installed and falls back to
+    # rest_framework.renderers.JSONRenderer otherwise
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_FILTER_BACKENDS': [
@@ -176,7 +209,8 @@ CORS_ALLOW_METHODS = [
     'OPTIONS',
 ]
 
-# Logging configuration
+# Logging configuration: API logs go out as JSON lines through a background
+# thread, so writing them never blocks a request
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -185,33 +219,89 @@ LOGGING = {
             'format': '{levelname} {asctime} {module} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'api.logs.JSONFormatter',
+        },
     },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
-            'formatter': 'verbose',
+            'formatter': os.getenv('LOG_FORMAT', 'json'),
         },
         'file': {
             'class': 'logging.FileHandler',
             'filename': os.getenv('LOG_FILE', 'api.log'),
-            'formatter': 'verbose',
+            'formatter': 'json',
+        },
+        # Must sort after the handlers it wraps (see api.logs.BackgroundHandler)
+        'queue': {
+            '()': 'api.logs.BackgroundHandler',
+            'handlers': ['cfg://handlers.console', 'cfg://handlers.file'],
         },
     },
     'loggers': {
         'api': {
-            'handlers': ['console', 'file'],
+            'handlers': ['queue'],
             'level': os.getenv('LOG_LEVEL', 'INFO'),
             'propagate': True,
         },
     },
 }
 
-# API Rate limiting settings
+# API Rate limiting settings: requests allowed per client in any sliding
+# window of API_RATE_LIMIT_WINDOW seconds (0 disables the limit)
 API_RATE_LIMIT = int(os.getenv('API_RATE_LIMIT', 100))
+API_RATE_LIMIT_WINDOW = int(os.getenv('API_RATE_LIMIT_WINDOW', 60))
+# Reverse proxies in front of the app whose X-Forwarded-For entries are
+# trusted to identify clients (0: clients are identified by REMOTE_ADDR)
+API_RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv('API_RATE_LIMIT_TRUSTED_PROXIES', 0))
+
+# Seconds cached house data (counts, list pages) lives for; entries are also
+# invalidated by any write to the houses
+HOUSE_CACHE_TIMEOUT = int(os.getenv('HOUSE_CACHE_TIMEOUT', 300))
+
+# Result counts above this many rows are estimated rather than counted
+# exactly (0 always counts exactly)
+HOUSE_COUNT_ESTIMATE_THRESHOLD = int(os.getenv('HOUSE_COUNT_ESTIMATE_THRESHOLD', 100000))
+
+# Least seconds between background rebuilds of a process's in-memory
+# indexes (autocomplete, comparables) after the houses change (0 rebuilds
+# before the next lookup instead)
+HOUSE_INDEX_REFRESH_INTERVAL = int(os.getenv('HOUSE_INDEX_REFRESH_INTERVAL', 60))
+
+# Run the API middleware async under ASGI. Off by default: Django's own
+# middleware is only async through thread hops, so under Django 3.2 a sync
+# middleware chain makes fewer of them (see benchmarks/bench_asgi.py)
+API_ASYNC_MIDDLEWARE = os.getenv('API_ASYNC_MIDDLEWARE', '').lower() in ('1', 'true', 'yes')
+
+# Directory where each worker process writes its metrics for /api/metrics/
+# to add up, every METRICS_FLUSH_INTERVAL seconds (unset: this process only)
+METRICS_DIR = os.getenv('METRICS_DIR') or None
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 1))
 
 # Cache settings for rate limiting
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    # Per-client rate limit counters. LocMemCache is per process, so with N
+    # worker processes a client gets up to N * API_RATE_LIMIT requests per
+    # window; set RATE_LIMIT_MEMCACHED (needs pymemcache) to share them
+    'ratelimit': {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': os.getenv('RATE_LIMIT_MEMCACHED').split(','),
+    } if os.getenv('RATE_LIMIT_MEMCACHED') else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ratelimit',
+    },
+    # Cached house list responses and counts; least recently used entries
+    # are evicted past MAX_ENTRIES
+    'houses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'houses',
+        'TIMEOUT': HOUSE_CACHE_TIMEOUT,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('HOUSE_CACHE_MAX_ENTRIES', 5000)),
+        },
+    },
 }
@@ -17,14 +17,16 @@ from django.contrib import admin
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework.authtoken.views import obtain_auth_token
-from api.views import HouseViewSet
+from api.views import HouseViewSet, MarketStatsViewSet, metrics
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
 router = DefaultRouter()
 router.register(r'houses', HouseViewSet)
+router.register(r'stats', MarketStatsViewSet)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/metrics/', metrics, name='metrics'),
     path('api/', include(router.urls)),
     path('api/token/', obtain_auth_token, name='api_token_auth'),
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),